@@ -0,0 +1,19 @@
+"""Benchmarks in the asv format: classes with an optional setup, params and
+param_names and time_* methods. Run them all with::
+
+    python -m benchmarks.run --output results.json
+"""
+import random
+
+from macht.grid import Grid
+
+
+def seeded_grid(rows, cols, seed=0, fill=0.5, Grid=Grid):
+    rng = random.Random(seed)
+    grid = Grid(rows, cols, rng=random.Random(seed))
+    for row_idx in range(rows):
+        for col_idx in range(cols):
+            if rng.random() < fill:
+                grid.spawn_tile(row_idx, col_idx,
+                                exponent=rng.randint(1, min(10, rows * cols)))
+    return grid
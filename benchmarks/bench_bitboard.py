@@ -0,0 +1,66 @@
+"""Grid against BitGrid, in the asv format (classes with setup and time_*).
+
+Run directly for a quick comparison::
+
+    python -m benchmarks.bench_bitboard
+"""
+import timeit
+
+from macht.grid import Direction
+from macht.bitboard import BitGrid
+
+from . import seeded_grid
+
+
+class TimeMove(object):
+    params = ([(4, 4), (6, 6)], list(Direction))
+    param_names = ['dimensions', 'direction']
+
+    def setup(self, dimensions, direction):
+        self.grid = seeded_grid(*dimensions)
+        self.bit_grid = BitGrid.from_grid(self.grid)
+        self.bit_grid.shifted(direction)  # build the tables beforehand
+
+    def time_grid_move(self, dimensions, direction):
+        self.grid.move(direction, apply=False)
+
+    def time_bitgrid_move(self, dimensions, direction):
+        self.bit_grid.move(direction, apply=False)
+
+    def time_bitgrid_shifted(self, dimensions, direction):
+        self.bit_grid.shifted(direction)
+
+
+class TimePossibleMoves(object):
+    params = [(4, 4), (6, 6)]
+    param_names = ['dimensions']
+
+    def setup(self, dimensions):
+        self.grid = seeded_grid(*dimensions)
+        self.bit_grid = BitGrid.from_grid(self.grid)
+        self.bit_grid.possible_moves
+
+    def time_grid(self, dimensions):
+        self.grid.possible_moves
+
+    def time_bitgrid(self, dimensions):
+        self.bit_grid.possible_moves
+
+
+def compare(number=2000):
+    for dimensions in TimePossibleMoves.params:
+        bench = TimePossibleMoves()
+        bench.setup(dimensions)
+        grid_time = timeit.timeit(lambda: bench.time_grid(dimensions),
+                                  number=number)
+        bit_time = timeit.timeit(lambda: bench.time_bitgrid(dimensions),
+                                 number=number)
+        print("possible_moves {}x{}: Grid {:.1f}us, BitGrid {:.1f}us "
+              "({:.1f}x)".format(dimensions[0], dimensions[1],
+                                 grid_time / number * 1e6,
+                                 bit_time / number * 1e6,
+                                 grid_time / bit_time))
+
+
+if __name__ == '__main__':
+    compare()
@@ -0,0 +1,31 @@
+"""Whole games without a terminal, with a seeded random player."""
+import random
+
+from macht import game, replay, selfplay
+from macht.grid import Direction, Grid
+
+
+def play_grid(seed, rows, cols):
+    rng = random.Random(seed)
+    grid = Grid(rows, cols, rng=rng)
+    grid.spawn_tile()
+    grid.spawn_tile()
+    while grid.has_moves:
+        game.step(grid, rng.choice(grid.possible_moves))
+
+
+class TimeGame(object):
+    params = [(4, 4), (6, 6)]
+    param_names = ['dimensions']
+    number = 1  # a game is long enough to time on its own
+
+    def time_grid_game(self, dimensions):
+        play_grid(0, *dimensions)
+
+    def time_bitgrid_game(self, dimensions):
+        selfplay.play_game(0, *dimensions)
+
+    def time_replay(self, dimensions):
+        rng = random.Random(0)
+        directions = [rng.choice(list(Direction)) for _ in range(500)]
+        replay.Replay(0, directions, *dimensions).state()
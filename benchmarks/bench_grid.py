@@ -0,0 +1,45 @@
+"""The core Grid operations on seeded boards of several sizes."""
+from macht.grid import Direction
+
+from . import seeded_grid
+
+sizes = [(4, 4), (8, 8), (32, 32)]
+
+
+class TimeMove(object):
+    params = (sizes, list(Direction))
+    param_names = ['dimensions', 'direction']
+
+    def setup(self, dimensions, direction):
+        self.grid = seeded_grid(*dimensions)
+
+    def time_move(self, dimensions, direction):
+        self.grid.move(direction, apply=False)
+
+    def time_move_records(self, dimensions, direction):
+        self.grid.move_records(direction, apply=False)
+
+
+class TimeGrid(object):
+    params = sizes
+    param_names = ['dimensions']
+
+    def setup(self, dimensions):
+        self.grid = seeded_grid(*dimensions)
+        self.rows, self.cols = dimensions
+
+    def time_possible_moves(self, dimensions):
+        self.grid.possible_moves
+
+    def time_has_moves(self, dimensions):
+        self.grid.has_moves
+
+    def time_spawn_tile(self, dimensions):
+        self.grid.spawn_tile(apply=False)
+
+    def time_highest_tile(self, dimensions):
+        self.grid.highest_tile
+
+    def time_resize(self, dimensions):
+        self.grid.resize(self.rows * 2, self.cols * 2)
+        self.grid.resize(self.rows, self.cols)
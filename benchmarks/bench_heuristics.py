@@ -0,0 +1,48 @@
+"""Evaluating boards with the default heuristic of the expectimax player,
+one at a time and in NumPy batches.
+"""
+from macht.ai.expectimax import HEURISTIC
+from macht.bitboard import BitGrid
+from macht.heuristics import Heuristic
+
+from . import seeded_grid
+
+
+class TimeEvaluate(object):
+    params = [(4, 4), (6, 6)]
+    param_names = ['dimensions']
+
+    def setup(self, dimensions):
+        self.grid = seeded_grid(*dimensions)
+        self.bit_grid = BitGrid.from_grid(self.grid)
+        HEURISTIC.evaluate(self.grid)  # fill the tables beforehand
+        HEURISTIC.evaluate(self.bit_grid)
+
+    def time_grid(self, dimensions):
+        HEURISTIC.evaluate(self.grid)
+
+    def time_bitgrid(self, dimensions):
+        HEURISTIC.evaluate(self.bit_grid)
+
+
+class TimeEvaluateBatch(object):
+    """10000 boards at once, with a table of line scores (4x4) or with
+    reductions (6x6).
+    """
+    params = [(4, 4), (6, 6)]
+    param_names = ['dimensions']
+
+    def setup(self, dimensions):
+        try:
+            import numpy as np
+        except ImportError:
+            raise NotImplementedError("needs numpy")
+        rng = np.random.default_rng(0)
+        self.exponents = rng.integers(0, 12, (10000,) + dimensions,
+                                      dtype=np.int8)
+        self.heuristic = Heuristic(HEURISTIC.weights, HEURISTIC.constant,
+                                   HEURISTIC.options)
+        self.heuristic.evaluate_batch(self.exponents[:1])
+
+    def time_batch(self, dimensions):
+        self.heuristic.evaluate_batch(self.exponents)
@@ -0,0 +1,32 @@
+"""Saving and loading games, in the JSON and the binary format."""
+import os
+import shutil
+import tempfile
+
+from macht import save
+
+from . import seeded_grid
+
+
+class TimeSave(object):
+    params = ([(4, 4), (32, 32)], ['json', 'macht'])
+    param_names = ['dimensions', 'format']
+
+    def setup(self, dimensions, format):
+        self.grids = [seeded_grid(*dimensions, seed=seed)
+                      for seed in range(2)]
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'save.' + format)
+        save.write_to_file(1234, self.grids, self.filename)
+
+    def teardown(self, dimensions, format):
+        shutil.rmtree(self.directory)
+
+    def time_grid_to_dict(self, dimensions, format):
+        save.grid_to_dict(self.grids[0])
+
+    def time_write_to_file(self, dimensions, format):
+        save.write_to_file(1234, self.grids, self.filename)
+
+    def time_load_from_file(self, dimensions, format):
+        save.load_from_file(self.filename)
@@ -0,0 +1,79 @@
+"""Startup costs: importing the modules in a fresh interpreter, and the time
+from launching the terminal game until it drew its first frame.
+"""
+import os
+import sys
+import time
+import select
+import shutil
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TimeImport(object):
+    params = ['', 'macht.grid', 'macht.save', 'macht.replay',
+              'macht.selfplay', 'macht.term.main']
+    param_names = ['module']
+    number = 1  # every call starts a python
+
+    def time_import(self, module):
+        subprocess.check_call([sys.executable, '-c',
+                               'import ' + module if module else 'pass'])
+
+
+class TrackFirstFrame(object):
+    timeout = 10
+
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def track_first_frame(self):
+        """Seconds until the game wrote its score to the terminal."""
+        try:
+            import pty
+            import fcntl
+            import struct
+            import termios
+        except ImportError:
+            raise NotImplementedError("needs a pseudo terminal")
+
+        master, slave = pty.openpty()
+        fcntl.ioctl(slave, termios.TIOCSWINSZ,
+                    struct.pack('HHHH', 40, 120, 0, 0))
+        env = dict(os.environ, TERM='xterm-256color',
+                   XDG_DATA_HOME=self.directory, PYTHONPATH=os.pathsep.join(
+                       [ROOT, os.environ.get('PYTHONPATH', '')]))
+        start = time.time()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'macht', '--autosave', '0'],
+            stdin=slave, stdout=slave, stderr=slave, env=env,
+            cwd=self.directory)
+        os.close(slave)
+
+        output, first_frame = b'', None
+        try:
+            while time.time() - start < self.timeout:
+                if select.select([master], [], [], 0.1)[0]:
+                    try:
+                        output += os.read(master, 65536)
+                    except OSError:  # the game exited
+                        break
+                    if b'score' in output:
+                        first_frame = time.time() - start
+                        break
+            if process.poll() is None:
+                os.write(master, b'q')
+                process.wait(self.timeout)
+        finally:
+            if process.poll() is None:
+                process.kill()
+            os.close(master)
+        if first_frame is None:
+            raise RuntimeError("no frame drawn:\n" + output.decode(
+                'utf-8', 'replace'))
+        return first_frame
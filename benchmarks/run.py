@@ -0,0 +1,174 @@
+"""Run the benchmarks and write their timings (and the values of track_*
+benchmarks) as JSON, to compare commits::
+
+    python -m benchmarks.run --output before.json
+    python -m benchmarks.run --output after.json --compare before.json
+"""
+import re
+import sys
+import json
+import platform
+import argparse
+import importlib
+import itertools
+import pkgutil
+import subprocess
+import timeit
+from time import time
+
+import benchmarks
+
+parser = argparse.ArgumentParser(
+    description="Time the benchmarks, writing the results as JSON.")
+parser.add_argument('-o', '--output', metavar='FILE', default='-',
+                    help="file to write the results to (default: stdout)")
+parser.add_argument('-b', '--bench', metavar='REGEX', default=None,
+                    help="only run benchmarks with a matching name")
+parser.add_argument('-r', '--repeat', metavar='N', type=int, default=5,
+                    help="number of timings per benchmark, the fastest "
+                    "counts (default: 5)")
+parser.add_argument('-c', '--compare', metavar='FILE', default=None,
+                    help="print how the results compare to those in FILE")
+
+
+def modules():
+    for module_info in pkgutil.iter_modules(benchmarks.__path__):
+        if module_info[1].startswith('bench_'):
+            yield importlib.import_module('benchmarks.' + module_info[1])
+
+
+def param_sets(cls):
+    params = getattr(cls, 'params', None)
+    if params is None:
+        return [()]
+    if len(getattr(cls, 'param_names', ())) == 1:
+        return [(param,) for param in params]
+    return list(itertools.product(*params))
+
+
+def param_label(value):
+    if isinstance(value, tuple):
+        return 'x'.join(str(item) for item in value)
+    return getattr(value, 'name', str(value))
+
+
+def collect(pattern=None):
+    """Yield (name, class, method, params) of every benchmark."""
+    for module in modules():
+        for cls_name, cls in sorted(vars(module).items()):
+            if not isinstance(cls, type) or \
+                    cls.__module__ != module.__name__:
+                continue
+            for method in sorted(m for m in dir(cls)
+                                 if m.startswith(('time_', 'track_'))):
+                name = '.'.join((module.__name__.split('.')[-1], cls_name,
+                                 method))
+                if pattern and not re.search(pattern, name):
+                    continue
+                for params in param_sets(cls):
+                    yield name, cls, method, params
+
+
+def time_benchmark(cls, method, params, repeat=5):
+    """Return the timings in seconds per call of one benchmark, or the
+    values a track_* benchmark returned.
+    """
+    bench = cls()
+    if hasattr(bench, 'setup'):
+        bench.setup(*params)
+    try:
+        func = getattr(bench, method)
+        if method.startswith('track_'):
+            number, times = 1, [func(*params) for _ in range(repeat)]
+        else:
+            timer = timeit.Timer(lambda: func(*params))
+            number = getattr(cls, 'number', None) or timer.autorange()[0]
+            times = [total / number
+                     for total in timer.repeat(repeat, number)]
+    finally:
+        if hasattr(bench, 'teardown'):
+            bench.teardown(*params)
+
+    times.sort()
+    return {'number': number, 'min': times[0],
+            'median': times[len(times) // 2], 'times': times}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            stderr=subprocess.STDOUT).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(pattern=None, repeat=5, log=sys.stderr):
+    results = []
+    for name, cls, method, params in collect(pattern):
+        names = getattr(cls, 'param_names', ())
+        labels = dict(zip(names, (param_label(p) for p in params)))
+        result = {'name': name, 'params': labels}
+        try:
+            result.update(time_benchmark(cls, method, params, repeat))
+        except NotImplementedError as err:  # skipped, as in asv
+            if log:
+                log.write("{} skipped: {}\n".format(name, err))
+            continue
+        results.append(result)
+        if log:
+            log.write("{} {} {:.3g}us\n".format(
+                name, ' '.join(labels[n] for n in names),
+                result['min'] * 1e6))
+
+    return {'commit': git_commit(), 'date': time(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(), 'results': results}
+
+
+def _key(result):
+    return result['name'], tuple(sorted(result['params'].items()))
+
+
+def compare(old, new, threshold=1.1):
+    """Return lines comparing the fastest timings of new to those of old,
+    marking changes beyond threshold.
+    """
+    old_results = dict((_key(result), result) for result in old['results'])
+    lines = []
+    for result in new['results']:
+        before = old_results.get(_key(result))
+        if not before:
+            continue
+        ratio = result['min'] / before['min']
+        mark = ('slower' if ratio > threshold else
+                'faster' if ratio < 1 / threshold else '')
+        lines.append("{:>6.2f}x {} {} {}".format(
+            ratio, result['name'],
+            ' '.join(str(v) for _, v in sorted(result['params'].items())),
+            mark).rstrip())
+    return lines
+
+
+def main(args=None):
+    opts = parser.parse_args(args or sys.argv[1:])
+    results = run(opts.bench, opts.repeat)
+
+    output = json.dumps(results, indent=2)
+    if opts.output == '-':
+        sys.stdout.write(output + '\n')
+    else:
+        with open(opts.output, 'w') as output_file:
+            output_file.write(output + '\n')
+
+    if opts.compare:
+        with open(opts.compare) as compare_file:
+            old = json.load(compare_file)
+        sys.stderr.write('\n'.join(compare(old, results)) + '\n')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,3 @@
+from .expectimax import Expectimax, Player, line_heuristic
+from .pool import PoolPlayer
+from .transposition import TranspositionTable
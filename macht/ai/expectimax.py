@@ -0,0 +1,179 @@
+from time import time
+
+from ..grid import Direction, spawn_distribution
+from ..bitboard import BitGrid
+from ..heuristics import Heuristic
+from ..symmetry import board_symmetry
+from .transposition import TranspositionTable
+
+LOST_PENALTY = 200000.0
+MONOTONICITY_POWER = 4.0
+MONOTONICITY_WEIGHT = 47.0
+SUM_POWER = 3.5
+SUM_WEIGHT = 11.0
+MERGES_WEIGHT = 700.0
+EMPTY_WEIGHT = 270.0
+
+
+HEURISTIC = Heuristic(
+    {'empty': EMPTY_WEIGHT, 'merges': MERGES_WEIGHT,
+     'monotonicity': -MONOTONICITY_WEIGHT, 'sum': -SUM_WEIGHT},
+    constant=LOST_PENALTY,
+    options={'monotonicity': {'power': MONOTONICITY_POWER},
+             'sum': {'power': SUM_POWER}})
+
+
+def line_heuristic(line):
+    """Score a line of exponents: reward empty cells, equal neighbours and
+    monotonic lines, penalize large tiles outside the corners.
+    """
+    return HEURISTIC.line(list(line))
+
+
+class _Timeout(Exception):
+    pass
+
+
+class Expectimax(object):
+    """Expectimax search on packed boards of one bitboard Layout.
+
+    Max nodes try every direction, chance nodes average over every empty cell
+    and spawn exponent. Chance node values are cached in a transposition table
+    and branches less likely than `probability_cutoff` are not expanded.
+    With `symmetric` the table is keyed on canonical boards, so the
+    rotations and reflections of a board share one entry. Boards are
+    scored with a macht.heuristics.Heuristic, by default HEURISTIC.
+    """
+
+    def __init__(self, layout, max_depth=6, time_budget=None,
+                 probability_cutoff=1e-4, table=None, symmetric=True,
+                 heuristic=None):
+        self.layout = layout
+        self._key = board_symmetry(layout).canonical_board if symmetric \
+            else None
+        self.max_depth, self.time_budget = max_depth, time_budget
+        self.probability_cutoff = probability_cutoff
+        self.table = table if table is not None else TranspositionTable()
+        self.nodes = 0
+
+        self.heuristic = heuristic if heuristic is not None else HEURISTIC
+        self._row_scores, self._col_scores = self.heuristic.tables(layout)
+        self._deadline = None
+        self._searched = None
+
+    def evaluate(self, board):
+        layout, value = self.layout, 0
+        row_scores, col_scores = self._row_scores, self._col_scores
+
+        for row in range(layout.rows):
+            value += row_scores[(board >> (row * layout.row_bits)) &
+                                layout.row_mask]
+        transposed = layout.transpose(board)
+        for col in range(layout.cols):
+            value += col_scores[(transposed >> (col * layout.col_bits)) &
+                                layout.col_mask]
+        return value
+
+    def _max(self, board, depth, probability):
+        self.nodes += 1
+        if self._deadline and self.nodes & 0xff == 0 and \
+                time() > self._deadline:
+            raise _Timeout
+
+        best = 0
+        shift = self.layout.shift
+        for direction in Direction:
+            new = shift(board, direction)[0]
+            if new != board:
+                best = max(best, self._chance(new, depth, probability))
+        return best
+
+    def _chance(self, board, depth, probability):
+        if depth == 0 or probability < self.probability_cutoff:
+            return self.evaluate(board)
+
+        key = self._key(board) if self._key else board
+        value = self.table.get(key, depth)
+        if value is not None:
+            return value
+
+        bits, mask = self.layout.bits, self.layout.lane_mask
+        empty = [cell * bits for cell in range(self.layout.cells)
+                 if not (board >> (cell * bits)) & mask]
+        cell_probability = probability / len(empty)
+
+        value = 0
+        for offset in empty:
+            for exponent, spawn_probability in spawn_distribution:
+                value += spawn_probability * self._max(
+                    board | (exponent << offset), depth - 1,
+                    cell_probability * spawn_probability)
+        value /= len(empty)
+
+        self.table.put(key, depth, value)
+        return value
+
+    def search(self, board, depth):
+        """Return the best direction at a fixed depth and its value."""
+        best, best_value = None, None
+        for direction in Direction:
+            new = self.layout.shift(board, direction)[0]
+            if new == board:
+                continue
+            value = self._chance(new, depth, 1.0)
+            if best_value is None or value > best_value:
+                best, best_value = direction, value
+                self._searched = best  # kept when the time runs out
+        return best, best_value
+
+    def best_move(self, board, time_budget=None):
+        """Deepen the search until max_depth or until the time budget (in
+        seconds) runs out, None when there is no possible move. When the
+        time runs out before depth 1 is searched, the best move it found so
+        far is returned, or else the first possible one.
+        """
+        time_budget = time_budget or self.time_budget
+        self._deadline = time() + time_budget if time_budget else None
+
+        best = self._searched = None
+        try:
+            for depth in range(1, self.max_depth + 1):
+                direction = self.search(board, depth)[0]
+                if direction is None:
+                    break
+                best = direction
+        except _Timeout:
+            if best is None:  # not even depth 1 was searched
+                best = self._searched or next(
+                    iter(self.layout.possible_moves(board)), None)
+        finally:
+            self._deadline = None
+
+        return best
+
+
+class Player(object):
+    """Picks moves for Grids, BitGrids and anything else BitGrid.from_grid
+    takes, with one Expectimax search per board layout.
+    """
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self._searches = {}
+
+    def search_for(self, layout):
+        if layout not in self._searches:
+            self._searches[layout] = Expectimax(layout, **self.kwargs)
+        return self._searches[layout]
+
+    def best_move(self, grid, time_budget=None):
+        if not isinstance(grid, BitGrid):
+            grid = BitGrid.from_grid(grid)
+        return self.search_for(grid.layout).best_move(grid.board,
+                                                      time_budget)
+
+    def best_moves(self, grids, time_budget=None):
+        return [self.best_move(grid, time_budget) for grid in grids]
+
+    def close(self):
+        pass
@@ -0,0 +1,41 @@
+from ..bitboard import BitGrid, layout
+from .expectimax import Player
+
+_worker_player = None
+
+
+def _init_worker(kwargs):
+    global _worker_player
+    _worker_player = Player(**kwargs)
+
+
+def _best_move_in_worker(rows, cols, base, bits, board, time_budget):
+    search = _worker_player.search_for(layout(rows, cols, bits, base))
+    return search.best_move(board, time_budget)
+
+
+class PoolPlayer(Player):
+    """A Player that searches the moves of several grids at once, in worker
+    processes that each keep their own searches and transposition tables.
+    """
+
+    def __init__(self, jobs=None, **kwargs):
+        from concurrent.futures import ProcessPoolExecutor
+
+        super(PoolPlayer, self).__init__(**kwargs)
+        self.executor = ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(kwargs,))
+
+    def best_moves(self, grids, time_budget=None):
+        futures = []
+        for grid in grids:
+            if not isinstance(grid, BitGrid):
+                grid = BitGrid.from_grid(grid)
+            grid_layout = grid.layout
+            futures.append(self.executor.submit(
+                _best_move_in_worker, grid_layout.rows, grid_layout.cols,
+                grid_layout.base, grid_layout.bits, grid.board, time_budget))
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.executor.shutdown()
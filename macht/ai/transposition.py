@@ -0,0 +1,41 @@
+from collections import OrderedDict
+
+
+class TranspositionTable(object):
+    """Search results keyed on packed boards, evicting the oldest entries
+    once `size` boards are stored.
+    """
+
+    def __init__(self, size=2 ** 18):
+        self.size = size
+        self._entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, board, depth):
+        """Return the value stored for board if searched at least depth deep,
+        None otherwise.
+        """
+        entry = self._entries.get(board)
+        if entry is not None and entry[0] >= depth:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        return None
+
+    def put(self, board, depth, value):
+        entries = self._entries
+        if board in entries:
+            if entries[board][0] > depth:
+                return
+        elif len(entries) >= self.size:
+            entries.popitem(last=False)
+
+        entries[board] = (depth, value)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
@@ -0,0 +1,174 @@
+"""An archive of finished games in SQLite, next to the saves.
+
+Every game is a row of `games`. Triggers keep `summary`, the totals per
+dimensions, base and highest tile, up to date, so statistics read a few
+rows whatever the number of games, and the leaderboard reads an index on
+the score.
+"""
+import os
+import sqlite3
+from time import time
+
+from .save import macht_data_dir, make_dirs
+
+default_archive = os.path.join(macht_data_dir, 'archive.sqlite')
+
+fields = ('finished', 'rows', 'cols', 'base', 'grids', 'score',
+          'highest_tile', 'seed', 'moves', 'seconds', 'source')
+
+schema = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    finished REAL NOT NULL,
+    rows INTEGER NOT NULL,
+    cols INTEGER NOT NULL,
+    base INTEGER NOT NULL,
+    grids INTEGER NOT NULL DEFAULT 1,
+    score INTEGER NOT NULL,
+    highest_tile INTEGER,
+    seed INTEGER,
+    moves INTEGER,
+    seconds REAL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS games_score ON games (score);
+CREATE INDEX IF NOT EXISTS games_dimensions
+    ON games (rows, cols, score);
+
+CREATE TABLE IF NOT EXISTS summary (
+    rows INTEGER NOT NULL,
+    cols INTEGER NOT NULL,
+    base INTEGER NOT NULL,
+    highest_tile INTEGER NOT NULL,
+    games INTEGER NOT NULL,
+    total_score INTEGER NOT NULL,
+    best_score INTEGER NOT NULL,
+    moves INTEGER NOT NULL,
+    PRIMARY KEY (rows, cols, base, highest_tile)
+);
+CREATE TRIGGER IF NOT EXISTS games_summary AFTER INSERT ON games BEGIN
+    INSERT INTO summary VALUES (
+        new.rows, new.cols, new.base, coalesce(new.highest_tile, 0), 1,
+        new.score, new.score, coalesce(new.moves, 0))
+    ON CONFLICT (rows, cols, base, highest_tile) DO UPDATE SET
+        games = games + 1, total_score = total_score + excluded.total_score,
+        best_score = max(best_score, excluded.best_score),
+        moves = moves + excluded.moves;
+END;
+"""
+
+
+def _where(rows=None, cols=None, base=None):
+    conditions = [(column, value) for column, value
+                  in (('rows', rows), ('cols', cols), ('base', base))
+                  if value is not None]
+    if not conditions:
+        return '', ()
+    return (' WHERE ' + ' AND '.join(column + ' = ?'
+                                     for column, _ in conditions),
+            tuple(value for _, value in conditions))
+
+
+class Archive(object):
+    """The games in an SQLite file, by default in the macht data directory.
+
+    Games are dicts with the keys in `fields`, like the results of
+    macht.selfplay; missing keys are stored as NULL (`finished` as now and
+    `grids` as 1).
+    Add many games with record_many, which inserts them in one transaction.
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename or default_archive
+        make_dirs(self.filename)
+        self._db = sqlite3.connect(self.filename)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode = WAL')
+        self._db.execute('PRAGMA synchronous = NORMAL')  # safe with WAL
+        self._db.executescript(schema)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        games = self._db.execute('SELECT sum(games) FROM summary').fetchone()
+        return games[0] or 0
+
+    def close(self):
+        self._db.close()
+
+    def record(self, game):
+        self.record_many([game])
+
+    def record_many(self, games):
+        defaults = {'finished': time(), 'grids': 1}
+        with self._db:
+            self._db.executemany(
+                'INSERT INTO games ({}) VALUES ({})'.format(
+                    ', '.join(fields), ', '.join('?' * len(fields))),
+                (tuple(game.get(field, defaults.get(field))
+                       for field in fields) for game in games))
+
+    def top(self, count=10, rows=None, cols=None, base=None):
+        """The `count` games with the highest scores, as dicts."""
+        where, values = _where(rows, cols, base)
+        cursor = self._db.execute(
+            'SELECT id, {} FROM games{} ORDER BY score DESC LIMIT ?'.format(
+                ', '.join(fields), where), values + (count,))
+        return [dict(row) for row in cursor]
+
+    def stats(self, rows=None, cols=None, base=None):
+        """Statistics per dimensions and base, as dicts."""
+        where, values = _where(rows, cols, base)
+        stats = {}
+        for row in self._db.execute('SELECT * FROM summary{} ORDER BY rows, '
+                                    'cols, base'.format(where), values):
+            key = (row['rows'], row['cols'], row['base'])
+            if key not in stats:
+                stats[key] = {'rows': key[0], 'cols': key[1], 'base': key[2],
+                              'games': 0, 'total_score': 0, 'best_score': 0,
+                              'moves': 0, 'highest_tiles': {}}
+            entry = stats[key]
+            entry['games'] += row['games']
+            entry['total_score'] += row['total_score']
+            entry['best_score'] = max(entry['best_score'], row['best_score'])
+            entry['moves'] += row['moves']
+            entry['highest_tiles'][row['highest_tile']] = row['games']
+
+        for entry in stats.values():
+            entry['score_mean'] = entry.pop('total_score') / float(
+                entry['games'])
+        return [stats[key] for key in sorted(stats)]
+
+
+def format_top(games):
+    lines = ["{:>4} {:>10} {:>8} {:>6} {:>6} {:>8}  {}".format(
+        'rank', 'score', 'tile', 'grid', 'moves', 'source', 'finished')]
+    for rank, game in enumerate(games, 1):
+        lines.append("{:>4} {:>10} {:>8} {:>6} {:>6} {:>8}  {}".format(
+            rank, game['score'], game['highest_tile'] or '',
+            '{}x{}'.format(game['rows'], game['cols']),
+            game['moves'] if game['moves'] is not None else '',
+            game['source'] or '', _format_time(game['finished'])))
+    return '\n'.join(lines)
+
+
+def format_stats(stats):
+    lines = []
+    for entry in stats:
+        lines.append("{}x{} base {}: {} games, mean score {:.1f}, best score "
+                     "{}, {} moves".format(
+                         entry['rows'], entry['cols'], entry['base'],
+                         entry['games'], entry['score_mean'],
+                         entry['best_score'], entry['moves']))
+        lines.extend("  highest tile {:>6}: {} games".format(tile, games)
+                     for tile, games in sorted(entry['highest_tiles'].items()))
+    return '\n'.join(lines) or "no games archived"
+
+
+def _format_time(timestamp):
+    from datetime import datetime
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M')
@@ -0,0 +1,173 @@
+"""Many boards of the same size moved at once with NumPy.
+
+Boards are held as an (N, rows, cols) array of exponents, 0 for empty cells.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .grid import Direction, Grid, SpawnTileError
+
+BatchMove = namedtuple('BatchMove', "moved merged score")
+
+
+def direction_values(directions, count):
+    """Return an (count,) array of Direction values."""
+    if isinstance(directions, Direction):
+        return np.full(count, directions.value, dtype=np.int8)
+
+    values = np.array([d.value if isinstance(d, Direction) else d
+                       for d in directions], dtype=np.int8)
+    if values.shape != (count,):
+        raise ValueError("expected {} directions, got {}".format(
+                         count, values.shape[0]))
+    if ((values < 1) | (values > len(Direction))).any():
+        raise ValueError("invalid direction value")
+    return values
+
+
+def _to_left(exponents, direction):
+    if direction in (Direction.up, Direction.down):
+        exponents = exponents.transpose(0, 2, 1)
+    if direction in (Direction.down, Direction.right):
+        exponents = exponents[:, :, ::-1]
+    return exponents
+
+
+def _from_left(exponents, direction):
+    if direction in (Direction.down, Direction.right):
+        exponents = exponents[:, :, ::-1]
+    if direction in (Direction.up, Direction.down):
+        exponents = exponents.transpose(0, 2, 1)
+    return exponents
+
+
+def _compact(lines, *others):
+    order = np.argsort(lines == 0, axis=1, kind='stable')
+    return [np.take_along_axis(array, order, axis=1)
+            for array in (lines,) + others]
+
+
+def slide_left(lines):
+    """Slide (M, L) lines of exponents towards index 0.
+
+    Returns the new lines and a mask of the cells holding merged tiles.
+    """
+    lines, = _compact(lines)
+    lines = lines.copy()
+    merged = np.zeros(lines.shape, dtype=bool)
+
+    for idx in range(lines.shape[1] - 1):
+        pair = (lines[:, idx] != 0) & (lines[:, idx] == lines[:, idx + 1])
+        lines[pair, idx] += 1
+        lines[pair, idx + 1] = 0
+        merged[pair, idx] = True
+
+    return _compact(lines, merged)
+
+
+class BatchGrid(object):
+    def __init__(self, count=1, rows=4, cols=4, base=2, exponents=None,
+                 rng=None):
+        if exponents is None:
+            exponents = np.zeros((count, rows, cols), dtype=np.int8)
+        self.exponents = np.asarray(exponents, dtype=np.int8)
+        self.base = base
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    @classmethod
+    def from_grids(cls, grids, rng=None):
+        base = 2
+        for tile in filter(None, (t for g in grids for row in g for t in row)):
+            base = tile.base
+            break
+
+        exponents = [[[tile.exponent if tile else 0 for tile in row]
+                      for row in grid] for grid in grids]
+        return cls(base=base, exponents=exponents, rng=rng)
+
+    def to_grid(self, index, Grid=Grid, **kwargs):
+        count, rows, cols = self.exponents.shape
+        grid = Grid(rows=rows, cols=cols, **kwargs)
+        for row_idx, col_idx in zip(*np.nonzero(self.exponents[index])):
+            grid.spawn_tile(int(row_idx), int(col_idx), base=self.base,
+                            exponent=int(self.exponents[index, row_idx,
+                                                        col_idx]))
+        return grid
+
+    def __len__(self):
+        return self.exponents.shape[0]
+
+    def __repr__(self):
+        count, rows, cols = self.exponents.shape
+        return "BatchGrid(count={}, rows={}, cols={})".format(count, rows,
+                                                              cols)
+
+    @property
+    def highest_tile(self):
+        """The highest exponent of every board, 0 for empty boards."""
+        return self.exponents.max(axis=(1, 2))
+
+    def moved(self, directions):
+        """Return the moved exponents, the merged cells and the scores."""
+        values = direction_values(directions, len(self))
+        new = self.exponents.copy()
+        merged = np.zeros(new.shape, dtype=bool)
+
+        for direction in Direction:
+            selected = np.nonzero(values == direction.value)[0]
+            if len(selected) == 0:
+                continue
+
+            boards = _to_left(self.exponents[selected], direction)
+            count, lines, length = boards.shape
+            slid, slid_merged = slide_left(boards.reshape(-1, length))
+            new[selected] = _from_left(slid.reshape(boards.shape), direction)
+            merged[selected] = _from_left(slid_merged.reshape(boards.shape),
+                                          direction)
+
+        values = np.where(merged, self.base ** new.astype(np.int64), 0)
+        return new, merged, values.sum(axis=(1, 2))
+
+    def move(self, directions, apply=True):
+        """Move every board, either all in the same or each in its own
+        direction. Returns a BatchMove of per board masks and score deltas.
+        """
+        new, merged, score = self.moved(directions)
+        moved = (new != self.exponents).any(axis=(1, 2))
+
+        if apply:
+            self.exponents = new
+
+        return BatchMove(moved, merged, score)
+
+    @property
+    def possible_moves(self):
+        """An (N, 4) mask of the directions each board can move in."""
+        return np.stack([self.move(direction, apply=False).moved
+                         for direction in Direction], axis=1)
+
+    def spawn_tile(self, mask=None, exponent=None):
+        """Spawn a tile in a random empty cell of every board in mask.
+
+        Without an exponent it is 2 with a probability of 10%, 1 otherwise.
+        """
+        count, rows, cols = self.exponents.shape
+        if mask is None:
+            mask = np.ones(count, dtype=bool)
+        boards = np.nonzero(mask)[0]
+
+        empty = (self.exponents[boards] == 0).reshape(len(boards), -1)
+        empty_counts = empty.sum(axis=1)
+        if (empty_counts == 0).any():
+            raise SpawnTileError("no empty tiles")
+
+        # pick the k-th empty cell of every board, k uniform over its empties
+        picks = (self.rng.random(len(boards)) * empty_counts).astype(np.int64)
+        cells = np.argmax(np.cumsum(empty, axis=1) > picks[:, None], axis=1)
+
+        if exponent is None:
+            exponent = np.where(self.rng.random(len(boards)) > 0.9, 2, 1)
+        self.exponents[boards, cells // cols, cells % cols] = exponent
+
+        return boards, cells // cols, cells % cols
@@ -0,0 +1,425 @@
+import random
+
+from .grid import (Direction, Actions, Position, GridAction, SpawnTileError)
+from .tile import Tile, tile_cache
+
+# Boards are packed into a single int: every cell is a lane of `bits` bits
+# holding the tile's exponent (0 for an empty cell), cell (row, column) is
+# found at lane `row * cols + column` counting from the least significant bit.
+# Moves are table lookups per row, vertical moves work on the transposed board.
+
+EAGER_TABLE_BITS = 16  # lines of at most this many bits get full tables
+
+_tables = {}
+_layouts = {}
+
+
+def lane_bits(rows, cols):
+    # the largest exponent reachable on a board is about one more than its
+    # number of cells (17 on 4x4, with 4s spawning), so the lanes hold it
+    return max(4, (rows * cols + 1).bit_length())
+
+
+def slide_line(line):
+    """Slide a line of exponents towards index 0, the way Grid.move does.
+
+    Returns the new line and the actions as (type, old index, new index).
+    """
+    line, actions = list(line), []
+    length = len(line)
+
+    for target in range(length):
+        for src in range(target + 1, length):
+            if line[target]:
+                if line[src]:
+                    if line[target] == line[src]:
+                        line[target] += 1
+                        line[src] = 0
+                        actions.append((Actions.merge, src, target))
+                    break
+            elif line[src]:
+                line[target], line[src] = line[src], 0
+                actions.append((Actions.move, src, target))
+
+                for src_merge in range(src + 1, length):
+                    if line[src_merge]:
+                        if line[target] == line[src_merge]:
+                            line[target] += 1
+                            line[src_merge] = 0
+                            actions.append((Actions.merge, src_merge, target))
+                        break
+                break
+
+    return line, actions
+
+
+class LazyTable(dict):
+    def __init__(self, compute):
+        super(LazyTable, self).__init__()
+        self.compute = compute
+
+    def __missing__(self, key):
+        value = self[key] = self.compute(key)
+        return value
+
+
+class LineTable(object):
+    """Lookup tables for moving a single packed line of `length` lanes.
+
+    `left` and `right` map a packed line onto the packed result of sliding it
+    towards index 0 and towards the last index, `score` maps it onto the sum
+    of the values of the merged tiles (the same for both directions). Lines
+    that would overflow a lane map onto None.
+    """
+
+    def __init__(self, length, bits, base=2):
+        self.length, self.bits, self.base = length, bits, base
+        self.lane_mask = (1 << bits) - 1
+        self.max_exponent = self.lane_mask
+
+        if length * bits <= EAGER_TABLE_BITS:
+            size = 1 << (length * bits)
+            self.left, self.right, self.score = [None] * size, [None] * size, \
+                [0] * size
+            for line in range(size):
+                self._fill(line)
+        else:
+            self.left = LazyTable(lambda line: self._fill(line)[0])
+            self.right = LazyTable(lambda line: self._fill(line)[1])
+            self.score = LazyTable(lambda line: self._fill(line)[2])
+
+        self.actions = LazyTable(self._actions)
+
+    def unpack(self, line):
+        return [(line >> (idx * self.bits)) & self.lane_mask
+                for idx in range(self.length)]
+
+    def pack(self, exponents):
+        line = 0
+        for idx, exponent in enumerate(exponents):
+            line |= exponent << (idx * self.bits)
+        return line
+
+    def _fill(self, line):
+        exponents = self.unpack(line)
+        moved, actions = slide_line(exponents)
+        moved_right, _ = slide_line(exponents[::-1])
+
+        score = sum(self.base ** moved[new] for action, _, new in actions
+                    if action is Actions.merge)
+        if max(moved) > self.max_exponent:
+            left = right = None
+        else:
+            left, right = self.pack(moved), self.pack(moved_right[::-1])
+
+        self.left[line], self.right[line] = left, right
+        self.score[line] = score
+        return left, right, score
+
+    def _actions(self, key):
+        line, reverse = key
+        exponents = self.unpack(line)
+        if not reverse:
+            return slide_line(exponents)[1]
+
+        last = self.length - 1
+        return [(action, last - old, last - new) for action, old, new
+                in slide_line(exponents[::-1])[1]]
+
+
+def line_table(length, bits, base=2):
+    key = (length, bits, base)
+    if key not in _tables:
+        _tables[key] = LineTable(length, bits, base)
+    return _tables[key]
+
+
+def _lanes_mask(lanes, bits):
+    return sum(((1 << bits) - 1) << (lane * bits) for lane in lanes)
+
+
+def _transpose_4x4(bits):
+    """Transpose a 4x4 board of bits wide lanes with masks and shifts: the
+    cells in every 2x2 block, then the 2x2 blocks.
+    """
+    cells = [(row, col) for row in range(4) for col in range(4)]
+    stay1 = _lanes_mask([r * 4 + c for r, c in cells if r % 2 == c % 2], bits)
+    up1 = _lanes_mask([r * 4 + c for r, c in cells if r % 2 < c % 2], bits)
+    down1 = _lanes_mask([r * 4 + c for r, c in cells if r % 2 > c % 2], bits)
+    stay2 = _lanes_mask([r * 4 + c for r, c in cells
+                         if r // 2 == c // 2], bits)
+    up2 = _lanes_mask([r * 4 + c for r, c in cells if r // 2 < c // 2], bits)
+    down2 = _lanes_mask([r * 4 + c for r, c in cells
+                         if r // 2 > c // 2], bits)
+    shift1, shift2 = 3 * bits, 6 * bits
+
+    def transpose(board):
+        board = ((board & stay1) | ((board & up1) << shift1) |
+                 ((board & down1) >> shift1))
+        return ((board & stay2) | ((board & up2) << shift2) |
+                ((board & down2) >> shift2))
+    return transpose
+
+
+class Layout(object):
+    """Geometry and move tables for boards of one size, lane width and base.
+
+    All methods work on packed boards (plain ints), use `layout()` to get a
+    shared instance.
+    """
+
+    def __init__(self, rows=4, cols=4, bits=None, base=2):
+        self.rows, self.cols, self.base = rows, cols, base
+        self.bits = bits or lane_bits(rows, cols)
+        self.cells = rows * cols
+        self.lane_mask = (1 << self.bits) - 1
+        self.max_exponent = self.lane_mask
+
+        self.row_bits = cols * self.bits
+        self.col_bits = rows * self.bits
+        self.row_mask = (1 << self.row_bits) - 1
+        self.col_mask = (1 << self.col_bits) - 1
+        self.row_table = line_table(cols, self.bits, base)
+        self.col_table = line_table(rows, self.bits, base)
+
+        self._row_shifts = [row * self.row_bits for row in range(rows)]
+        self._col_shifts = [col * self.col_bits for col in range(cols)]
+        # a packed row (column) spread out over the lanes of its cells in
+        # the transposed (original) board, see transpose
+        self._spread_rows = LazyTable(lambda line: self._spread(
+            self.row_table.unpack(line), rows))
+        self._spread_cols = LazyTable(lambda line: self._spread(
+            self.col_table.unpack(line), cols))
+
+        if rows == cols == 4:
+            self.transpose = _transpose_4x4(self.bits)
+
+    def offset(self, row, column):
+        return (row * self.cols + column) * self.bits
+
+    def get(self, board, row, column):
+        return (board >> self.offset(row, column)) & self.lane_mask
+
+    def set(self, board, row, column, exponent):
+        if not 0 <= exponent <= self.max_exponent:
+            raise OverflowError("exponent {} does not fit in {} bits".format(
+                                exponent, self.bits))
+        offset = self.offset(row, column)
+        return (board & ~(self.lane_mask << offset)) | (exponent << offset)
+
+    def _spread(self, exponents, stride):
+        return sum(exponent << (idx * stride * self.bits)
+                   for idx, exponent in enumerate(exponents))
+
+    def transpose(self, board):
+        transposed, spread = 0, self._spread_rows
+        row_mask, bits = self.row_mask, self.bits
+        for row, shift in enumerate(self._row_shifts):
+            transposed |= spread[(board >> shift) & row_mask] << (row * bits)
+        return transposed
+
+    def _shift_lines(self, board, moves, scores, shifts, line_mask):
+        new_board, score = 0, 0
+        for shift in shifts:
+            line = (board >> shift) & line_mask
+            new_line = moves[line]
+            if new_line is None:
+                raise OverflowError("merged tile does not fit in {} bits"
+                                    .format(self.bits))
+            new_board |= new_line << shift
+            score += scores[line]
+        return new_board, score
+
+    def shift(self, board, direction):
+        """Return the packed board after a move and the score it earned."""
+        if direction is Direction.left or direction is Direction.right:
+            table = self.row_table
+            moves = table.left if direction is Direction.left else table.right
+            return self._shift_lines(board, moves, table.score,
+                                     self._row_shifts, self.row_mask)
+
+        if not isinstance(direction, Direction):
+            raise TypeError
+
+        table = self.col_table
+        moves = table.left if direction is Direction.up else table.right
+        new_board, score = self._shift_lines(
+            self.transpose(board), moves, table.score, self._col_shifts,
+            self.col_mask)
+        return self._transpose_back(new_board), score
+
+    def _transpose_back(self, board):
+        if self.rows == self.cols:
+            return self.transpose(board)
+
+        original, spread = 0, self._spread_cols
+        col_mask, bits = self.col_mask, self.bits
+        for col, shift in enumerate(self._col_shifts):
+            original |= spread[(board >> shift) & col_mask] << (col * bits)
+        return original
+
+    def possible_moves(self, board):
+        return [direction for direction in Direction
+                if self.shift(board, direction)[0] != board]
+
+    def empty_cells(self, board):
+        mask, bits = self.lane_mask, self.bits
+        return [divmod(cell, self.cols) for cell in range(self.cells)
+                if not (board >> (cell * bits)) & mask]
+
+    def exponents(self, board):
+        mask, bits = self.lane_mask, self.bits
+        return [[(board >> ((row * self.cols + col) * bits)) & mask
+                 for col in range(self.cols)] for row in range(self.rows)]
+
+    def from_exponents(self, rows):
+        board = 0
+        for row_idx, row in enumerate(rows):
+            for col_idx, exponent in enumerate(row):
+                if exponent:
+                    board = self.set(board, row_idx, col_idx, exponent)
+        return board
+
+    def highest_exponent(self, board):
+        mask, bits = self.lane_mask, self.bits
+        return max((board >> (cell * bits)) & mask
+                   for cell in range(self.cells))
+
+    def actions(self, board, direction):
+        """Return the GridActions of a move in the order Grid.move has them."""
+        if not isinstance(direction, Direction):
+            raise TypeError
+
+        vertical = direction in (Direction.up, Direction.down)
+        reverse = direction in (Direction.down, Direction.right)
+        if vertical:
+            table, lines = self.col_table, self.cols
+            board, line_bits = self.transpose(board), self.col_bits
+        else:
+            table, lines = self.row_table, self.rows
+            line_bits = self.row_bits
+        line_mask = (1 << line_bits) - 1
+
+        grid_actions = []
+        for line_idx in range(lines):
+            line = (board >> (line_idx * line_bits)) & line_mask
+            for action, old, new in table.actions[(line, reverse)]:
+                if vertical:
+                    old, new = Position(old, line_idx), Position(new, line_idx)
+                else:
+                    old, new = Position(line_idx, old), Position(line_idx, new)
+                grid_actions.append(GridAction(action, new, old))
+        return grid_actions
+
+
+def layout(rows=4, cols=4, bits=None, base=2):
+    key = (rows, cols, bits or lane_bits(rows, cols), base)
+    if key not in _layouts:
+        _layouts[key] = Layout(*key)
+    return _layouts[key]
+
+
+class BitGrid(object):
+    """A Grid stored as a packed int, with the same interface as Grid."""
+
+    def __init__(self, rows=4, cols=4, base=2, board=0, bits=None,
+                 Tile=Tile, rng=random):
+        self.layout = layout(rows, cols, bits, base)
+        self.board = board
+        self.Tile = Tile
+        self.rng = rng
+
+    @classmethod
+    def from_grid(cls, grid, bits=None):
+        base = 2
+        for tile in filter(None, (t for row in grid for t in row)):
+            base = tile.base
+            break
+
+        bit_grid = cls(len(grid), len(grid[0]), base=base, bits=bits)
+        bit_grid.board = bit_grid.layout.from_exponents(
+            [[tile.exponent if tile else 0 for tile in row] for row in grid])
+        return bit_grid
+
+    @property
+    def base(self):
+        return self.layout.base
+
+    def copy(self):
+        return type(self)(self.layout.rows, self.layout.cols, self.base,
+                          self.board, self.layout.bits, self.Tile, self.rng)
+
+    def _tile(self, exponent):
+        return tile_cache(self.Tile)[self.base, exponent] if exponent \
+            else None
+
+    def _row(self, row_idx):
+        layout = self.layout
+        line = (self.board >> (row_idx * layout.row_bits)) & layout.row_mask
+        return [self._tile(exponent)
+                for exponent in layout.row_table.unpack(line)]
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._row(row_idx)
+                    for row_idx in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("row index out of range")
+        return self._row(item)
+
+    def __len__(self):
+        return self.layout.rows
+
+    def __eq__(self, other):
+        return (isinstance(other, BitGrid) and self.board == other.board and
+                self.layout is other.layout)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return "BitGrid(rows={}, cols={})".format(self.layout.rows,
+                                                  self.layout.cols)
+
+    @property
+    def highest_tile(self):
+        return self._tile(self.layout.highest_exponent(self.board))
+
+    @property
+    def possible_moves(self):
+        return self.layout.possible_moves(self.board)
+
+    def spawn_tile(self, row=None, column=None, apply=True, exponent=1):
+        empty_tiles = [(row_idx, col_idx) for row_idx, col_idx
+                       in self.layout.empty_cells(self.board)
+                       if (row is None or row_idx == row) and
+                       (column is None or col_idx == column)]
+
+        if len(empty_tiles) == 0:
+            raise SpawnTileError("no empty tiles")
+
+        row, column = self.rng.choice(empty_tiles)
+
+        if apply:
+            self.board = self.layout.set(self.board, row, column, exponent)
+
+        return GridAction(Actions.spawn, Position(row, column))
+
+    def canonical(self):
+        """The smallest packed board of the rotations and reflections of the
+        board, and the Symmetry that maps the board onto it.
+        """
+        from .symmetry import board_symmetry
+        return board_symmetry(self.layout).canonical(self.board)
+
+    def shifted(self, direction):
+        """Return the packed board after a move and the score it earned."""
+        return self.layout.shift(self.board, direction)
+
+    def move(self, direction, apply=True):
+        actions = self.layout.actions(self.board, direction)
+        if apply and actions:
+            self.board = self.layout.shift(self.board, direction)[0]
+        return actions
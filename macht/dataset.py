@@ -0,0 +1,254 @@
+"""(state, action, reward) datasets of played games, written with NumPy.
+
+Transitions are generated one move at a time, from self-play or from
+binary saves (see macht.save.MoveLog), so no game is held in memory. They
+are written in shards of `chunk_size` transitions, every column of a shard
+in its own .npy file that np.load can memory-map::
+
+    python -m macht.dataset data/ 4x4 --games 1000 --augment
+
+    >>> for boards, directions, rewards, next_boards in read_shards('data'):
+    ...     train(boards, directions)
+"""
+import os
+import sys
+import json
+import random
+import argparse
+from collections import namedtuple
+from functools import partial
+
+import numpy as np
+
+from .game import move_score, step
+from .grid import Direction, Grid
+from .history import grid_exponents
+from .options import grid_dimension
+from .save import atomic_write, make_dirs, read_log, read_start
+from .symmetry import symmetries, transform_cells
+from .tile import Tile
+
+# the exponents of a board before a move (row by row, 0 for empty cells),
+# the Direction, the score of the move and the board after its spawn
+Transition = namedtuple('Transition', "board direction reward next_board")
+
+columns = (('boards', np.uint8), ('directions', np.uint8),
+           ('rewards', np.int64), ('next_boards', np.uint8))
+
+
+def game_transitions(seed=None, rows=4, cols=4, base=2, player=None,
+                     max_moves=None):
+    """Play a game with a random.Random(seed) like macht.selfplay, yielding
+    its transitions. Without a player random possible moves are made.
+    """
+    grid = Grid(rows, cols, Tile=partial(Tile, base=base),
+                rng=random.Random(seed))
+    grid.spawn_tile()
+    grid.spawn_tile()
+    rng, moves = grid.rng, 0
+    board = grid_exponents(grid)
+
+    while max_moves is None or moves < max_moves:
+        if player:
+            direction = player.best_move(grid)
+        else:
+            possible_moves = grid.possible_moves
+            direction = rng.choice(possible_moves) if possible_moves else None
+        if direction is None:
+            break
+
+        grid_step = step(grid, direction)
+        next_board = grid_exponents(grid)
+        yield Transition(board, direction, grid_step.score, next_board)
+        board, moves = next_board, moves + 1
+
+
+def log_transitions(filename):
+    """Yield the transitions of the moves of a binary save, of all its
+    grids in the order they were made.
+    """
+    state, moves = read_log(filename)
+    grids = []
+    for grid_state in state['grids']:
+        grid = Grid(grid_state['rows'], grid_state['cols'])
+        for tile in grid_state['tiles']:
+            grid[tile['row']][tile['column']] = grid.make_tile(
+                base=grid_state['base'], exponent=tile['exponent'])
+        grids.append(grid)
+
+    boards = [grid_exponents(grid) for grid in grids]
+    for grid_idx, direction, row, column, exponent, _ in moves:
+        grid, direction = grids[grid_idx], Direction(direction)
+        actions = grid.move(direction)
+        reward = move_score(grid, actions)
+        grid[row][column] = grid.make_tile(
+            base=state['grids'][grid_idx]['base'], exponent=exponent)
+
+        next_board = grid_exponents(grid)
+        yield Transition(boards[grid_idx], direction, reward, next_board)
+        boards[grid_idx] = next_board
+
+
+def log_dimensions(filenames):
+    """The (rows, cols) of the grids of binary saves, None without grids.
+    A shard holds boards of one size, so a ValueError is raised for grids
+    of different sizes.
+    """
+    sizes = set((grid_state['rows'], grid_state['cols'])
+                for filename in filenames
+                for grid_state in read_start(filename)['grids'])
+    if len(sizes) > 1:
+        raise ValueError("grids of sizes {}".format(', '.join(
+            '{}x{}'.format(*size) for size in sorted(sizes))))
+    return sizes.pop() if sizes else None
+
+
+def augment(transitions, rows, cols):
+    """Yield every transition under every symmetry of a rows by cols board
+    (8 for square boards, 4 otherwise), the direction mapped to match.
+    """
+    board_symmetries = symmetries(rows, cols)
+    for transition in transitions:
+        for symmetry in board_symmetries:
+            yield Transition(
+                transform_cells(transition.board, rows, cols, symmetry),
+                symmetry.direction(transition.direction), transition.reward,
+                transform_cells(transition.next_board, rows, cols, symmetry))
+
+
+class ShardWriter(object):
+    """Writes transitions of boards of `cells` cells to directory, in shards
+    of chunk_size transitions: prefix-00000.boards.npy, .directions.npy,
+    .rewards.npy and .next_boards.npy, and an index.json listing them.
+    """
+
+    def __init__(self, directory, cells, chunk_size=100000, prefix='shard'):
+        self.directory, self.cells = directory, cells
+        self.chunk_size, self.prefix = chunk_size, prefix
+        self.shards, self.count = [], 0
+        self._fill = 0
+        self._chunk = dict(
+            (name, np.zeros((chunk_size, cells) if name.endswith('boards')
+                            else chunk_size, dtype=dtype))
+            for name, dtype in columns)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+
+    def write(self, transition):
+        if len(transition.board) != self.cells:
+            raise ValueError("expected boards of {} cells".format(self.cells))
+
+        chunk, fill = self._chunk, self._fill
+        chunk['boards'][fill] = transition.board
+        chunk['directions'][fill] = transition.direction.value
+        chunk['rewards'][fill] = transition.reward
+        chunk['next_boards'][fill] = transition.next_board
+        self._fill += 1
+        if self._fill == self.chunk_size:
+            self.flush()
+
+    def write_all(self, transitions):
+        for transition in transitions:
+            self.write(transition)
+
+    def flush(self):
+        """Write the transitions so far as a (possibly short) shard."""
+        if not self._fill:
+            return
+
+        name = '{}-{:05d}'.format(self.prefix, len(self.shards))
+        for column, _ in columns:
+            filename = os.path.join(self.directory,
+                                    '{}.{}.npy'.format(name, column))
+            make_dirs(filename)
+            np.save(filename, self._chunk[column][:self._fill])
+        self.shards.append({'name': name, 'count': self._fill})
+        self.count += self._fill
+        self._fill = 0
+
+    def close(self):
+        self.flush()
+        index = {'cells': self.cells, 'count': self.count,
+                 'columns': [column for column, _ in columns],
+                 'shards': self.shards}
+        atomic_write(os.path.join(self.directory, 'index.json'),
+                     json.dumps(index, indent=2).encode('utf-8'))
+
+
+def read_shards(directory, mmap_mode='r'):
+    """Yield the (boards, directions, rewards, next_boards) arrays of every
+    shard listed in directory's index.json, memory-mapped by default.
+    """
+    with open(os.path.join(directory, 'index.json')) as index_file:
+        index = json.load(index_file)
+    for shard in index['shards']:
+        yield tuple(np.load(os.path.join(directory, '{}.{}.npy'.format(
+            shard['name'], column)), mmap_mode=mmap_mode)
+            for column in index['columns'])
+
+
+parser = argparse.ArgumentParser(
+    description="Write the (board, direction, reward, next board) "
+    "transitions of self-play games or saved games as .npy shards.")
+parser.add_argument('directory', metavar='DIRECTORY',
+                    help="directory to write the shards and index.json to")
+parser.add_argument('grid_dims', metavar='GRID_DIMENSIONS',
+                    type=grid_dimension, nargs='?',
+                    default={'rows': 4, 'cols': 4},
+                    help="dimensions of the grid, default: '4x4' (with "
+                    "--log those of the saved grids)")
+parser.add_argument('-l', '--log', metavar='SAVE_FILE', action='append',
+                    default=[], help="export the moves of a binary save "
+                    "(ending in .macht) instead of playing, can be repeated")
+parser.add_argument('-n', '--games', metavar='N', type=int, default=1,
+                    help="number of games to play (default: 1)")
+parser.add_argument('-s', '--seed', metavar='SEED', type=int, default=0,
+                    help="seed of the first game, game i uses SEED + i")
+parser.add_argument('-b', '--base', metavar='N', type=int, default=2,
+                    help="base value of all tiles")
+parser.add_argument('-p', '--player', choices=('expectimax', 'random'),
+                    default='random', help="who makes the moves")
+parser.add_argument('-d', '--depth', metavar='N', type=int, default=2,
+                    help="search depth of the expectimax player")
+parser.add_argument('-c', '--chunk-size', metavar='N', type=int,
+                    default=100000, help="transitions per shard "
+                    "(default: 100000)")
+parser.add_argument('-a', '--augment', action='store_true',
+                    help="also write every transition rotated and reflected")
+
+
+def main(args=None):
+    opts = parser.parse_args(args if args is not None else sys.argv[1:])
+    rows, cols = opts.grid_dims['rows'], opts.grid_dims['cols']
+
+    if opts.log:
+        try:  # the boards of saves are of their grids' size
+            rows, cols = log_dimensions(opts.log) or (rows, cols)
+        except ValueError as err:
+            parser.error(str(err))
+        transitions = (transition for filename in opts.log
+                       for transition in log_transitions(filename))
+    else:
+        from .selfplay import make_player
+        player = make_player(opts.player, opts.depth)
+        transitions = (transition for seed in range(opts.seed,
+                                                    opts.seed + opts.games)
+                       for transition in game_transitions(
+                           seed, rows, cols, opts.base, player))
+    if opts.augment:
+        transitions = augment(transitions, rows, cols)
+
+    with ShardWriter(opts.directory, rows * cols, opts.chunk_size) as writer:
+        writer.write_all(transitions)
+    sys.stderr.write("{} transitions in {} shards written to {}\n".format(
+        writer.count, len(writer.shards), opts.directory))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""Exact values of every reachable state of small boards, in a file that is
+searched through mmap instead of being loaded.
+
+A state is a board after a spawn, stored in its canonical orientation (see
+macht.symmetry). Its value is the expected score still to be made with
+optimal play, or with a target tile the probability to make that tile.
+Build a table with::
+
+    python -m macht.endgame 2x3 --output endgame-2x3.db
+
+2x2 and 2x3 boards take seconds. 2x4 boards have 5 million states and take
+about 20 minutes and 1 GB of memory; 3x3 boards did not finish in 25
+minutes. A record holds a board of at most 64 bits, so boards of 15 or more
+cells (with 5 bit lanes) are not supported.
+"""
+import sys
+import mmap
+import struct
+import argparse
+from time import time
+
+from .bitboard import BitGrid, layout as bit_layout
+from .grid import Direction, spawn_distribution
+from .options import grid_dimension
+from .symmetry import board_symmetry
+
+MAGIC = b'MACHTEDB'
+VERSION = 1
+
+# magic, version, rows, cols, lane bits, base, target exponent (0 for the
+# expected score), number of records
+header_struct = struct.Struct('<8sBBBBHBQ')
+# canonical board, value, best direction in the canonical orientation (0
+# when the game is over)
+record_struct = struct.Struct('<QdB')
+board_struct = struct.Struct('<Q')
+
+
+def spawns(layout, board):
+    """Yield the boards after a spawn on board, with their probabilities."""
+    bits, mask = layout.bits, layout.lane_mask
+    empty = [cell * bits for cell in range(layout.cells)
+             if not (board >> (cell * bits)) & mask]
+    for offset in empty:
+        for exponent, probability in spawn_distribution:
+            yield board | (exponent << offset), probability / len(empty)
+
+
+def _tile_sum(layout, board):
+    bits, mask = layout.bits, layout.lane_mask
+    exponents = ((board >> (cell * bits)) & mask
+                 for cell in range(layout.cells))
+    return sum(1 << exponent for exponent in exponents if exponent)
+
+
+def reachable(layout, target=None):
+    """The canonical boards of every state a game can reach, by tile sum.
+
+    With a target exponent, states after making the target are left out.
+    """
+    canonical = board_symmetry(layout).canonical_board
+    by_sum, seen = {}, set()
+    pending = [canonical(board) for start, _ in spawns(layout, 0)
+               for board, _ in spawns(layout, start)]
+    while pending:
+        board = pending.pop()
+        if board in seen:
+            continue
+        seen.add(board)
+        by_sum.setdefault(_tile_sum(layout, board), []).append(board)
+
+        for direction in Direction:
+            moved = layout.shift(board, direction)[0]
+            if moved == board or (target and
+                                  layout.highest_exponent(moved) >= target):
+                continue
+            for spawned, _ in spawns(layout, moved):
+                spawned = canonical(spawned)
+                if spawned not in seen:
+                    pending.append(spawned)
+    return by_sum
+
+
+def solve(layout, target=None):
+    """Return sorted (canonical board, value, best direction) records of all
+    reachable states, the direction None when no move is left.
+
+    Every spawn raises the tile sum, so states are solved from the highest
+    tile sum down and the values of their successors are always known.
+    """
+    canonical = board_symmetry(layout).canonical_board
+    values, records = {}, []
+    by_sum = reachable(layout, target)
+    for tile_sum in sorted(by_sum, reverse=True):
+        for board in by_sum[tile_sum]:
+            best, best_direction = 0.0, None
+            for direction in Direction:
+                moved, score = layout.shift(board, direction)
+                if moved == board:
+                    continue
+                if target and layout.highest_exponent(moved) >= target:
+                    value = 1.0
+                else:
+                    value = 0.0 if target else float(score)
+                    for spawned, probability in spawns(layout, moved):
+                        value += probability * values[canonical(spawned)]
+                if best_direction is None or value > best:
+                    best, best_direction = value, direction
+            values[board] = best
+            records.append((board, best, best_direction))
+    records.sort(key=lambda record: record[0])
+    return records
+
+
+def write_table(filename, layout, records, target=None):
+    from .save import atomic_write
+
+    data = bytearray(header_struct.pack(
+        MAGIC, VERSION, layout.rows, layout.cols, layout.bits, layout.base,
+        target or 0, len(records)))
+    for board, value, direction in records:
+        data += record_struct.pack(board, value,
+                                   direction.value if direction else 0)
+    atomic_write(filename, bytes(data))
+
+
+class EndgameTable(object):
+    """A table written by write_table, searched through a read-only mmap.
+
+    Nothing but the header is read up front: lookups binary search the
+    sorted records in the mapping, and every process that opens the file
+    shares its pages in the page cache. It can be used as a player (e.g.
+    with macht.selfplay.play_game) through best_move and best_moves.
+    """
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as table_file:
+            self._map = mmap.mmap(table_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+
+        (magic, version, rows, cols, bits, base, target,
+         self._count) = header_struct.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError("not a version {} macht endgame table".format(
+                VERSION))
+        self.layout = bit_layout(rows, cols, bits, base)
+        self.target = target or None
+        self._symmetry = board_symmetry(self.layout)
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._map.close()
+
+    def _find(self, board):
+        lo, hi = 0, self._count
+        data, size = self._map, record_struct.size
+        while lo < hi:
+            middle = (lo + hi) // 2
+            offset = header_struct.size + middle * size
+            found = board_struct.unpack_from(data, offset)[0]
+            if found == board:
+                return record_struct.unpack_from(data, offset)
+            elif found < board:
+                lo = middle + 1
+            else:
+                hi = middle
+        return None
+
+    def lookup(self, board):
+        """Return the value of a packed board and its best direction (None
+        when no move is left), or None when the state is not reachable.
+        """
+        canonical, symmetry = self._symmetry.canonical(board)
+        record = self._find(canonical)
+        if record is None:
+            return None
+
+        _, value, direction = record
+        return value, (symmetry.inverse_direction(Direction(direction))
+                       if direction else None)
+
+    def _board(self, grid):
+        if not isinstance(grid, BitGrid):
+            grid = BitGrid.from_grid(grid, bits=self.layout.bits)
+        if grid.layout is not self.layout:
+            raise ValueError("table of {}x{} boards".format(
+                self.layout.rows, self.layout.cols))
+        return grid.board
+
+    def value(self, grid):
+        """The value of a Grid or BitGrid, None if not reachable."""
+        found = self.lookup(self._board(grid))
+        return found[0] if found else None
+
+    def best_move(self, grid, time_budget=None):
+        found = self.lookup(self._board(grid))
+        return found[1] if found else None
+
+    def best_moves(self, grids, time_budget=None):
+        return [self.best_move(grid) for grid in grids]
+
+
+parser = argparse.ArgumentParser(
+    description="Compute the exact value of every reachable state of a small "
+    "board and write them to a table for macht.endgame.EndgameTable.")
+parser.add_argument('grid_dims', metavar='GRID_DIMENSIONS',
+                    type=grid_dimension, help="dimensions of the grid, e.g. "
+                    "'2x3'")
+parser.add_argument('-o', '--output', metavar='FILE', default=None,
+                    help="table to write (default: endgame-RxC.db)")
+parser.add_argument('-b', '--base', metavar='N', type=int, default=2,
+                    help="base value of all tiles")
+parser.add_argument('-t', '--target', metavar='EXPONENT', type=int,
+                    default=None, help="store the probability to make a tile "
+                    "of base ** EXPONENT instead of the expected score")
+
+
+def main(args=None):
+    opts = parser.parse_args(args if args is not None else sys.argv[1:])
+    rows, cols = opts.grid_dims['rows'], opts.grid_dims['cols']
+    layout = bit_layout(rows, cols, base=opts.base)
+    if layout.cells * layout.bits > board_struct.size * 8:
+        parser.error("boards of at most {} bits are supported, {}x{} boards "
+                     "take {}".format(board_struct.size * 8, rows, cols,
+                                      layout.cells * layout.bits))
+    output = opts.output or 'endgame-{}x{}.db'.format(rows, cols)
+
+    start = time()
+    records = solve(layout, opts.target)
+    write_table(output, layout, records, opts.target)
+    sys.stderr.write("{} states written to {} in {:.1f}s\n".format(
+        len(records), output, time() - start))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+from collections import namedtuple
+
+from .grid import Actions, spawn_exponent
+
+# what a move did to one grid: its actions (the spawn last), the score it
+# earned and the exponent of the spawned tile
+GridStep = namedtuple('GridStep', "actions score exponent")
+
+
+def move_score(grid, actions):
+    """The score of the merges in the actions of a move made on grid."""
+    score = 0
+    for action in actions:
+        if action.type is Actions.merge:
+            score += grid[action.new.row][action.new.column].value
+    return score
+
+
+def step(grid, direction):
+    """Move a grid and spawn a tile like the game does, without drawing
+    anything. Returns a GridStep, None when nothing moved.
+    """
+    actions = grid.move(direction)
+    if not actions:
+        return None
+
+    score = move_score(grid, actions)
+    exponent = spawn_exponent(grid.rng)
+    actions.append(grid.spawn_tile(exponent=exponent))
+    return GridStep(actions, score, exponent)
+
+
+def step_all(grids, directions):
+    """Step every grid that has a direction, one after the other, return
+    their GridSteps (None for grids that did not move).
+    """
+    return [step(grid, direction) if direction else None
+            for grid, direction in zip(grids, directions)]
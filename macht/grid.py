@@ -1,10 +1,10 @@
 import random
 from collections import namedtuple
-from itertools import product, chain
+from itertools import chain
 
 from enum import Enum
 
-from .tile import Tile
+from .tile import Tile, tile_cache
 
 Direction = Enum('Direction', "up left down right")
 
@@ -12,6 +12,13 @@ Position = namedtuple('Position', "row column")
 
 Actions = Enum('Actions', "spawn move merge")
 
+# exponents of spawned tiles with their probabilities
+spawn_distribution = ((1, 0.9), (2, 0.1))
+
+
+def spawn_exponent(rng=random):
+    return 2 if rng.random() > 0.9 else 1
+
 
 class SpawnTileError(Exception):
     pass
@@ -29,21 +36,170 @@ class GridAction(object):
                 ", old=" + str(self.old) if self.old else "")
 
 
+class CellSet(object):
+    """A set of the cells 0 to size - 1 that finds its index-th smallest
+    cell in O(log size): a Fenwick tree of the number of cells it holds.
+    """
+
+    def __init__(self, size=0):
+        self.size, self._count = size, 0
+        self._tree = [0] * (size + 1)
+        self._member = bytearray(size)
+        self._top = 1 << (size.bit_length() - 1) if size else 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, cell):
+        return bool(self._member[cell])
+
+    def __iter__(self):
+        return (cell for cell in range(self.size) if self._member[cell])
+
+    def _update(self, cell, delta):
+        tree, idx = self._tree, cell + 1
+        while idx <= self.size:
+            tree[idx] += delta
+            idx += idx & -idx
+
+    def add(self, cell):
+        if not self._member[cell]:
+            self._member[cell] = 1
+            self._count += 1
+            self._update(cell, 1)
+
+    def remove(self, cell):
+        if not self._member[cell]:
+            raise KeyError(cell)
+        self._member[cell] = 0
+        self._count -= 1
+        self._update(cell, -1)
+
+    def nth(self, index):
+        """The index-th smallest cell, counting from 0."""
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        tree, cell, step = self._tree, 0, self._top
+        while step:
+            if cell + step <= self.size and tree[cell + step] <= index:
+                cell += step
+                index -= tree[cell]
+            step >>= 1
+        return cell
+
+
+class Row(list):
+    """A row of a Grid, which keeps the grid's bookkeeping up to date when
+    one of its cells is assigned.
+    """
+
+    def __init__(self, cells, grid, index):
+        super(Row, self).__init__(cells)
+        self.grid, self.index = grid, index
+
+    def __setitem__(self, item, value):
+        if isinstance(item, slice):
+            list.__setitem__(self, item, value)
+            self.grid._recount()
+        else:
+            self.grid._set_cell(self.index, item, value)
+
+    def __delitem__(self, item):
+        list.__delitem__(self, item)
+        self.grid._recount()
+
+
 class Grid(object):
     _grid = [[]]
 
-    def __init__(self, rows=4, cols=4, Tile=Tile):
-        self._grid = [[None for _ in range(cols)] for _ in range(rows)]
+    def __init__(self, rows=4, cols=4, Tile=Tile, rng=random):
+        self._grid = [Row([None for _ in range(cols)], self, row_idx)
+                      for row_idx in range(rows)]
         self.Tile = Tile
+        self.rng = rng
+        self._tiles = tile_cache(Tile)
+        self._recount()
 
     def __getitem__(self, item):
         return self._grid.__getitem__(item)
 
     def __setitem__(self, item, value):
-        return self._grid.__setitem__(item, value)
+        self._grid.__setitem__(item, value)
+        self._recount()
 
     def __delitem__(self, item):
-        return self._grid.__delitem__(item)
+        self._grid.__delitem__(item)
+        self._recount()
+
+    def _recount(self):
+        """Rebuild the empty cells and the count of equal neighbours."""
+        for row_idx, row in enumerate(self._grid):
+            if not isinstance(row, Row) or row.grid is not self:
+                self._grid[row_idx] = row = Row(row, self, row_idx)
+            row.index = row_idx
+
+        cols = len(self._grid[0]) if self._grid else 0
+        self._empty = CellSet(len(self._grid) * cols)
+        self._equal_pairs = 0
+        for row_idx, row in enumerate(self._grid):
+            for col_idx, tile in enumerate(row):
+                if not tile:
+                    self._empty.add(row_idx * cols + col_idx)
+                elif (col_idx + 1 < len(row) and tile == row[col_idx + 1]):
+                    self._equal_pairs += 1
+                if (tile and row_idx + 1 < len(self._grid) and
+                        tile == self._grid[row_idx + 1][col_idx]):
+                    self._equal_pairs += 1
+
+    def _equal_pairs_around(self, cells):
+        """Count the pairs of equal neighbours with a tile in `cells`."""
+        grid, cols, count = self._grid, len(self._grid[0]), 0
+        rows = len(grid)
+        for cell in cells:
+            row, col = divmod(cell, cols)
+            tile = grid[row][col]
+            if not tile:
+                continue
+            if col + 1 < cols and tile == grid[row][col + 1]:
+                count += 1
+            if row + 1 < rows and tile == grid[row + 1][col]:
+                count += 1
+            if col > 0 and cell - 1 not in cells and \
+                    tile == grid[row][col - 1]:
+                count += 1
+            if row > 0 and cell - cols not in cells and \
+                    tile == grid[row - 1][col]:
+                count += 1
+        return count
+
+    def _set_cell(self, row, column, tile):
+        grid_row = self._grid[row]
+        # an IndexError or TypeError (e.g. for a slice) before any
+        # bookkeeping changes, and negative columns count from the end
+        column = range(len(grid_row))[column]
+        if not isinstance(column, int):
+            raise TypeError("cells are assigned one at a time")
+        old, cell = grid_row[column], row * len(grid_row) + column
+        self._equal_pairs -= self._equal_pairs_around((cell,))
+        list.__setitem__(grid_row, column, tile)
+        self._equal_pairs += self._equal_pairs_around((cell,))
+
+        if bool(old) != bool(tile):
+            if tile:
+                self._empty.remove(cell)
+            else:
+                self._empty.add(cell)
+
+    @property
+    def empty_count(self):
+        return len(self._empty)
+
+    @property
+    def has_moves(self):
+        """Whether any direction would move or merge a tile, in O(1)."""
+        if self._equal_pairs > 0:
+            return True
+        return 0 < len(self._empty) < len(self._grid) * len(self._grid[0])
 
     def __len__(self):
         return len(self._grid)
@@ -61,27 +217,43 @@ class Grid(object):
 
     @property
     def possible_moves(self):
-        return [dir for dir in Direction if self.move(dir, apply=False)]
+        return [dir for dir in Direction if self.can_move(dir)]
 
     def spawn_tile(self, row=None, column=None, apply=True, **kwargs):
         rows, cols = len(self), len(self[0])
-        empty_tiles = []
-        for row_idx in range(row or 0, row + 1 if row is not None else rows):
-            for col_idx in range(
-                    column or 0, column + 1 if column is not None else cols):
-                if not self[row_idx][col_idx]:
-                    empty_tiles.append((row_idx, col_idx))
-
-        if len(empty_tiles) == 0:
-            raise SpawnTileError("no empty tiles")
-
-        row, column = random.choice(empty_tiles)
+        if row is None and column is None:
+            if not self._empty:
+                raise SpawnTileError("no empty tiles")
+            # like rng.choice on the empty cells in row-major order, so
+            # that the cell only depends on the board and the rng (as with
+            # BitGrid)
+            row, column = divmod(self._empty.nth(
+                self.rng.randrange(len(self._empty))), cols)
+        else:
+            empty_tiles = []
+            for row_idx in range(row or 0,
+                                 row + 1 if row is not None else rows):
+                for col_idx in range(column or 0, column + 1
+                                     if column is not None else cols):
+                    if not self[row_idx][col_idx]:
+                        empty_tiles.append((row_idx, col_idx))
+
+            if len(empty_tiles) == 0:
+                raise SpawnTileError("no empty tiles")
+
+            row, column = self.rng.choice(empty_tiles)
 
         if apply:
-            self[row][column] = self.Tile(**kwargs)
+            self[row][column] = self.make_tile(**kwargs)
 
         return GridAction(Actions.spawn, Position(row, column))
 
+    def make_tile(self, **kwargs):
+        """The shared tile equal to self.Tile(**kwargs), to place on this
+        grid.
+        """
+        return self._tiles.intern(self.Tile(**kwargs))
+
     def move_tile(self, old, new, apply=True):
         old, new = Position(*old), Position(*new)
 
@@ -99,93 +271,148 @@ class Grid(object):
             raise ValueError
 
         if apply:
-            self[new.row][new.column].exponent += 1
+            tile = self[new.row][new.column]
+            self[new.row][new.column] = self._tiles[tile.base,
+                                                    tile.exponent + 1]
             self[old.row][old.column] = None
 
         return GridAction(Actions.merge, new, old)
 
-    def move_vertical(self, direction, apply=True):
-        row_idx_iter = range(len(self))
-        if direction is Direction.down:
-            row_idx_iter = reversed(row_idx_iter)
-
-        for col_idx, row_idx in product(range(len(self[0])), row_idx_iter):
-            if direction is Direction.down:
-                pos_in_column = range(row_idx - 1, -1, -1)
-            else:
-                pos_in_column = range(row_idx + 1, len(self))
-
-            for row_pos in pos_in_column:
-                if self[row_idx][col_idx]:  # Tile occupied, maybe merge
-                    if self[row_pos][col_idx]:
-                        if self[row_idx][col_idx] == self[row_pos][col_idx]:
-                            old = Position(row_pos, col_idx)
-                            new = Position(row_idx, col_idx)
+    def _lines(self, direction):
+        """Yield the cell indices (row * cols + column) of every line in the
+        order tiles move along it, the first cell being the one they move to.
+        """
+        rows, cols = len(self), len(self[0])
+        if direction is Direction.up:
+            for col_idx in range(cols):
+                yield range(col_idx, rows * cols, cols)
+        elif direction is Direction.down:
+            for col_idx in range(cols):
+                yield range((rows - 1) * cols + col_idx, -1, -cols)
+        elif direction is Direction.left:
+            for row_idx in range(rows):
+                yield range(row_idx * cols, (row_idx + 1) * cols)
+        else:
+            for row_idx in range(rows):
+                yield range((row_idx + 1) * cols - 1, row_idx * cols - 1, -1)
+
+    def move_records(self, direction, apply=True, records=None):
+        """Like move, but without creating an object per action.
+
+        Returns records (a new list if None, e.g. an array('i') to reuse),
+        filled with three ints per action: the Actions value, the old cell and
+        the new cell, cells being numbered row * cols + column.
+        """
+        if not isinstance(direction, Direction):
+            raise TypeError
 
-                            yield self.merge_tiles(old, new, apply=apply)
+        if records is None:
+            records = []
+        else:
+            del records[:]
+
+        grid, cols, tiles = self._grid, len(self[0]), self._tiles
+        move, merge = Actions.move.value, Actions.merge.value
+        for cells in self._lines(direction):
+            line = [grid[cell // cols][cell % cols] for cell in cells]
+            length, line_start = len(line), len(records)
+
+            for target in range(length):
+                for src in range(target + 1, length):
+                    if line[target]:  # Tile occupied, maybe merge
+                        if line[src]:
+                            if line[target] == line[src]:
+                                if apply:
+                                    line[target] = tiles[
+                                        line[target].base,
+                                        line[target].exponent + 1]
+                                line[src] = None
+                                records.append(merge)
+                                records.append(cells[src])
+                                records.append(cells[target])
+                            break
+                    elif line[src]:
+                        line[target], line[src] = line[src], None
+                        records.append(move)
+                        records.append(cells[src])
+                        records.append(cells[target])
+
+                        for src_merge in range(src + 1, length):
+                            if line[src_merge]:
+                                if line[target] == line[src_merge]:
+                                    if apply:
+                                        line[target] = tiles[
+                                            line[target].base,
+                                            line[target].exponent + 1]
+                                    line[src_merge] = None
+                                    records.append(merge)
+                                    records.append(cells[src_merge])
+                                    records.append(cells[target])
+                                break
                         break
-                elif self[row_pos][col_idx]:
-                    old = Position(row_pos, col_idx)
-                    new = Position(row_idx, col_idx)
 
-                    yield self.move_tile(old, new, apply=apply)
+            if apply and len(records) > line_start:
+                pairs_before = self._equal_pairs_around(cells)
+                for cell, tile in zip(cells, line):
+                    row = grid[cell // cols]
+                    if bool(row[cell % cols]) != bool(tile):
+                        if tile:
+                            self._empty.remove(cell)
+                        else:
+                            self._empty.add(cell)
+                    list.__setitem__(row, cell % cols, tile)
+                self._equal_pairs += (self._equal_pairs_around(cells) -
+                                      pairs_before)
+
+        return records
+
+    def canonical(self):
+        """The form of the grid that is the same for all its rotations and
+        reflections, and the Symmetry that maps the grid onto it (see
+        macht.symmetry).
+        """
+        from .symmetry import canonical
+        return canonical(self)
+
+    def can_move(self, direction):
+        """Whether moving in direction would move or merge any tile."""
+        if not isinstance(direction, Direction):
+            raise TypeError
 
-                    for row_pos in pos_in_column:
-                        if self[row_pos][col_idx]:
-                            if self[row_idx][col_idx] == self[row_pos][col_idx]:
-                                old = Position(row_pos, col_idx)
+        grid, cols = self._grid, len(self[0])
+        for cells in self._lines(direction):
+            previous = grid[cells[0] // cols][cells[0] % cols]
+            for cell in cells[1:]:
+                tile = grid[cell // cols][cell % cols]
+                if tile and (not previous or previous == tile):
+                    return True
+                previous = tile
+        return False
+
+    def _actions(self, records):
+        cols = len(self[0])
+        return [GridAction(Actions(records[idx]),
+                           Position(*divmod(records[idx + 2], cols)),
+                           Position(*divmod(records[idx + 1], cols)))
+                for idx in range(0, len(records), 3)]
 
-                                yield self.merge_tiles(old, new, apply=apply)
-                            break
-                    break
+    def move_vertical(self, direction, apply=True):
+        if direction not in (Direction.up, Direction.down):
+            raise ValueError
+        return iter(self._actions(self.move_records(direction, apply)))
 
     def move_horizontal(self, direction, apply=True):
-        col_idx_iter = range(len(self[0]))
-        if direction is Direction.right:
-            col_idx_iter = reversed(col_idx_iter)
-
-        for row_idx, col_idx in product(range(len(self)), col_idx_iter):
-            if direction is Direction.right:
-                pos_in_row = range(col_idx - 1, -1, -1)
-            else:
-                pos_in_row = range(col_idx + 1, len(self[0]))
-
-            for col_pos in pos_in_row:
-                if self[row_idx][col_idx]:
-                    if self[row_idx][col_pos]:
-                        if self[row_idx][col_idx] == self[row_idx][col_pos]:
-                            old = Position(row_idx, col_pos)
-                            new = Position(row_idx, col_idx)
-
-                            yield self.merge_tiles(old, new, apply=apply)
-                        break
-                elif self[row_idx][col_pos]:
-                    old = Position(row_idx, col_pos)
-                    new = Position(row_idx, col_idx)
-
-                    yield self.move_tile(old, new, apply=apply)
-
-                    for col_pos in pos_in_row:
-                        if self[row_idx][col_pos]:
-                            if self[row_idx][col_idx] == self[row_idx][col_pos]:
-                                old = Position(row_idx, col_pos)
-
-                                yield self.merge_tiles(old, new, apply=apply)
-                            break
-                    break
+        if direction not in (Direction.left, Direction.right):
+            raise ValueError
+        return iter(self._actions(self.move_records(direction, apply)))
 
     def move(self, direction, apply=True):
-        if not isinstance(direction, Direction):
-            raise TypeError
-
-        if direction in (Direction.up, Direction.down):
-            return list(self.move_vertical(direction, apply))
-        return list(self.move_horizontal(direction, apply))
+        return self._actions(self.move_records(direction, apply))
 
     def resize(self, rows=None, cols=None):
         if rows:
             if rows < len(self):
-                del self[rows:]
+                del self._grid[rows:]
             elif rows > len(self):
                 columns = cols or len(self[0])
                 for _ in range(rows - len(self)):
@@ -194,6 +421,8 @@ class Grid(object):
         if cols:
             for row in self:
                 if cols < len(row):
-                    del row[cols:]
+                    list.__delitem__(row, slice(cols, None))
                 elif cols > len(row):
                     row.extend([None for _ in range(cols - len(row))])
+
+        self._recount()
@@ -0,0 +1,358 @@
+"""Terms of board evaluations, in a registry, combined into weighted sums.
+
+Every term (an Evaluator) scores a board as the sum of a function of each
+of its rows and columns, so a Heuristic, a weighted sum of terms, also
+scores a board line by line: with a few lookups in tables of line scores
+that are filled on first use, like the move tables of macht.bitboard, and
+for many boards at once with NumPy::
+
+    >>> heuristic = Heuristic({'empty': 270.0, 'monotonicity': -47.0})
+    >>> heuristic.evaluate(grid)  # a Grid, BitGrid or SparseGrid
+    >>> heuristic.evaluate_batch(exponents)  # (N, rows, cols) to (N,)
+
+Batches of short lines (see TABLE_LENGTH) are scored with a NumPy table of
+the score of every line, longer lines with NumPy reductions. Add a term by
+subclassing Evaluator and decorating it with `register`.
+Heuristic.times holds the seconds spent computing every term, filling
+tables and scoring batches, so `report` shows which terms cost the most.
+"""
+from collections import defaultdict
+from timeit import default_timer
+
+from .bitboard import BitGrid, LazyTable
+
+# longest lines a batch is scored with a table of all their scores for,
+# 16 ** 5 lines take 8 MB
+TABLE_LENGTH = 5
+TABLE_EXPONENTS = 16
+
+evaluators = {}
+
+
+def register(cls):
+    """Add an Evaluator class to `evaluators`, under its name."""
+    evaluators[cls.name] = cls
+    return cls
+
+
+def _numpy():
+    import numpy as np  # only needed for batches
+    return np
+
+
+class Evaluator(object):
+    """A term of an evaluation. `line` scores a list of exponents (0 for
+    empty cells), `lines` every row of an (M, L) array of them.
+    """
+    name = None
+
+    def line(self, line):
+        raise NotImplementedError
+
+    def lines(self, lines):
+        raise NotImplementedError
+
+
+@register
+class Empty(Evaluator):
+    """The number of empty cells."""
+    name = 'empty'
+
+    def line(self, line):
+        return line.count(0)
+
+    def lines(self, lines):
+        return (lines == 0).sum(axis=1)
+
+
+@register
+class Merges(Evaluator):
+    """Merge potential: the number of tiles in runs of equal tiles, empty
+    cells between them skipped.
+    """
+    name = 'merges'
+
+    def line(self, line):
+        merges = counter = previous = 0
+        for exponent in line:
+            if exponent == 0:
+                continue
+            if previous == exponent:
+                counter += 1
+            elif counter > 0:
+                merges += 1 + counter
+                counter = 0
+            previous = exponent
+        if counter > 0:
+            merges += 1 + counter
+        return merges
+
+    def lines(self, lines):
+        np = _numpy()
+        count = lines.shape[0]
+        merges, counter = np.zeros(count), np.zeros(count)
+        previous = np.zeros(count, dtype=lines.dtype)
+        for idx in range(lines.shape[1]):
+            exponent = lines[:, idx]
+            tile = exponent != 0
+            same = tile & (exponent == previous)
+            ended = tile & ~same & (counter > 0)
+            merges += np.where(ended, 1 + counter, 0)
+            counter = np.where(same, counter + 1, np.where(ended, 0, counter))
+            previous = np.where(tile, exponent, previous)
+        return merges + np.where(counter > 0, 1 + counter, 0)
+
+
+@register
+class Monotonicity(Evaluator):
+    """How far a line is from being monotonic: the smaller of the total
+    increase and the total decrease of exponent ** power along it.
+    """
+    name = 'monotonicity'
+
+    def __init__(self, power=4.0):
+        self.power = power
+
+    def line(self, line):
+        mono_left = mono_right = 0
+        for left, right in zip(line, line[1:]):
+            if left > right:
+                mono_left += left ** self.power - right ** self.power
+            else:
+                mono_right += right ** self.power - left ** self.power
+        return min(mono_left, mono_right)
+
+    def lines(self, lines):
+        np = _numpy()
+        powers = lines.astype(np.float64) ** self.power
+        steps = powers[:, 1:] - powers[:, :-1]
+        return np.minimum(np.clip(-steps, 0, None).sum(axis=1),
+                          np.clip(steps, 0, None).sum(axis=1))
+
+
+@register
+class Smoothness(Evaluator):
+    """The total difference between the exponents of neighbouring tiles,
+    empty cells between them skipped.
+    """
+    name = 'smoothness'
+
+    def line(self, line):
+        tiles = [exponent for exponent in line if exponent]
+        return sum(abs(left - right) for left, right in zip(tiles, tiles[1:]))
+
+    def lines(self, lines):
+        np = _numpy()
+        count = lines.shape[0]
+        total = np.zeros(count)
+        previous = np.zeros(count, dtype=np.float64)
+        for idx in range(lines.shape[1]):
+            exponent = lines[:, idx].astype(np.float64)
+            tile = exponent != 0
+            total += np.where(tile & (previous != 0),
+                              np.abs(exponent - previous), 0)
+            previous = np.where(tile, exponent, previous)
+        return total
+
+
+@register
+class Corner(Evaluator):
+    """exponent ** power of the tiles at both ends of a line: summed over
+    rows and columns, tiles in corners count twice, on edges once.
+    """
+    name = 'corner'
+
+    def __init__(self, power=1.0):
+        self.power = power
+
+    def line(self, line):
+        return line[0] ** self.power + line[-1] ** self.power
+
+    def lines(self, lines):
+        np = _numpy()
+        ends = lines[:, [0, -1]].astype(np.float64)
+        return (ends ** self.power).sum(axis=1)
+
+
+@register
+class Sum(Evaluator):
+    """The sum of exponent ** power, large tiles weighing heavily."""
+    name = 'sum'
+
+    def __init__(self, power=3.5):
+        self.power = power
+
+    def line(self, line):
+        return sum(exponent ** self.power for exponent in line)
+
+    def lines(self, lines):
+        np = _numpy()
+        return (lines.astype(np.float64) ** self.power).sum(axis=1)
+
+
+def _exponent_rows(grid):
+    return [[tile.exponent if tile else 0 for tile in row] for row in grid]
+
+
+class Heuristic(object):
+    """The weighted sum of registered terms, plus `constant` for every row
+    and column. weights map term names onto weights, options onto the
+    keyword arguments of their Evaluator (e.g. {'sum': {'power': 3.0}}).
+    """
+
+    def __init__(self, weights, constant=0.0, options=None):
+        unknown = set(weights) - set(evaluators)
+        if unknown:
+            raise ValueError("unknown terms: {}".format(
+                ', '.join(sorted(unknown))))
+        self.weights, self.constant = dict(weights), constant
+        self.options = dict(options or {})
+        self.terms = [(name, evaluators[name](**self.options.get(name, {})),
+                       weight)
+                      for name, weight in sorted(self.weights.items())
+                      if weight]
+        self.times = defaultdict(float)  # term name: seconds
+
+        self._lines = LazyTable(lambda line: self.line(list(line)))
+        self._tables = {}  # bitboard Layout: row and column score tables
+        self._batch_tables = {}  # line length: NumPy table of line scores
+
+    def __reduce__(self):  # the tables hold lambdas, rebuild them instead
+        return type(self), (self.weights, self.constant, self.options)
+
+    def __repr__(self):
+        return '{}({!r}, constant={!r}, options={!r})'.format(
+            type(self).__name__, self.weights, self.constant, self.options)
+
+    def to_dict(self):
+        """The keyword arguments to make this Heuristic again."""
+        return {'weights': self.weights, 'constant': self.constant,
+                'options': self.options}
+
+    def line(self, line):
+        """Score a list of exponents."""
+        value, times = self.constant, self.times
+        for name, term, weight in self.terms:
+            start = default_timer()
+            value += weight * term.line(line)
+            times[name] += default_timer() - start
+        return value
+
+    def tables(self, layout):
+        """The (rows, columns) LazyTables scoring the packed lines of a
+        bitboard Layout, shared by everything evaluating its boards.
+        """
+        if layout not in self._tables:
+            self._tables[layout] = (
+                LazyTable(lambda line: self.line(
+                    layout.row_table.unpack(line))),
+                LazyTable(lambda line: self.line(
+                    layout.col_table.unpack(line))))
+        return self._tables[layout]
+
+    def evaluate_board(self, layout, board):
+        """Score a packed board of a bitboard Layout."""
+        row_scores, col_scores = self.tables(layout)
+        value = 0
+        for row in range(layout.rows):
+            value += row_scores[(board >> (row * layout.row_bits)) &
+                                layout.row_mask]
+        transposed = layout.transpose(board)
+        for col in range(layout.cols):
+            value += col_scores[(transposed >> (col * layout.col_bits)) &
+                                layout.col_mask]
+        return value
+
+    def evaluate(self, grid):
+        """Score a Grid, a BitGrid or anything else with rows of tiles."""
+        if isinstance(grid, BitGrid):
+            return self.evaluate_board(grid.layout, grid.board)
+
+        rows = _exponent_rows(grid)
+        lines = self._lines
+        return (sum(lines[tuple(row)] for row in rows) +
+                sum(lines[column] for column in zip(*rows)))
+
+    def evaluate_terms(self, exponents):
+        """The unweighted value of every term for an (N, rows, cols) array
+        of exponents, as a dict of (N,) arrays, computed with reductions.
+        """
+        np = _numpy()
+        exponents = np.asarray(exponents)
+        count, rows, cols = exponents.shape
+        row_lines = exponents.reshape(count * rows, cols)
+        col_lines = exponents.transpose(0, 2, 1).reshape(count * cols, rows)
+
+        values = {}
+        for name, term, _ in self.terms:
+            start = default_timer()
+            values[name] = (term.lines(row_lines).reshape(count, rows).sum(1) +
+                            term.lines(col_lines).reshape(count, cols).sum(1))
+            self.times[name] += default_timer() - start
+        return values
+
+    def batch_table(self, length):
+        """A NumPy array of the score of every line of `length` exponents
+        below TABLE_EXPONENTS, indexed by the exponents as digits of that
+        base (the first one least significant).
+        """
+        if length not in self._batch_tables:
+            np = _numpy()
+            index = np.arange(TABLE_EXPONENTS ** length)
+            lines = np.stack([index // TABLE_EXPONENTS ** idx %
+                              TABLE_EXPONENTS for idx in range(length)],
+                             axis=1)
+            table = np.full(len(lines), float(self.constant))
+            for name, term, weight in self.terms:
+                start = default_timer()
+                table += weight * term.lines(lines)
+                self.times[name] += default_timer() - start
+            self._batch_tables[length] = table
+        return self._batch_tables[length]
+
+    def evaluate_batch(self, exponents):
+        """Score an (N, rows, cols) array of exponents, return an (N,)
+        array.
+        """
+        np = _numpy()
+        exponents = np.asarray(exponents)
+        count, rows, cols = exponents.shape
+        if max(rows, cols) <= TABLE_LENGTH and \
+                (not exponents.size or exponents.max() < TABLE_EXPONENTS):
+            # look every line up by its exponents, as digits
+            exponents = exponents.astype(np.intp)
+            row_digits = TABLE_EXPONENTS ** np.arange(cols, dtype=np.intp)
+            col_digits = TABLE_EXPONENTS ** np.arange(rows, dtype=np.intp)
+            return (self.batch_table(cols)[exponents @ row_digits].sum(1) +
+                    self.batch_table(rows)[col_digits @ exponents].sum(1))
+
+        values = np.full(count, self.constant * (rows + cols))
+        for name, term_values in self.evaluate_terms(exponents).items():
+            values += self.weights[name] * term_values
+        return values
+
+    def report(self):
+        """The seconds spent computing every term, the slowest first."""
+        total = sum(self.times.values()) or 1.0
+        return '\n'.join(
+            "{:<14} {:>10.6f}s {:>5.1f}%".format(
+                name, seconds, 100 * seconds / total)
+            for name, seconds in sorted(self.times.items(),
+                                        key=lambda item: -item[1]))
+
+
+def write_to_file(heuristic, filename):
+    """Write the weights, constant and options of a Heuristic as JSON."""
+    import json
+    from .save import atomic_write
+
+    atomic_write(filename, json.dumps(heuristic.to_dict(), indent=2,
+                                      sort_keys=True).encode('utf-8'))
+
+
+def load_from_file(filename):
+    """The Heuristic of a JSON file written by write_to_file."""
+    import json
+
+    with open(filename) as heuristic_file:
+        return Heuristic(**json.load(heuristic_file))
@@ -0,0 +1,115 @@
+from array import array
+from collections import deque, namedtuple
+
+from .grid import Actions, Direction
+
+# a move of one grid: the grid index, the direction value, the actions of the
+# move as Grid.move_records ints and the cell and exponent of the spawn
+Move = namedtuple('Move', 'grid direction records spawn exponent')
+Turn = namedtuple('Turn', 'score moves')  # what one key press did
+
+
+def move_from_actions(grid_idx, grid, direction, actions):
+    """The Move of a grid after a move, actions ending with the spawn."""
+    cols = len(grid[0])
+    records = array('i')
+    for action in actions[:-1]:
+        records.extend((action.type.value,
+                        action.old.row * cols + action.old.column,
+                        action.new.row * cols + action.new.column))
+
+    row, column = actions[-1].new
+    return Move(grid_idx, Direction(direction).value, records,
+                row * cols + column, grid[row][column].exponent)
+
+
+def unmove(exponents, move):
+    """Revert a Move on the exponents of its grid, a list row by row."""
+    exponents[move.spawn] = 0
+
+    records, merge = move.records, Actions.merge.value
+    for idx in range(len(records) - 3, -1, -3):
+        action, old, new = records[idx], records[idx + 1], records[idx + 2]
+        if action == merge:
+            exponents[new] -= 1
+            exponents[old] = exponents[new]
+        else:
+            exponents[old], exponents[new] = exponents[new], 0
+
+
+def grid_exponents(grid):
+    return [tile.exponent if tile else 0 for row in grid for tile in row]
+
+
+def _grid_base(grid):
+    for tile in filter(None, (tile for row in grid for tile in row)):
+        return tile.base
+    return grid.Tile().base
+
+
+class History(object):
+    """Undo and redo of the turns of a game, on any number of grids.
+
+    Turns are kept as reversible deltas (see Move) rather than copies of the
+    grids. Only the last `depth` turns can be undone, older turns are
+    dropped. Making a new turn clears what could be redone.
+    """
+
+    def __init__(self, depth=10000, turns=()):
+        self._undo = deque((Turn(score, tuple(Move(*move) for move in moves))
+                            for score, moves in turns), maxlen=depth)
+        self._redo = []
+
+    def __len__(self):
+        return len(self._undo)
+
+    @property
+    def redo_count(self):
+        return len(self._redo)
+
+    def turns(self):
+        """The turns that can be undone, oldest first."""
+        return tuple(self._undo)
+
+    def push(self, score, moves):
+        self._undo.append(Turn(score, tuple(moves)))
+        del self._redo[:]
+
+    def undo(self, grids):
+        """Revert the last turn on grids and return it, None if there is
+        nothing to undo.
+        """
+        if not self._undo:
+            return None
+
+        turn = self._undo.pop()
+        for move in reversed(turn.moves):
+            grid = grids[move.grid]
+            base, cols = _grid_base(grid), len(grid[0])
+            old = grid_exponents(grid)
+            exponents = list(old)
+            unmove(exponents, move)
+
+            for cell, exponent in enumerate(exponents):
+                if exponent != old[cell]:
+                    grid[cell // cols][cell % cols] = grid.make_tile(
+                        base=base, exponent=exponent) if exponent else None
+        self._redo.append(turn)
+        return turn
+
+    def redo(self, grids):
+        """Make the last undone turn again and return it, None if there is
+        nothing to redo.
+        """
+        if not self._redo:
+            return None
+
+        turn = self._redo.pop()
+        for move in turn.moves:
+            grid = grids[move.grid]
+            base, cols = _grid_base(grid), len(grid[0])
+            grid.move(Direction(move.direction))
+            grid[move.spawn // cols][move.spawn % cols] = grid.make_tile(
+                base=base, exponent=move.exponent)
+        self._undo.append(turn)
+        return turn
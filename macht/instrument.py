@@ -0,0 +1,191 @@
+"""Opt-in timing of the hot paths of the game.
+
+Nothing is instrumented until `enable`, which replaces the methods listed in
+`targets` with timed wrappers (and `disable` puts the originals back), so a
+game that is not profiled runs the original code. Enable it with
+``macht --profile [FILE]`` or by setting the MACHT_PROFILE environment
+variable to 1 (report on stderr) or a file name (JSON stats).
+"""
+import os
+import sys
+import json
+import importlib
+import threading
+from functools import wraps
+from timeit import default_timer
+
+# (module, class, attribute, category) of everything timed
+targets = [
+    ('macht.grid', 'Grid', 'move', 'game'),
+    ('macht.grid', 'Grid', 'move_vertical', 'game'),
+    ('macht.grid', 'Grid', 'move_horizontal', 'game'),
+    ('macht.grid', 'Grid', 'move_records', 'game'),
+    ('macht.grid', 'Grid', 'spawn_tile', 'game'),
+    ('macht.grid', 'Grid', 'possible_moves', 'game'),
+    ('macht.grid', 'Grid', 'has_moves', 'game'),
+    ('macht.ai.expectimax', 'Player', 'best_moves', 'ai'),
+    ('macht.ai.pool', 'PoolPlayer', 'best_moves', 'ai'),
+    ('macht.endgame', 'EndgameTable', 'best_moves', 'ai'),
+    ('macht.term.grid', 'Grid', 'draw', 'terminal'),
+    ('macht.term.grid', 'Grid', 'draw_tiles', 'terminal'),
+    ('macht.term.grid', 'Grid', 'draw_cell', 'terminal'),
+    ('macht.term.grid', 'Grid', 'draw_actions', 'terminal'),
+    ('macht.term.grid', 'Grid', 'draw_empty_tile', 'terminal'),
+    ('macht.term.animation', 'Animator', 'step', 'terminal'),
+    ('macht.term.animation', 'Animator', 'finish', 'terminal'),
+    ('macht.term.render', 'Frame', 'flush', 'terminal'),
+    ('macht.save', None, 'write_state', 'save'),
+    ('macht.save', None, 'load_from_file', 'save'),
+    ('macht.save', 'MoveLog', 'start', 'save'),
+    ('macht.save', 'MoveLog', 'append', 'save'),
+    ('macht.save', 'AutoSaver', 'save', 'save'),
+]
+
+
+def percentile(values, fraction):
+    """The value below which `fraction` of the sorted values lie."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Profiler(object):
+    """Collects the durations of the calls to the methods it wraps, and the
+    number of writes of every frame flushed to the terminal.
+    """
+
+    def __init__(self):
+        self.timings = {}  # name: [seconds per call]
+        self.categories = {}  # category: seconds outside other timed calls
+        self.frame_writes = []
+        self._patched = []
+        self._local = threading.local()
+
+    def _timed(self, func, name, category):
+        timings = self.timings.setdefault(name, [])
+        self.categories.setdefault(category, 0.0)
+        local = self._local
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            depth = getattr(local, 'depth', 0)
+            local.depth = depth + 1
+            start = default_timer()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds = default_timer() - start
+                local.depth = depth
+                timings.append(seconds)
+                if depth == 0:  # nested calls are in the caller's time
+                    self.categories[category] += seconds
+        return timed
+
+    def _counted_flush(self, flush):
+        frame_writes = self.frame_writes
+
+        @wraps(flush)
+        def counted(frame):
+            writes = len(frame._chunks)
+            flushed = flush(frame)
+            if flushed:
+                frame_writes.append(writes)
+            return flushed
+        return counted
+
+    def wrap(self, owner, attribute, name, category):
+        original = (owner.__dict__[attribute] if isinstance(owner, type)
+                    else getattr(owner, attribute))
+        if isinstance(original, property):
+            wrapped = property(self._timed(original.fget, name, category),
+                               original.fset, original.fdel, original.__doc__)
+        elif name == 'Frame.flush':
+            wrapped = self._timed(self._counted_flush(original), name,
+                                  category)
+        else:
+            wrapped = self._timed(original, name, category)
+        setattr(owner, attribute, wrapped)
+        self._patched.append((owner, attribute, original))
+
+    def restore(self):
+        for owner, attribute, original in reversed(self._patched):
+            setattr(owner, attribute, original)
+        del self._patched[:]
+
+    def summary(self):
+        calls = {}
+        for name, timings in sorted(self.timings.items()):
+            if not timings:
+                continue
+            timings = sorted(timings)
+            calls[name] = {'calls': len(timings), 'total': sum(timings),
+                           'p50': percentile(timings, 0.5),
+                           'p99': percentile(timings, 0.99),
+                           'max': timings[-1]}
+
+        writes = sorted(self.frame_writes)
+        frames = {'frames': len(writes)}
+        if writes:
+            frames.update({'p50': percentile(writes, 0.5),
+                           'p99': percentile(writes, 0.99),
+                           'max': writes[-1]})
+        return {'calls': calls, 'categories': dict(self.categories),
+                'frame_writes': frames}
+
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        summary = self.summary()
+
+        stream.write("{:<32} {:>8} {:>10} {:>10} {:>10}\n".format(
+            'call', 'calls', 'total ms', 'p50 us', 'p99 us'))
+        for name, stats in summary['calls'].items():
+            stream.write("{:<32} {:>8} {:>10.1f} {:>10.1f} {:>10.1f}\n".format(
+                name, stats['calls'], stats['total'] * 1e3,
+                stats['p50'] * 1e6, stats['p99'] * 1e6))
+
+        stream.write("\n" + ", ".join(
+            "{}: {:.1f} ms".format(category, seconds * 1e3)
+            for category, seconds in sorted(summary['categories'].items())))
+        frames = summary['frame_writes']
+        if frames['frames']:
+            stream.write("\nwrites per frame: p50 {p50}, p99 {p99}, max {max}"
+                         " over {frames} frames".format(**frames))
+        stream.write("\n")
+
+    def write(self, filename):
+        with open(filename, 'w') as stats_file:
+            json.dump(self.summary(), stats_file, indent=2)
+
+    def finish(self, output='-'):
+        """Stop timing and report to stderr, or write to output."""
+        self.restore()
+        if output in (None, '-', '1'):
+            self.report()
+        else:
+            self.write(output)
+
+
+def enable(targets=targets):
+    """Start timing targets, return the Profiler. Targets of modules that
+    can not be imported (e.g. the terminal without blessed) are skipped.
+    """
+    profiler = Profiler()
+    for module_name, class_name, attribute, category in targets:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        owner = getattr(module, class_name) if class_name else module
+        name = '.'.join(filter(None, (class_name or module_name.split('.')[-1],
+                                      attribute)))
+        profiler.wrap(owner, attribute, name, category)
+    return profiler
+
+
+def from_environment(environ=os.environ, output=None):
+    """Enable profiling if output (e.g. of ``--profile``) is given or else
+    MACHT_PROFILE is set, return the Profiler and where to report to (None
+    and None when not profiling).
+    """
+    output = output or environ.get('MACHT_PROFILE')
+    if not output or output == '0':
+        return None, None
+    return enable(), output
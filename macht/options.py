@@ -0,0 +1,10 @@
+import argparse
+
+
+def grid_dimension(string):
+    rows, _, cols = string.partition('x')
+    try:
+        return {'rows': int(rows), 'cols': int(cols)}
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "grid dimension should look like: '4x4'")
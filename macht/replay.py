@@ -0,0 +1,89 @@
+import random
+
+from .bitboard import BitGrid
+from .grid import Direction, Grid, spawn_exponent
+
+
+def new_game(seed=None, rows=4, cols=4, base=2):
+    """The starting BitGrid of the game with seed, its rng included."""
+    grid = BitGrid(rows, cols, base=base, rng=random.Random(seed))
+    grid.spawn_tile()
+    grid.spawn_tile()
+    return grid
+
+
+def play_move(grid, direction):
+    """Make a move on a BitGrid and spawn a tile like the game does, return
+    the score of the move or None when nothing moved.
+    """
+    board, score = grid.shifted(direction)
+    if board == grid.board:
+        return None
+
+    grid.board = board
+    grid.spawn_tile(exponent=spawn_exponent(grid.rng))
+    return score
+
+
+class Replay(object):
+    """The states of a game, reconstructed from its seed and directions.
+
+    Games played with a random.Random(seed) per grid (e.g. `macht --seed`)
+    spawn the same tiles when the same directions are played. States are
+    found by fast-forwarding a BitGrid. Every `interval` moves a checkpoint
+    of the board, score and rng state is kept, so seeking to any move
+    replays at most `interval` moves once the game was played through.
+    """
+
+    def __init__(self, seed, directions=(), rows=4, cols=4, base=2,
+                 interval=1000):
+        self.seed, self.interval = seed, interval
+        self.directions = []
+        for direction in directions:
+            self.append(direction)
+
+        start = new_game(seed, rows, cols, base)
+        self.layout = start.layout
+        self._checkpoints = [(start.board, 0, start.rng.getstate())]
+
+    def __len__(self):
+        return len(self.directions)
+
+    def append(self, direction):
+        self.directions.append(Direction(direction))
+
+    def state(self, move=None):
+        """Return a BitGrid of the game after `move` directions (all by
+        default), its rng ready for the next spawn, and the score.
+        """
+        move = len(self) if move is None else move
+        if not 0 <= move <= len(self):
+            raise IndexError("move out of range")
+
+        checkpoint = min(move // self.interval, len(self._checkpoints) - 1)
+        board, score, rng_state = self._checkpoints[checkpoint]
+        rng = random.Random()
+        rng.setstate(rng_state)
+        layout = self.layout
+        grid = BitGrid(layout.rows, layout.cols, layout.base, board,
+                       layout.bits, rng=rng)
+
+        for played in range(checkpoint * self.interval, move):
+            score += play_move(grid, self.directions[played]) or 0
+            if (played + 1) == len(self._checkpoints) * self.interval:
+                self._checkpoints.append((grid.board, score, rng.getstate()))
+
+        return grid, score
+
+    def grid(self, move=None, Grid=Grid, **kwargs):
+        """Like state, but return a Grid (made with kwargs) and the score."""
+        bit_grid, score = self.state(move)
+        grid = Grid(rows=len(bit_grid), cols=self.layout.cols,
+                    rng=bit_grid.rng, **kwargs)
+        for row_idx, row in enumerate(
+                self.layout.exponents(bit_grid.board)):
+            for col_idx, exponent in enumerate(row):
+                if exponent:
+                    grid[row_idx][col_idx] = grid.make_tile(
+                        base=bit_grid.base, exponent=exponent)
+        return grid, score
@@ -1,7 +1,19 @@
 import os
-import json
+import struct
+import threading
+from time import time
 from itertools import product
 
+try:
+    import queue
+except ImportError:  # py2
+    import Queue as queue
+
+from array import array
+
+from .grid import Grid, Direction, Actions
+from .history import Move, Turn, unmove
+
 xdg_data_home = (os.environ.get('XDG_DATA_HOME') or
                  os.path.join(os.path.expanduser('~'), '.local', 'share'))
 macht_data_dir = os.path.join(xdg_data_home, 'macht')
@@ -20,28 +32,318 @@ def grid_to_dict(grid):
             'tiles': tiles}
 
 
-def write_to_file(score, grids, filename=None):
-    filename = filename or os.path.join(macht_data_dir, 'default_save.json')
+# Binary saves: a header, every grid as its dimensions, base and exponents (a
+# byte per cell, row by row) and then any number of move records appended
+# during play, each flagged when it is the first of a turn. Loading replays the
+# moves onto the grids. A save with history starts from the grids before the
+# oldest turn that can be undone, its moves being the history.
+BINARY_EXTENSION = '.macht'
+MAGIC = b'MACHT'
+VERSION = 2
+header_struct = struct.Struct('<5sBQH')  # magic, version, score, grids
+grid_struct = struct.Struct('<HHH')  # rows, cols, base
+# grid index, direction, spawn row, spawn column, spawn exponent, whether the
+# move starts a turn
+move_struct = struct.Struct('<HBHHBB')
+
+
+def is_binary(filename):
+    return filename.endswith(BINARY_EXTENSION)
+
+
+def make_dirs(filename):
+    if not os.path.dirname(filename):
+        return
+
     try:
         os.makedirs(os.path.dirname(filename))
     except getattr(__builtins__, 'FileExistsError', OSError) as err:
         if err.errno != 17:  # py2: OSerror but not file exists
             raise
 
-    contents = {'score': score,
-                'grids': [grid_to_dict(grid) for grid in grids]}
 
-    with open(filename, 'w') as save_file:
-        json.dump(contents, save_file, indent=2)
+def snapshot(score, grids, history=None):
+    state = {'score': score, 'grids': [grid_to_dict(grid) for grid in grids]}
+    if history:
+        state['history'] = history.turns()
+    return state
+
+
+def state_to_bytes(state):
+    all_exponents = []
+    for grid_state in state['grids']:
+        exponents = bytearray(grid_state['rows'] * grid_state['cols'])
+        for tile in grid_state['tiles']:
+            exponents[tile['row'] * grid_state['cols'] + tile['column']] = \
+                tile['exponent']
+        all_exponents.append(exponents)
+
+    score, moves = state['score'], []
+    for turn_score, turn_moves in reversed(state.get('history', ())):
+        score -= turn_score
+        for move_idx in reversed(range(len(turn_moves))):
+            move = Move(*turn_moves[move_idx])
+            unmove(all_exponents[move.grid], move)
+            moves.append((move, move_idx == 0))
+
+    chunks = [header_struct.pack(MAGIC, VERSION, score, len(state['grids']))]
+    for grid_state, exponents in zip(state['grids'], all_exponents):
+        chunks.append(grid_struct.pack(grid_state['rows'], grid_state['cols'],
+                                       grid_state['base']))
+        chunks.append(bytes(exponents))
+    for move, new_turn in reversed(moves):
+        row, column = divmod(move.spawn, state['grids'][move.grid]['cols'])
+        chunks.append(move_struct.pack(move.grid, move.direction, row, column,
+                                       move.exponent, new_turn))
+    return b''.join(chunks)
+
+
+def grids_to_bytes(score, grids, history=None):
+    return state_to_bytes(snapshot(score, grids, history))
+
+
+def _replay(state, moves):
+    grids = []
+    for grid_state in state['grids']:
+        grid = Grid(grid_state['rows'], grid_state['cols'])
+        for tile in grid_state['tiles']:
+            grid[tile['row']][tile['column']] = grid.make_tile(
+                base=grid_state['base'], exponent=tile['exponent'])
+        grids.append(grid)
+
+    history, turn_score, turn_moves = [], 0, []
+    merge = Actions.merge.value
+    for grid_idx, direction, row, column, exponent, new_turn in moves:
+        if turn_moves and new_turn:
+            history.append(Turn(turn_score, tuple(turn_moves)))
+            turn_score, turn_moves = 0, []
+
+        grid = grids[grid_idx]
+        cols = len(grid[0])
+        records = grid.move_records(Direction(direction), records=array('i'))
+        for idx in range(0, len(records), 3):
+            if records[idx] == merge:
+                cell = records[idx + 2]
+                turn_score += grid[cell // cols][cell % cols].value
+        grid[row][column] = grid.make_tile(
+            base=state['grids'][grid_idx]['base'], exponent=exponent)
+        turn_moves.append(Move(grid_idx, direction, records,
+                               row * cols + column, exponent))
+    history.append(Turn(turn_score, tuple(turn_moves)))
+    state['score'] += sum(turn.score for turn in history)
+    state['history'] = history
+
+    for grid_idx, grid in enumerate(grids):
+        base = state['grids'][grid_idx]['base']
+        state['grids'][grid_idx] = grid_to_dict(grid)
+        state['grids'][grid_idx]['base'] = base
+
+
+def _read_start(read):
+    """Read the header and grids of a binary save with read(size), return
+    the state the save starts from.
+    """
+    magic, version, score, grid_count = header_struct.unpack(
+        read(header_struct.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a version {} macht save".format(VERSION))
+
+    state = {'score': score, 'grids': []}
+    for _ in range(grid_count):
+        rows, cols, base = grid_struct.unpack(read(grid_struct.size))
+        exponents = bytearray(read(rows * cols))
+
+        tiles = [{'row': cell // cols, 'column': cell % cols,
+                  'exponent': exponent}
+                 for cell, exponent in enumerate(exponents) if exponent]
+        state['grids'].append({'rows': rows, 'cols': cols, 'base': base,
+                               'tiles': tiles})
+    return state
+
+
+def bytes_to_grids(data):
+    offset = [0]
+
+    def read(size):
+        offset[0] += size
+        return data[offset[0] - size:offset[0]]
+
+    state = _read_start(read)
+    moves = [move_struct.unpack_from(data, move_offset) for move_offset
+             in range(offset[0], len(data) - move_struct.size + 1,
+                      move_struct.size)]
+    if moves:
+        _replay(state, moves)
+
+    return state
+
+
+def read_start(filename):
+    """Return the state a binary save starts from, without its moves."""
+    with open(filename, 'rb') as log:
+        try:
+            return _read_start(log.read)
+        except (struct.error, ValueError):
+            raise ValueError("not a version {} macht save".format(VERSION))
+
+
+def read_log(filename):
+    """Return the state a binary save starts from, and a generator of its
+    move records as (grid index, direction value, spawn row, spawn column,
+    spawn exponent, whether the move starts a turn) read from the file as
+    they are needed.
+    """
+    log = open(filename, 'rb')
+    try:
+        state = _read_start(log.read)
+    except (struct.error, ValueError):
+        log.close()
+        raise ValueError("not a version {} macht save".format(VERSION))
+
+    def moves():
+        with log:
+            while True:
+                record = log.read(move_struct.size)
+                if len(record) < move_struct.size:
+                    break
+                yield move_struct.unpack(record)
+
+    return state, moves()
+
+
+class MoveLog(object):
+    """Keeps a binary save up to date by appending every move to it."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = None
+
+    def start(self, score, grids, history=None):
+        """Write a fresh save of the grids, to append moves to."""
+        self.close()
+        atomic_write(self.filename, grids_to_bytes(score, grids, history))
+        self._file = open(self.filename, 'ab')
+
+    def append(self, grid_idx, direction, spawn_action, exponent, new_turn):
+        """Append a move, new_turn when it is the first of its turn."""
+        row, column = spawn_action.new
+        self._file.write(move_struct.pack(grid_idx, direction.value, row,
+                                          column, exponent, new_turn))
+        self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def atomic_write(filename, data):
+    """Write to a temporary file next to filename and rename it over
+    filename, so filename always holds either the old or the new data.
+    """
+    import tempfile  # like json, only imported when used for a fast start
+
+    make_dirs(filename)
+    directory, name = os.path.split(filename)
+    fd, temp_name = tempfile.mkstemp(prefix='.' + name, suffix='.tmp',
+                                     dir=directory or '.')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        try:  # mkstemp creates files only the owner can read
+            mode = os.stat(filename).st_mode & 0o777
+        except OSError:
+            mode = 0o644
+        os.chmod(temp_name, mode)
+        getattr(os, 'replace', os.rename)(temp_name, filename)
+    except BaseException:
+        os.remove(temp_name)
+        raise
+
+
+def write_state(state, filename):
+    import json
+
+    if is_binary(filename):
+        data = state_to_bytes(state)
+    elif 'history' in state:  # indented, the history would be mostly spaces
+        data = json.dumps(state, separators=(',', ':'),
+                          default=list).encode('utf-8')
+    else:
+        data = json.dumps(state, indent=2).encode('utf-8')
+    atomic_write(filename, data)
+
+
+def write_to_file(score, grids, filename=None, history=None):
+    filename = filename or os.path.join(macht_data_dir, 'default_save.json')
+    write_state(snapshot(score, grids, history), filename)
+
+
+class AutoSaver(object):
+    """Saves snapshots of the game on a background thread.
+
+    Taking a snapshot is all that happens on the calling thread. When the
+    writer falls behind, only the newest snapshot is written.
+    """
+
+    def __init__(self, filename=None, interval=10):
+        self.filename = (filename or
+                         os.path.join(macht_data_dir, 'default_save.json'))
+        self.interval = interval
+        self.saves = self.errors = 0
+        self._last = time()
+        self._pending = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            state = self._pending.get()
+            if state is None:
+                break
+            try:
+                write_state(state, self.filename)
+                self.saves += 1
+            except (IOError, OSError):
+                self.errors += 1
+
+    def save(self, score, grids, history=None):
+        state = snapshot(score, grids, history)
+        try:  # replace a snapshot that was not written yet
+            self._pending.get_nowait()
+        except queue.Empty:
+            pass
+        self._pending.put_nowait(state)
+        self._last = time()
+
+    def maybe_save(self, score, grids, history=None):
+        if time() - self._last < self.interval:
+            return False
+        self.save(score, grids, history)
+        return True
+
+    def close(self):
+        """Wait for pending snapshots to be written and stop the thread."""
+        self._pending.put(None)
+        self._thread.join()
 
 
 def load_from_file(filename=None):
     filename = filename or os.path.join(macht_data_dir, 'default_save.json')
 
     try:
-        with open(filename) as save_file:
-            return json.load(save_file)
+        with open(filename, 'rb') as save_file:
+            data = save_file.read()
     except getattr(__builtins__, 'FileNotFoundError', IOError) as err:
         if err.errno != 2:  # py2: IOerror but not file not found
             raise
         return {}
+
+    if data.startswith(MAGIC):
+        return bytes_to_grids(data)
+
+    import json
+    return json.loads(data.decode('utf-8'))
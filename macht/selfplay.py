@@ -0,0 +1,192 @@
+import sys
+import json
+import random
+import argparse
+from time import time
+from collections import Counter
+
+from .replay import new_game, play_move
+from .options import grid_dimension
+
+parser = argparse.ArgumentParser(
+    description="Play games without a terminal, writing the result of every "
+    "game as a line of JSON and statistics of all games to stderr.")
+parser.add_argument('grid_dims', metavar='GRID_DIMENSIONS',
+                    type=grid_dimension, nargs='?',
+                    default={'rows': 4, 'cols': 4},
+                    help="Dimensions of the grid, default: '4x4'")
+parser.add_argument('-n', '--games', metavar='N', type=int, default=1,
+                    help="number of games to play (default: 1)")
+parser.add_argument('-j', '--jobs', metavar='N', type=int, default=None,
+                    help="number of worker processes (default: one per CPU)")
+parser.add_argument('-s', '--seed', metavar='SEED', type=int, default=None,
+                    help="seed of the first game, game i uses SEED + i")
+parser.add_argument('-o', '--output', metavar='FILE', default='-',
+                    help="JSON lines file to append results to "
+                    "(default: stdout)")
+parser.add_argument('-b', '--base', metavar='N', type=int, default=2,
+                    help="base value of all tiles")
+parser.add_argument('-p', '--player', choices=('expectimax', 'random'),
+                    default='expectimax', help="who makes the moves")
+parser.add_argument('-d', '--depth', metavar='N', type=int, default=2,
+                    help="search depth of the expectimax player")
+parser.add_argument('-w', '--weights', metavar='FILE', default=None,
+                    help="heuristic of the expectimax player, a JSON file "
+                    "written by macht.tune")
+parser.add_argument('-t', '--time-budget', metavar='SECONDS', type=float,
+                    default=None, help="time limit per move of the "
+                    "expectimax player, makes games irreproducible")
+parser.add_argument('-m', '--max-moves', metavar='N', type=int, default=None,
+                    help="stop games after N moves")
+parser.add_argument('-a', '--archive', metavar='FILE', nargs='?',
+                    default=False, const=None, help="also record the games "
+                    "in the SQLite archive (default: archive.sqlite next to "
+                    "the saves)")
+
+ARCHIVE_BATCH = 1000  # games per transaction
+
+
+def make_player(name='expectimax', depth=2, time_budget=None,
+                weights=None):
+    if name == 'random':
+        return None
+
+    from .ai import Player
+    heuristic = None
+    if weights:
+        from .heuristics import load_from_file
+        heuristic = load_from_file(weights)
+    return Player(max_depth=depth, time_budget=time_budget,
+                  heuristic=heuristic)
+
+
+def play_game(seed, rows=4, cols=4, base=2, player=None, max_moves=None):
+    """Play a game until no moves are left, returning a dict of its result.
+
+    Without a player random possible moves are made. All randomness comes
+    from a random.Random(seed), so games with the same seed and a
+    deterministic player are identical.
+    """
+    grid = new_game(seed, rows, cols, base)
+    rng = grid.rng
+
+    start, score, moves = time(), 0, 0
+    while max_moves is None or moves < max_moves:
+        if player:
+            direction = player.best_move(grid)
+        else:
+            possible_moves = grid.possible_moves
+            direction = rng.choice(possible_moves) if possible_moves else None
+        if direction is None:
+            break
+
+        score += play_move(grid, direction)
+        moves += 1
+
+    return {'seed': seed, 'rows': rows, 'cols': cols, 'base': base,
+            'score': score, 'highest_tile': grid.highest_tile.value,
+            'moves': moves, 'seconds': time() - start}
+
+
+_worker_player = None
+
+
+def _init_worker(player_options):
+    global _worker_player
+    _worker_player = make_player(**player_options)
+
+
+def _play_in_worker(seed, game_options):
+    return play_game(seed, player=_worker_player, **game_options)
+
+
+def run(games, seed=0, jobs=None, player_options=None, **game_options):
+    """Yield the results of `games` games as they finish, spread over `jobs`
+    processes (in this process if jobs is 1).
+    """
+    player_options = player_options or {}
+    seeds = range(seed, seed + games)
+
+    if jobs == 1:
+        player = make_player(**player_options)
+        for game_seed in seeds:
+            yield play_game(game_seed, player=player, **game_options)
+        return
+
+    # only imported here, single process games start faster without it
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(player_options,)) as executor:
+        futures = [executor.submit(_play_in_worker, game_seed, game_options)
+                   for game_seed in seeds]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def summarize(results, seconds=None):
+    scores = sorted(result['score'] for result in results)
+    if not scores:
+        return {'games': 0}
+
+    moves = sum(result['moves'] for result in results)
+    summary = {
+        'games': len(scores),
+        'moves': moves,
+        'score_mean': sum(scores) / float(len(scores)),
+        'score_median': scores[len(scores) // 2],
+        'score_min': scores[0],
+        'score_max': scores[-1],
+        'highest_tiles': dict(Counter(result['highest_tile']
+                                      for result in results)),
+    }
+    if seconds:
+        summary['seconds'] = seconds
+        summary['games_per_second'] = len(scores) / seconds
+        summary['moves_per_second'] = moves / seconds
+    return summary
+
+
+def main(args=None):
+    opts = parser.parse_args(args if args is not None else sys.argv[1:])
+    seed = opts.seed if opts.seed is not None else random.randrange(2 ** 32)
+    player_options = {'name': opts.player, 'depth': opts.depth,
+                      'time_budget': opts.time_budget,
+                      'weights': opts.weights}
+
+    output = sys.stdout if opts.output == '-' else open(opts.output, 'a')
+    archive = batch = None
+    if opts.archive is not False:
+        from .archive import Archive
+        archive, batch = Archive(opts.archive), []
+
+    results, start = [], time()
+    try:
+        for result in run(opts.games, seed, opts.jobs, player_options,
+                          base=opts.base, max_moves=opts.max_moves,
+                          **opts.grid_dims):
+            output.write(json.dumps(result, sort_keys=True) + '\n')
+            output.flush()
+            results.append(result)
+
+            if archive is not None:
+                batch.append(dict(result, source='selfplay'))
+                if len(batch) >= ARCHIVE_BATCH:
+                    archive.record_many(batch)
+                    del batch[:]
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if archive is not None:
+            archive.record_many(batch)
+            archive.close()
+
+    json.dump(summarize(results, time() - start), sys.stderr, indent=2,
+              sort_keys=True)
+    sys.stderr.write('\n')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
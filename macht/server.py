@@ -0,0 +1,296 @@
+"""Host many games over a TCP or Unix socket, for players and spectators.
+
+Clients and the server exchange JSON objects, one per line. Clients send:
+
+- ``{"op": "new", "rows": 4, "cols": 4, "base": 2, "seed": 1}`` to start a
+  game and play it (all but "op" are optional, rows and cols are at most
+  MAX_SIZE and base at least 2),
+- ``{"op": "play", "game": 1}`` to play a game with the other players,
+- ``{"op": "watch", "game": 1}`` to only watch it,
+- ``{"op": "leave", "game": 1}`` to stop playing or watching,
+- ``{"op": "move", "game": 1, "direction": "left"}`` to move its tiles,
+- ``{"op": "list"}`` for the games being played.
+
+The server answers a new, play or watch with the state of the game::
+
+    {"op": "state", "game": 1, "rows": 4, "cols": 4, "base": 2,
+     "cells": [0, 1, ...], "score": 0, "turn": 0, "over": false}
+
+the cells being the exponents of the tiles row by row (0 when empty), and
+sends every move of the game to everyone playing or watching it::
+
+    {"op": "diff", "game": 1, "turn": 1, "direction": 2, "score": 4,
+     "records": [3, 4, 0, ...], "spawn": 5, "exponent": 1, "over": false}
+
+with the direction value, the actions of the move as (type, old cell, new
+cell) ints like macht.history.Move and the cell and exponent of the spawned
+tile. Errors are sent as ``{"op": "error", "message": "..."}``.
+
+Messages to a client are queued. A client that reads too slowly to keep up
+has its queue dropped and later gets the current state of its games
+instead of the diffs it missed, so it never holds up a game.
+"""
+import sys
+import json
+import random
+import asyncio
+import argparse
+from functools import partial
+
+from .game import step
+from .grid import Direction, Grid
+from .history import grid_exponents, move_from_actions
+from .tile import Tile
+
+DEFAULT_PORT = 7048
+MAX_LINE = 4096
+MAX_SIZE = 64  # rows and columns of a game, so one can not exhaust memory
+
+
+def encode(message):
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def parse_int(message, key, default, low, high=None):
+    """message[key] (or default) if it is an int from low to high, raises
+    ValueError otherwise.
+    """
+    value = message.get(key, default)
+    if not isinstance(value, int) or isinstance(value, bool) or \
+            value < low or (high is not None and value > high):
+        raise ValueError("{} must be an int of at least {}{}".format(
+            key, low, " and at most {}".format(high) if high else ''))
+    return value
+
+
+def parse_direction(direction):
+    if isinstance(direction, int):
+        return Direction(direction)
+    return Direction[direction]
+
+
+class Game(object):
+    """A Grid with its own rng, its score and the connections following it."""
+
+    def __init__(self, game_id, rows=4, cols=4, base=2, seed=None):
+        self.id = game_id
+        self.base = base
+        self.grid = Grid(rows, cols, Tile=partial(Tile, base=base),
+                         rng=random.Random(seed))
+        self.grid.spawn_tile()
+        self.grid.spawn_tile()
+        self.score = self.turn = 0
+        self.players, self.watchers = set(), set()
+
+    @property
+    def connections(self):
+        return self.players | self.watchers
+
+    @property
+    def over(self):
+        return not self.grid.has_moves
+
+    def state(self):
+        return {'op': 'state', 'game': self.id, 'rows': len(self.grid),
+                'cols': len(self.grid[0]), 'base': self.base,
+                'cells': grid_exponents(self.grid), 'score': self.score,
+                'turn': self.turn, 'over': self.over}
+
+    def move(self, direction):
+        """Make a move and return its diff message, None if nothing moved."""
+        grid_step = step(self.grid, direction)
+        if not grid_step:
+            return None
+
+        self.score += grid_step.score
+        self.turn += 1
+        move = move_from_actions(0, self.grid, direction, grid_step.actions)
+        return {'op': 'diff', 'game': self.id, 'turn': self.turn,
+                'direction': move.direction, 'records': list(move.records),
+                'spawn': move.spawn, 'exponent': move.exponent,
+                'score': self.score, 'over': self.over}
+
+
+class Connection(object):
+    """The outgoing messages of a client, queued as encoded lines."""
+
+    def __init__(self, writer, queue_size=64):
+        self.writer = writer
+        self.queue = asyncio.Queue(queue_size)
+        self.games = {}  # game id: Game
+        self.stale = False  # dropped messages, send states when caught up
+
+    def send(self, data):
+        if self.stale:
+            return
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.stale = True
+            self.queue.put_nowait(b'')  # wakes up the writer to resync
+
+    def close(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class Server(object):
+    """Hosts games in one event loop, see the module for the protocol.
+
+    Every connection has a queue of at most `queue_size` messages, and at
+    most `max_games` games are played at once.
+    """
+
+    def __init__(self, queue_size=64, max_games=10000):
+        self.queue_size, self.max_games = queue_size, max_games
+        self.games = {}
+        self._next_id = 1
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT, path=None):
+        """Listen on a Unix socket at path, or on host and port."""
+        if path:
+            return await asyncio.start_unix_server(self.handle, path,
+                                                   limit=MAX_LINE)
+        return await asyncio.start_server(self.handle, host, port,
+                                          limit=MAX_LINE)
+
+    async def handle(self, reader, writer):
+        connection = Connection(writer, self.queue_size)
+        writing = asyncio.ensure_future(self._write(connection))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):  # too long or reset
+                    break
+                if not line:
+                    break
+
+                try:
+                    message = json.loads(line.decode('utf-8'))
+                    self.dispatch(connection, message)
+                except (ValueError, KeyError, TypeError) as err:
+                    connection.send(encode({'op': 'error',
+                                            'message': str(err)}))
+        except asyncio.CancelledError:  # the server is shutting down
+            writing.cancel()
+        finally:
+            for game in list(connection.games.values()):
+                self.leave(connection, game)
+            connection.close()
+
+        try:
+            await writing  # until the None that close queued
+        except asyncio.CancelledError:
+            pass
+        writer.close()
+
+    async def _write(self, connection):
+        writer = connection.writer
+        try:
+            while True:
+                data = await connection.queue.get()
+                if data is None:
+                    break
+                if connection.stale:
+                    connection.stale = False
+                    data = b''.join(encode(game.state())
+                                    for game in connection.games.values())
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+
+    def dispatch(self, connection, message):
+        op = message['op']
+        if op == 'list':
+            connection.send(encode({'op': 'list', 'games': [
+                {'game': game.id, 'rows': len(game.grid),
+                 'cols': len(game.grid[0]), 'score': game.score,
+                 'players': len(game.players),
+                 'watchers': len(game.watchers)}
+                for game in self.games.values()]}))
+            return
+
+        if op == 'new':
+            if len(self.games) >= self.max_games:
+                raise ValueError("too many games")
+            rows = parse_int(message, 'rows', 4, 1, MAX_SIZE)
+            cols = parse_int(message, 'cols', 4, 1, MAX_SIZE)
+            if rows * cols < 2:  # a game starts with two tiles
+                raise ValueError("a game needs at least 2 cells")
+            game = Game(self._next_id, rows, cols,
+                        parse_int(message, 'base', 2, 2),
+                        message.get('seed'))
+            self._next_id += 1
+            self.games[game.id] = game
+            op = 'play'
+        else:
+            game = self.games.get(message['game'])
+            if game is None:
+                raise ValueError("no game {}".format(message['game']))
+
+        if op in ('play', 'watch'):
+            game.watchers.discard(connection)
+            game.players.discard(connection)
+            (game.players if op == 'play' else game.watchers).add(connection)
+            connection.games[game.id] = game
+            connection.send(encode(game.state()))
+        elif op == 'leave':
+            self.leave(connection, game)
+        elif op == 'move':
+            if connection not in game.players:
+                raise ValueError("not playing game {}".format(game.id))
+            diff = game.move(parse_direction(message['direction']))
+            if diff:
+                self.broadcast(game, encode(diff))
+        else:
+            raise ValueError("unknown op {!r}".format(op))
+
+    def broadcast(self, game, data):
+        for connection in game.connections:
+            connection.send(data)
+
+    def leave(self, connection, game):
+        game.players.discard(connection)
+        game.watchers.discard(connection)
+        connection.games.pop(game.id, None)
+        if not game.players and not game.watchers:
+            del self.games[game.id]
+
+
+parser = argparse.ArgumentParser(
+    description="Host games for macht.term.client players and spectators.")
+parser.add_argument('--host', default='127.0.0.1',
+                    help="address to listen on (default: 127.0.0.1)")
+parser.add_argument('-p', '--port', type=int, default=DEFAULT_PORT,
+                    help="port to listen on (default: {})".format(
+                        DEFAULT_PORT))
+parser.add_argument('-u', '--unix', metavar='PATH', default=None,
+                    help="listen on a Unix socket at PATH instead")
+parser.add_argument('--queue-size', metavar='N', type=int, default=64,
+                    help="messages queued for a client before it gets "
+                    "states instead of diffs (default: 64)")
+
+
+async def serve(opts):
+    server = await Server(opts.queue_size).start(opts.host, opts.port,
+                                                  opts.unix)
+    async with server:
+        await server.serve_forever()
+
+
+def main(args=None):
+    opts = parser.parse_args(args if args is not None else sys.argv[1:])
+    try:
+        asyncio.run(serve(opts))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import random
+
+from .grid import (Direction, Actions, Position, GridAction, SpawnTileError)
+from .tile import Tile, tile_cache
+
+
+class SparseRow(object):
+    """A row of a SparseGrid, indexed like a row of a Grid."""
+
+    def __init__(self, grid, index):
+        self.grid, self.index = grid, index
+
+    def _column(self, column):
+        if column < 0:
+            column += self.grid.cols
+        if not 0 <= column < self.grid.cols:
+            raise IndexError("column index out of range")
+        return column
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[column]
+                    for column in range(*item.indices(self.grid.cols))]
+        return self.grid._tiles.get((self.index, self._column(item)))
+
+    def __setitem__(self, item, tile):
+        self.grid._set(self.index, self._column(item), tile)
+
+    def __len__(self):
+        return self.grid.cols
+
+    def __iter__(self):
+        return (self[column] for column in range(self.grid.cols))
+
+
+class SparseGrid(object):
+    """A Grid for huge boards, with the same interface as Grid, that only
+    stores its tiles.
+
+    Moves, spawns and resizes take time in the number of tiles, not cells.
+    The empty cells are the complement of the tiles: a spawn picks the n-th
+    empty cell in row-major order by counting the tiles before it, which
+    picks the same cell as Grid and BitGrid for the same rng.
+    """
+
+    def __init__(self, rows=4, cols=4, Tile=Tile, rng=random):
+        self.rows, self.cols = rows, cols
+        self.Tile = Tile
+        self.rng = rng
+        self._tiles = {}  # (row, column): tile
+        self._cache = tile_cache(Tile)
+
+    @classmethod
+    def from_grid(cls, grid, **kwargs):
+        sparse = cls(len(grid), len(grid[0]), **kwargs)
+        for row_idx, row in enumerate(grid):
+            for col_idx, tile in enumerate(row):
+                if tile:
+                    sparse[row_idx][col_idx] = tile
+        return sparse
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [SparseRow(self, row_idx)
+                    for row_idx in range(*item.indices(self.rows))]
+        if item < 0:
+            item += self.rows
+        if not 0 <= item < self.rows:
+            raise IndexError("row index out of range")
+        return SparseRow(self, item)
+
+    def __len__(self):
+        return self.rows
+
+    def __iter__(self):
+        return (SparseRow(self, row_idx) for row_idx in range(self.rows))
+
+    def __repr__(self):
+        return "SparseGrid(rows={}, cols={})".format(self.rows, self.cols)
+
+    def _set(self, row, column, tile):
+        if tile:
+            self._tiles[row, column] = tile
+        else:
+            self._tiles.pop((row, column), None)
+
+    def tiles(self):
+        """Yield the (Position, tile) of every tile, in no particular order."""
+        for (row, column), tile in self._tiles.items():
+            yield Position(row, column), tile
+
+    @property
+    def empty_count(self):
+        return self.rows * self.cols - len(self._tiles)
+
+    @property
+    def highest_tile(self):
+        return max(self._tiles.values()) if self._tiles else None
+
+    @property
+    def possible_moves(self):
+        return [dir for dir in Direction if self.can_move(dir)]
+
+    @property
+    def has_moves(self):
+        if self._tiles and self.empty_count:
+            return True
+        return self.can_move(Direction.down) or self.can_move(Direction.right)
+
+    def can_move(self, direction):
+        """Whether moving in direction would move or merge any tile."""
+        if not isinstance(direction, Direction):
+            raise TypeError
+
+        row_step, col_step = {Direction.up: (-1, 0), Direction.down: (1, 0),
+                              Direction.left: (0, -1),
+                              Direction.right: (0, 1)}[direction]
+        tiles = self._tiles
+        for (row, column), tile in tiles.items():
+            row, column = row + row_step, column + col_step
+            if 0 <= row < self.rows and 0 <= column < self.cols:
+                neighbour = tiles.get((row, column))
+                if not neighbour or neighbour == tile:
+                    return True
+        return False
+
+    def _nth_empty(self, index):
+        """The index-th empty cell (counting from 0) in row-major order."""
+        cols = self.cols
+        cell = index
+        for occupied in sorted(row * cols + column
+                               for row, column in self._tiles):
+            if occupied > cell:
+                break
+            cell += 1
+        return divmod(cell, cols)
+
+    def spawn_tile(self, row=None, column=None, apply=True, **kwargs):
+        if row is None and column is None:
+            empty_count = self.empty_count
+            if empty_count == 0:
+                raise SpawnTileError("no empty tiles")
+            # like rng.choice on the list of empty cells
+            row, column = self._nth_empty(self.rng.randrange(empty_count))
+        else:
+            empty_tiles = [
+                (row_idx, col_idx)
+                for row_idx in ([row] if row is not None else range(self.rows))
+                for col_idx in ([column] if column is not None
+                                else range(self.cols))
+                if (row_idx, col_idx) not in self._tiles]
+
+            if len(empty_tiles) == 0:
+                raise SpawnTileError("no empty tiles")
+
+            row, column = self.rng.choice(empty_tiles)
+
+        if apply:
+            self._tiles[row, column] = self.make_tile(**kwargs)
+
+        return GridAction(Actions.spawn, Position(row, column))
+
+    def make_tile(self, **kwargs):
+        """The shared tile equal to self.Tile(**kwargs), to place on this
+        grid.
+        """
+        return self._cache.intern(self.Tile(**kwargs))
+
+    def _line_position(self, direction):
+        """Functions from a cell to (line, position from the end the tiles
+        move to) and back.
+        """
+        last_row, last_col = self.rows - 1, self.cols - 1
+        if direction is Direction.up:
+            return (lambda row, col: (col, row),
+                    lambda line, pos: Position(pos, line))
+        elif direction is Direction.down:
+            return (lambda row, col: (col, last_row - row),
+                    lambda line, pos: Position(last_row - pos, line))
+        elif direction is Direction.left:
+            return (lambda row, col: (row, col),
+                    lambda line, pos: Position(line, pos))
+        return (lambda row, col: (row, last_col - col),
+                lambda line, pos: Position(line, last_col - pos))
+
+    def move(self, direction, apply=True):
+        if not isinstance(direction, Direction):
+            raise TypeError
+
+        to_line, to_cell = self._line_position(direction)
+        lines = {}
+        for (row, column), tile in self._tiles.items():
+            line, pos = to_line(row, column)
+            lines.setdefault(line, []).append((pos, tile))
+
+        actions, tiles, cache = [], {}, self._cache
+        for line in sorted(lines):
+            target, mergeable = 0, False
+            for pos, tile in sorted(lines[line], key=lambda item: item[0]):
+                if mergeable and tiles[target - 1] == tile:
+                    actions.append(GridAction(Actions.merge,
+                                              to_cell(line, target - 1),
+                                              to_cell(line, pos)))
+                    if apply:
+                        tiles[target - 1] = cache[tile.base,
+                                                  tile.exponent + 1]
+                    mergeable = False
+                    continue
+
+                if pos != target:
+                    actions.append(GridAction(Actions.move,
+                                              to_cell(line, target),
+                                              to_cell(line, pos)))
+                tiles[target] = tile
+                target, mergeable = target + 1, True
+
+            if apply:
+                for pos, _ in lines[line]:
+                    del self._tiles[to_cell(line, pos)]
+                for pos in range(target):
+                    self._tiles[to_cell(line, pos)] = tiles[pos]
+            tiles.clear()
+
+        return actions
+
+    def resize(self, rows=None, cols=None):
+        self.rows, self.cols = rows or self.rows, cols or self.cols
+        for row, column in list(self._tiles):
+            if row >= self.rows or column >= self.cols:
+                del self._tiles[row, column]
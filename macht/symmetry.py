@@ -0,0 +1,270 @@
+from collections import namedtuple
+
+from .bitboard import LazyTable, _lanes_mask
+from .grid import Direction
+
+# A symmetry of a board: transpose it (square boards only), then reverse the
+# order of its rows and/or of the cells in every row. The 8 symmetries of a
+# square board are the rotations and reflections, other boards have 4.
+_Symmetry = namedtuple('Symmetry', 'transpose flip_rows flip_cols')
+
+_transposed = {Direction.up: Direction.left, Direction.left: Direction.up,
+               Direction.down: Direction.right,
+               Direction.right: Direction.down}
+_flipped_rows = {Direction.up: Direction.down, Direction.down: Direction.up}
+_flipped_cols = {Direction.left: Direction.right,
+                 Direction.right: Direction.left}
+
+
+class Symmetry(_Symmetry):
+    __slots__ = ()
+
+    def direction(self, direction):
+        """The direction that, on the transformed board, does what direction
+        does on the board: from a board to its canonical orientation.
+        """
+        return _directions[self][direction]
+
+    def inverse_direction(self, direction):
+        """The direction on the board for a direction on the transformed
+        board: from the canonical orientation back to the board.
+        """
+        return _inverse_directions[self][direction]
+
+    def cell(self, row, column, rows, cols):
+        """Where cell (row, column) of a rows by cols board ends up."""
+        if self.transpose:
+            row, column, rows, cols = column, row, cols, rows
+        if self.flip_rows:
+            row = rows - 1 - row
+        if self.flip_cols:
+            column = cols - 1 - column
+        return row, column
+
+
+SYMMETRIES = tuple(Symmetry(transpose, flip_rows, flip_cols)
+                   for transpose in (False, True)
+                   for flip_rows in (False, True)
+                   for flip_cols in (False, True))
+IDENTITY = SYMMETRIES[0]
+
+
+def _transform_direction(direction, symmetry):
+    if symmetry.transpose:
+        direction = _transposed[direction]
+    if symmetry.flip_rows:
+        direction = _flipped_rows.get(direction, direction)
+    if symmetry.flip_cols:
+        direction = _flipped_cols.get(direction, direction)
+    return direction
+
+
+_directions = dict((symmetry, dict((direction, _transform_direction(
+    direction, symmetry)) for direction in Direction))
+    for symmetry in SYMMETRIES)
+_inverse_directions = dict(
+    (symmetry, dict((new, old) for old, new in _directions[symmetry].items()))
+    for symmetry in SYMMETRIES)
+
+
+def symmetries(rows, cols):
+    """The symmetries of a rows by cols board."""
+    if rows == cols:
+        return SYMMETRIES
+    return tuple(symmetry for symmetry in SYMMETRIES
+                 if not symmetry.transpose)
+
+
+def transform_exponents(exponents, symmetry):
+    """Transform a board given as rows of exponents (or of tiles)."""
+    rows, cols = len(exponents), len(exponents[0])
+    new_rows, new_cols = (cols, rows) if symmetry.transpose else (rows, cols)
+    transformed = [[None] * new_cols for _ in range(new_rows)]
+    for row_idx, row in enumerate(exponents):
+        for col_idx, exponent in enumerate(row):
+            new_row, new_col = symmetry.cell(row_idx, col_idx, rows, cols)
+            transformed[new_row][new_col] = exponent
+    return transformed
+
+
+_orders = {}
+
+
+def _cell_orders(rows, cols):
+    """For every symmetry, the cells of the board in the order of the cells
+    of the transformed board, last cell first.
+    """
+    key = (rows, cols)
+    if key not in _orders:
+        orders = []
+        for symmetry in symmetries(rows, cols):
+            order = [0] * (rows * cols)
+            new_cols = rows if symmetry.transpose else cols
+            for row in range(rows):
+                for col in range(cols):
+                    new_row, new_col = symmetry.cell(row, col, rows, cols)
+                    order[new_row * new_cols + new_col] = row * cols + col
+            orders.append((symmetry, order[::-1]))
+        _orders[key] = orders
+    return _orders[key]
+
+
+def transform_cells(cells, rows, cols, symmetry):
+    """Transform a board given as a flat, row-major list of cells."""
+    for order_symmetry, order in _cell_orders(rows, cols):
+        if order_symmetry == symmetry:
+            return [cells[cell] for cell in reversed(order)]
+    raise ValueError("{} is not a symmetry of {}x{} boards".format(
+        symmetry, rows, cols))
+
+
+def canonical_exponents(exponents, rows, cols):
+    """Return the canonical form of a board given as a flat, row-major list
+    of exponents, as a tuple of the same kind, and the symmetry that maps the
+    board onto it.
+
+    The canonical form is the transformed board that packs into the smallest
+    BitGrid board, so the symmetry is the one BitGrid.canonical finds.
+    """
+    best, best_symmetry = None, None
+    for symmetry, order in _cell_orders(rows, cols):
+        transformed = tuple([exponents[cell] for cell in order])
+        if best is None or transformed < best:
+            best, best_symmetry = transformed, symmetry
+    return best[::-1], best_symmetry
+
+
+def _flips_4x4(bits):
+    """flip_rows and flip_cols of a 4x4 board of bits wide lanes, with
+    masks and shifts.
+    """
+    row0, row1, row2, row3 = [_lanes_mask(range(row * 4, row * 4 + 4), bits)
+                              for row in range(4)]
+    col0, col1, col2, col3 = [_lanes_mask(range(col, 16, 4), bits)
+                              for col in range(4)]
+    row_shift1, row_shift3 = 4 * bits, 12 * bits
+    col_shift1, col_shift3 = bits, 3 * bits
+
+    def flip_rows(board):
+        return (((board & row0) << row_shift3) |
+                ((board & row1) << row_shift1) |
+                ((board & row2) >> row_shift1) |
+                ((board & row3) >> row_shift3))
+
+    def flip_cols(board):
+        return (((board & col0) << col_shift3) |
+                ((board & col1) << col_shift1) |
+                ((board & col2) >> col_shift1) |
+                ((board & col3) >> col_shift3))
+    return flip_rows, flip_cols
+
+
+class BoardSymmetry(object):
+    """Symmetries of packed boards of one bitboard Layout, use
+    `board_symmetry()` to get a shared instance.
+    """
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.symmetries = symmetries(layout.rows, layout.cols)
+        self._row_shifts = [row * layout.row_bits
+                            for row in range(layout.rows)]
+        self._reversed_rows = LazyTable(
+            lambda line: layout.row_table.pack(
+                layout.row_table.unpack(line)[::-1]))
+
+        if layout.rows == layout.cols == 4:
+            self.flip_rows, self.flip_cols = _flips_4x4(layout.bits)
+
+    def flip_rows(self, board):
+        layout, flipped = self.layout, 0
+        last = self._row_shifts[-1]
+        for shift in self._row_shifts:
+            flipped |= ((board >> shift) & layout.row_mask) << (last - shift)
+        return flipped
+
+    def flip_cols(self, board):
+        layout, flipped = self.layout, 0
+        reversed_rows = self._reversed_rows
+        for shift in self._row_shifts:
+            flipped |= reversed_rows[(board >> shift) &
+                                     layout.row_mask] << shift
+        return flipped
+
+    def transform(self, board, symmetry):
+        if symmetry.transpose:
+            board = self.layout.transpose(board)
+        if symmetry.flip_rows:
+            board = self.flip_rows(board)
+        if symmetry.flip_cols:
+            board = self.flip_cols(board)
+        return board
+
+    def inverse(self, board, symmetry):
+        """Undo transform(board, symmetry)."""
+        if symmetry.flip_cols:
+            board = self.flip_cols(board)
+        if symmetry.flip_rows:
+            board = self.flip_rows(board)
+        if symmetry.transpose:
+            board = self.layout.transpose(board)
+        return board
+
+    def canonical(self, board):
+        """Return the smallest transformed board and its symmetry, the
+        first in SYMMETRIES when several give the same board.
+        """
+        flip_rows, flip_cols = self.flip_rows, self.flip_cols
+        best, best_symmetry = board, IDENTITY
+        for transpose in ((False, True) if len(self.symmetries) == 8
+                          else (False,)):
+            transposed = self.layout.transpose(board) if transpose else board
+            cols = flip_cols(transposed)
+            for candidate, flip in ((transposed, (False, False)),
+                                    (cols, (False, True)),
+                                    (flip_rows(transposed), (True, False)),
+                                    (flip_rows(cols), (True, True))):
+                if candidate < best:
+                    best, best_symmetry = candidate, Symmetry(transpose, *flip)
+        return best, best_symmetry
+
+    def canonical_board(self, board):
+        """Only the smallest transformed board, for use as a cache key."""
+        flip_rows, flip_cols = self.flip_rows, self.flip_cols
+        cols = flip_cols(board)
+        best = min(board, cols, flip_rows(board), flip_rows(cols))
+        if len(self.symmetries) == 8:
+            board = self.layout.transpose(board)
+            cols = flip_cols(board)
+            best = min(best, board, cols, flip_rows(board), flip_rows(cols))
+        return best
+
+
+_board_symmetries = {}
+
+
+def board_symmetry(layout):
+    if layout not in _board_symmetries:
+        _board_symmetries[layout] = BoardSymmetry(layout)
+    return _board_symmetries[layout]
+
+
+def canonical(grid):
+    """Return the canonical form of a Grid, BitGrid or SparseGrid, the same
+    for all its symmetries, and the symmetry that maps grid onto it.
+
+    For a BitGrid the form is a packed board, for other grids a row-major
+    tuple of exponents.
+    """
+    if hasattr(grid, 'board'):
+        return board_symmetry(grid.layout).canonical(grid.board)
+
+    rows, cols = len(grid), len(grid[0])
+    return canonical_exponents(
+        [tile.exponent if tile else 0 for row in grid for tile in row],
+        rows, cols)
+
+
+def canonical_hash(grid):
+    """A hash of grid that is the same for all its symmetries."""
+    return hash(canonical(grid)[0])
@@ -0,0 +1,126 @@
+from time import time
+
+from ..grid import Actions
+from .render import Canvas
+
+
+class Animation(object):
+    """The tiles of one grid sliding from where they were before a move to
+    where the move put them.
+
+    Expects the grid after the move and the actions of the move, including
+    the spawn. Spawned tiles only appear on the last frame, merge targets keep
+    their old value until then.
+    """
+
+    def __init__(self, grid, actions):
+        self.grid = grid
+
+        moved_into = set(a.new for a in actions if a.type is Actions.move)
+        merged_into = set(a.new for a in actions if a.type is Actions.merge)
+        spawned = set(a.new for a in actions if a.type is Actions.spawn)
+
+        self.sprites = []  # (old position, new position, base, exponent)
+        for action in actions:
+            if action.type is Actions.spawn:
+                continue
+            tile = grid[action.new.row][action.new.column]
+            exponent = tile.exponent - (action.new in merged_into)
+            self.sprites.append((action.old, action.new, tile.base, exponent))
+
+        self.still = []  # (position, base, exponent)
+        for position, tile in self.tiles():
+            if position in spawned or position in moved_into:
+                continue
+            exponent = tile.exponent - (position in merged_into)
+            self.still.append((position, tile.base, exponent))
+
+    def tiles(self):
+        for row_idx, row in enumerate(self.grid):
+            for col_idx, tile in enumerate(row):
+                if tile:
+                    yield (row_idx, col_idx), tile
+
+    def _canvas(self):
+        grid = self.grid
+        canvas = Canvas(grid.x, grid.y, grid.width, grid.height)
+        grid.paint(canvas)
+        return canvas
+
+    def canvas(self, progress):
+        """The grid with every moving tile `progress` (0 to 1) of the way."""
+        grid, canvas = self.grid, self._canvas()
+
+        for position, base, exponent in self.still:
+            x, y = grid.tile_coord(*position)
+            grid.paint_tile(canvas, x, y, base, exponent)
+
+        for old, new, base, exponent in self.sprites:
+            old_x, old_y = grid.tile_coord(*old)
+            new_x, new_y = grid.tile_coord(*new)
+            grid.paint_tile(canvas, old_x + int(round((new_x - old_x) *
+                                                      progress)),
+                            old_y + int(round((new_y - old_y) * progress)),
+                            base, exponent)
+        return canvas
+
+    def final_canvas(self):
+        grid, canvas = self.grid, self._canvas()
+        for position, tile in self.tiles():
+            x, y = grid.tile_coord(*position)
+            grid.paint_tile(canvas, x, y, tile.base, tile.exponent)
+        return canvas
+
+
+class Animator(object):
+    """Plays Animations of several grids at once into a shared Frame.
+
+    Frames are timed rather than counted: every `step` draws the frame for
+    the current time, at most `fps` times a second, so slow frames are
+    skipped instead of slowing down the animation. `finish` jumps to the last
+    frame, e.g. when a key is pressed before the animation is over.
+    """
+
+    def __init__(self, frame, duration=0.1, fps=60):
+        self.frame = frame
+        self.duration, self.interval = duration, 1.0 / fps
+        self._playing = []  # [animation, canvas currently on screen]
+        self._start = self._last_frame = 0
+        self.frames = 0
+
+    @property
+    def active(self):
+        return bool(self._playing)
+
+    def start(self, animations):
+        self.finish()
+        self._playing = [[animation, animation.canvas(0)]
+                         for animation in animations]
+        self._start = self._last_frame = time()
+
+    def timeout(self):
+        """Seconds until the next frame is due."""
+        return max(0, self._last_frame + self.interval - time())
+
+    def step(self):
+        now = time()
+        progress = (now - self._start) / self.duration
+        if progress >= 1:
+            self.finish()
+            return
+
+        for playing in self._playing:
+            animation, on_screen = playing
+            playing[1] = animation.canvas(progress)
+            playing[1].draw(self.frame, on_screen)
+        self._last_frame = now
+        self.frames += 1
+
+    def finish(self):
+        for animation, on_screen in self._playing:
+            animation.final_canvas().draw(self.frame, on_screen)
+            animation.grid.mark_drawn()
+        self._playing = []
+
+    def cancel(self):
+        self._playing = []
@@ -0,0 +1,167 @@
+"""Play or watch a game hosted by macht.server in the terminal."""
+import sys
+import json
+import signal
+import asyncio
+import argparse
+from functools import partial
+
+from ..grid import Actions, Direction, GridAction, Position
+from ..options import grid_dimension
+from ..server import DEFAULT_PORT, encode
+from .grid import Grid
+from .main import draw_score, grid_moves, term_resize
+from .render import Frame
+from .tile import Tile
+
+parser = argparse.ArgumentParser(
+    description="Play or watch a game on a macht server.",
+    epilog="Use the arrow, wasd or hjkl keys to move the tiles, q to quit.")
+parser.add_argument('grid_dims', metavar='GRID_DIMENSIONS',
+                    type=grid_dimension, nargs='?',
+                    default={'rows': 4, 'cols': 4},
+                    help="dimensions of a new game, default: '4x4'")
+parser.add_argument('--host', default='127.0.0.1',
+                    help="address of the server (default: 127.0.0.1)")
+parser.add_argument('-p', '--port', type=int, default=DEFAULT_PORT,
+                    help="port of the server (default: {})".format(
+                        DEFAULT_PORT))
+parser.add_argument('-u', '--unix', metavar='PATH', default=None,
+                    help="connect to a Unix socket at PATH instead")
+parser.add_argument('-b', '--base', metavar='N', type=int, default=2,
+                    help="base value of all tiles of a new game")
+parser.add_argument('-s', '--seed', metavar='SEED', type=int, default=None,
+                    help="seed the tile spawns of a new game")
+join = parser.add_mutually_exclusive_group()
+join.add_argument('--play', metavar='GAME', type=int, default=None,
+                  help="play a game that is being played")
+join.add_argument('--watch', metavar='GAME', type=int, default=None,
+                  help="watch a game without playing")
+
+
+class RemoteGame(object):
+    """A terminal Grid kept in step with the messages of a server."""
+
+    def __init__(self, term, frame):
+        self.term, self.frame = term, frame
+        self.game = self.grid = None
+        self.score, self.over = 0, False
+        self.term_too_small = False
+
+    def handle(self, message):
+        op = message['op']
+        if op == 'state':
+            self._set_state(message)
+        elif op == 'diff' and self.grid and message['game'] == self.game:
+            self._apply_diff(message)
+        elif op == 'error':
+            self.frame.write(0, self.term.height - 1, self.term.clear_eol +
+                             self.term.red(message['message']))
+            return
+        else:
+            return
+
+        self.score, self.over = message['score'], message['over']
+        if not self.term_too_small:
+            draw_score(self.score, self.frame, end=self.over)
+
+    def _set_state(self, state):
+        self.game = state['game']
+        self.grid = Grid(x=0, y=1, rows=state['rows'], cols=state['cols'],
+                         term=self.term, frame=self.frame,
+                         Tile=partial(Tile, term=self.term,
+                                      base=state['base']))
+        for cell, exponent in enumerate(state['cells']):
+            if exponent:
+                row, column = divmod(cell, state['cols'])
+                self.grid[row][column] = self.grid.make_tile(
+                    exponent=exponent)
+        self.resize()
+
+    def _apply_diff(self, diff):
+        grid, cols = self.grid, len(self.grid[0])
+        actions = grid.move(Direction(diff['direction']))
+        row, column = divmod(diff['spawn'], cols)
+        grid[row][column] = grid.make_tile(exponent=diff['exponent'])
+        actions.append(GridAction(Actions.spawn, Position(row, column)))
+        if not self.term_too_small:
+            grid.draw_actions(actions)
+
+    def resize(self):
+        if self.grid:
+            self.term_too_small = not term_resize(self.frame, [self.grid])
+            if not self.term_too_small:
+                draw_score(self.score, self.frame, end=self.over)
+
+
+async def run(opts, term, frame):
+    if opts.unix:
+        reader, writer = await asyncio.open_unix_connection(opts.unix)
+    else:
+        reader, writer = await asyncio.open_connection(opts.host, opts.port)
+
+    if opts.watch is not None:
+        writer.write(encode({'op': 'watch', 'game': opts.watch}))
+    elif opts.play is not None:
+        writer.write(encode({'op': 'play', 'game': opts.play}))
+    else:
+        writer.write(encode(dict(op='new', base=opts.base, seed=opts.seed,
+                                 **opts.grid_dims)))
+
+    remote = RemoteGame(term, frame)
+    done = asyncio.Event()
+    loop = asyncio.get_event_loop()
+
+    def on_key():
+        key = term.inkey(timeout=0)
+        while key:
+            if key in ('q', 'KEY_ESCAPE'):
+                done.set()
+            direction = grid_moves.get(key.name or key)
+            if direction and remote.grid and opts.watch is None:
+                writer.write(encode({'op': 'move', 'game': remote.game,
+                                     'direction': direction.name}))
+            key = term.inkey(timeout=0)
+
+    def on_resize():
+        remote.resize()
+        frame.flush()
+
+    async def receive():
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            remote.handle(json.loads(line.decode('utf-8')))
+            frame.flush()
+        done.set()
+
+    loop.add_reader(sys.stdin.fileno(), on_key)
+    loop.add_signal_handler(signal.SIGWINCH, on_resize)
+    receiving = asyncio.ensure_future(receive())
+    try:
+        await done.wait()
+    finally:
+        loop.remove_reader(sys.stdin.fileno())
+        loop.remove_signal_handler(signal.SIGWINCH)
+        receiving.cancel()
+        writer.close()
+    return remote
+
+
+def main(args=None):
+    opts = parser.parse_args(args if args is not None else sys.argv[1:])
+
+    import blessed
+    term = blessed.Terminal()
+    frame = Frame(term)
+
+    with term.fullscreen(), term.cbreak(), term.hidden_cursor():
+        remote = asyncio.run(run(opts, term, frame))
+
+    print("game: {}\nscore: {}".format(remote.game, remote.score))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,8 @@
-from itertools import product, chain
+from itertools import product
 
 from .. import grid
 from . import tile
+from .render import Frame
 
 bg_colors = ['red', 'magenta', 'green', 'cyan', 'blue', 'cyan', 'yellow']
 fg_colors = ['black', 'black', 'black', 'black', 'white', 'black', 'black']
@@ -13,14 +14,16 @@ class Grid(grid.Grid):
     cross_div = 'XX'
 
     def __init__(self, x=0, y=0, rows=0, cols=0, tile_width=0, tile_height=0,
-                 term=None, Tile=tile.Tile):
-        super(Grid, self).__init__(rows=rows, cols=cols, Tile=Tile)
+                 term=None, Tile=tile.Tile, frame=None, rng=grid.random):
+        super(Grid, self).__init__(rows=rows, cols=cols, Tile=Tile, rng=rng)
         self.x, self.y = x, y
         self.tile_width, self.tile_height = tile_width, tile_height
         self.term = term
+        self.frame = frame if frame is not None else Frame(term)
+        self._drawn = {}  # (row, column): exponent of the tile on screen
 
-    def draw(self, fg='white', bg=None):
-        style = getattr(self.term, fg + ("_on_" + bg if bg else ""))
+    def dividers(self):
+        """Yield the (x, y, text) pieces of the lines between tiles."""
         rows, cols = len(self), len(self[0])
 
         for col_idx in range(cols - 1):
@@ -28,40 +31,100 @@ class Grid(grid.Grid):
                           col_idx * len(self.vert_div))
 
             for vert_offset in range(self.height):
-                with self.term.location(self.x + hor_offset,
-                                        self.y + vert_offset):
-                    print(style(self.vert_div))
+                yield self.x + hor_offset, self.y + vert_offset, self.vert_div
 
         for row_idx in range(rows - 1):
             vert_offset = (row_idx + 1) * self.tile_height + row_idx
-            with self.term.location(self.x, self.y + vert_offset):
-                print(style(self.cross_div.join(
-                      [self.hor_div * self.tile_width] * cols)))
+            yield self.x, self.y + vert_offset, self.cross_div.join(
+                [self.hor_div * self.tile_width] * cols)
+
+    def draw(self, fg='white', bg=None):
+        style = getattr(self.term, fg + ("_on_" + bg if bg else ""))
+        for x, y, text in self.dividers():
+            self.frame.write(x, y, style(text))
+
+    def paint(self, canvas, fg='white', bg=None):
+        """Like draw, but onto a render.Canvas."""
+        style = fg + ("_on_" + bg if bg else "")
+        for x, y, text in self.dividers():
+            canvas.text(x, y, text, style)
+
+    def tile_colors(self, exponent):
+        # choose a color, use modulo to support any value of a tile
+        # all bg colors have a bright variant doubling the amount of colors
+        color_idx = (exponent - 1) % (len(bg_colors) * 2) // 2
+        bg = bg_colors[color_idx]
+        if self.term.number_of_colors >= 16 and exponent % 2 == 0:
+            bg = "bright_" + bg
+
+        return fg_colors[color_idx], bg
+
+    def draw_tile(self, row, column):
+        tile = self[row][column]
+        fg, bg = self.tile_colors(tile.exponent)
+        x, y = self.tile_coord(row, column)
+        tile.draw(x, y, self.tile_width, self.tile_height, fg=fg, bg=bg,
+                  frame=self.frame)
+
+    def paint_tile(self, canvas, x, y, base, exponent):
+        """Like Tile.draw, but onto a render.Canvas at any position."""
+        fg, bg = self.tile_colors(exponent)
+        style, text = fg + "_on_" + bg, str(base ** exponent)
+
+        canvas.fill(x, y, self.tile_width, self.tile_height, style)
+        hor_offset = (self.tile_width + 1) // 2 - (len(text) + 1) // 2
+        vert_offset = (self.tile_height + 1) // 2 - 1
+        canvas.text(x + hor_offset, y + vert_offset, text, style)
 
-    def update_tiles(self):
+    def draw_tiles(self):
+        """Draw every tile, assuming the screen shows no tiles."""
+        self._drawn = {}
+        for row_idx, col_idx in product(range(len(self)), range(len(self[0]))):
+            tile = self[row_idx][col_idx]
+            if tile:
+                self.draw_tile(row_idx, col_idx)
+                self._drawn[row_idx, col_idx] = tile.exponent
+
+    def mark_drawn(self):
+        """Record that the screen shows every tile as it is now."""
+        self._drawn = {}
         for row_idx, col_idx in product(range(len(self)), range(len(self[0]))):
             if self[row_idx][col_idx]:
-                tile = self[row_idx][col_idx]
-                tile.x, tile.y = self.tile_coord(row_idx, col_idx)
-                tile.height, tile.width = self.tile_height, self.tile_width
-                self[row_idx][col_idx] = tile
+                self._drawn[row_idx, col_idx] = self[row_idx][col_idx].exponent
+
+    def draw_cell(self, row, column):
+        tile = self[row][column]
+        exponent = tile.exponent if tile else None
+        if self._drawn.get((row, column)) == exponent:
+            return  # unchanged since the last frame
+
+        if tile:
+            self.draw_tile(row, column)
+            self._drawn[row, column] = exponent
+        else:
+            self.draw_empty_tile(row, column)
+            del self._drawn[row, column]
+
+    def draw_cells(self):
+        """Redraw the cells that changed since they were drawn."""
+        for row_idx, col_idx in product(range(len(self)), range(len(self[0]))):
+            self.draw_cell(row_idx, col_idx)
 
-    def draw_tiles(self):
-        for tile in filter(None, chain(*self)):  # all non-empty tiles
-            # choose a color, use modulo to support any value of a tile
-            # all bg colors have a bright variant doubling the amount of colors
-            color_idx = (tile.exponent - 1) % (len(bg_colors) * 2) // 2
-            bg = bg_colors[color_idx]
-            if self.term.number_of_colors >= 16 and tile.exponent % 2 == 0:
-                bg = "bright_" + bg
+    def draw_actions(self, actions):
+        """Redraw only the cells that actions moved, merged or spawned in."""
+        cells = set()
+        for action in actions:
+            cells.add(action.new)
+            if action.old:
+                cells.add(action.old)
 
-            tile.draw(fg=fg_colors[color_idx], bg=bg)
+        for row, column in sorted(cells):
+            self.draw_cell(row, column)
 
     def draw_empty_tile(self, row, column):
         x, y = self.tile_coord(row, column)
         for y_offset in range(self.tile_height):
-            with self.term.location(x, y + y_offset):
-                print(' ' * self.tile_width)
+            self.frame.write(x, y + y_offset, ' ' * self.tile_width)
 
     @property
     def width(self):
@@ -85,26 +148,3 @@ class Grid(grid.Grid):
         y = self.y + row * self.tile_height + row
 
         return x, y
-
-    def spawn_tile(self, *args, **kwargs):
-        action = super(Grid, self).spawn_tile(*args, **kwargs)
-        row, column = action.new
-
-        if kwargs.get('apply', True):
-            x, y = self.tile_coord(row, column)
-            self[row][column].x, self[row][column].y = x, y
-            self[row][column].height = self.tile_height
-            self[row][column].width = self.tile_width
-
-        return action
-
-    def move(self, *args, **kwargs):
-        actions = super(Grid, self).move(*args, **kwargs)
-
-        if kwargs.get('apply', True):
-            for action in actions:
-                row, col = action.new
-
-                self[row][col].x, self[row][col].y = self.tile_coord(row, col)
-
-        return actions
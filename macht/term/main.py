@@ -1,16 +1,20 @@
+import os
 import sys
 import random
 import signal
 import argparse
+from time import time
 from functools import partial, reduce
-from itertools import chain
-
-import blessed
 
 from .. import save
-from ..grid import Direction, Actions
+from ..options import grid_dimension
+from ..game import step_all
+from ..grid import Direction
+from ..history import History, move_from_actions
 from .grid import Grid
 from .tile import Tile
+from .render import Frame
+from .animation import Animation, Animator
 
 up, left = ('w', 'k', 'KEY_UP'), ('a', 'h', 'KEY_LEFT')
 down, right = ('s', 'j', 'KEY_DOWN'), ('d', 'l', 'KEY_RIGHT')
@@ -18,20 +22,13 @@ down, right = ('s', 'j', 'KEY_DOWN'), ('d', 'l', 'KEY_RIGHT')
 grid_moves = {}
 for keys, direction in zip((up, left, down, right), Direction):
     grid_moves.update(dict.fromkeys(keys, direction))
-
-
-def grid_dimension(string):
-    rows, _, cols = string.partition('x')
-    try:
-        return {'rows': int(rows), 'cols': int(cols)}
-    except ValueError:
-        raise argparse.ArgumentTypeError(
-            "grid dimension should look like: '4x4'")
+undo_keys, redo_keys = ('u',), ('r',)
 
 
 parser = argparse.ArgumentParser(
     description="A game with the objective of merging tiles by moving them.",
-    epilog="Use the arrow, wasd or hjkl keys to move the tiles.")
+    epilog="Use the arrow, wasd or hjkl keys to move the tiles, u to undo "
+    "and r to redo a move.")
 parser.add_argument('grid_dims', metavar='GRID_DIMENSIONS',
                     type=grid_dimension, nargs='*',
                     help="Dimensions used for grid(s), default: '4x4'")
@@ -41,17 +38,55 @@ parser.add_argument('-r', '--resume', metavar='SAVE_FILE', nargs='?',
                     default=False, const=None,
                     help="resume previous game. SAVE_FILE is used to save to "
                     "and resume from. Specifying grid dimensions and/or base "
-                    "starts a new game without resuming from SAVE_FILE.")
-
-
-def draw_score(score, term, end=False):
+                    "starts a new game without resuming from SAVE_FILE. "
+                    "A SAVE_FILE ending in .macht is binary and gets every "
+                    "move appended to it as it is made.")
+parser.add_argument('-a', '--autoplay', metavar='SECONDS', type=float,
+                    nargs='?', const=0.05, default=None,
+                    help="let the computer play, thinking at most SECONDS "
+                    "per move (default: 0.05). Press q to stop.")
+parser.add_argument('--weights', metavar='FILE', default=None,
+                    help="heuristic of the computer player, a JSON file "
+                    "written by macht.tune")
+parser.add_argument('-s', '--seed', metavar='SEED', type=int, default=None,
+                    help="seed the tile spawns of the first grid with SEED, "
+                    "grid i with SEED + i, to make games reproducible")
+parser.add_argument('--undo-depth', metavar='N', type=int, default=10000,
+                    help="number of moves that can be undone, these are "
+                    "saved with the game (default: 10000)")
+parser.add_argument('--profile', metavar='FILE', nargs='?', const='-',
+                    default=None, help="time the game logic, drawing and "
+                    "saving, and report when the game ends, to stderr or as "
+                    "JSON to FILE. Also enabled by setting MACHT_PROFILE to "
+                    "1 or a file name.")
+parser.add_argument('--autosave', metavar='SECONDS', type=float, default=10,
+                    help="save the game in the background every SECONDS, 0 "
+                    "turns autosaving off (default: 10)")
+parser.add_argument('--animation-time', metavar='SECONDS', type=float,
+                    default=0.1, help="duration of the animation of a move, "
+                    "0 turns animations off (default: 0.1)")
+parser.add_argument('--archive', metavar='FILE', default=None,
+                    help="SQLite archive finished games are recorded in "
+                    "(default: archive.sqlite next to the saves)")
+parser.add_argument('--top', metavar='N', type=int, default=None,
+                    help="print the N best archived games, of "
+                    "GRID_DIMENSIONS and base if given, and exit")
+parser.add_argument('--stats', action='store_true',
+                    help="print statistics of the archived games, of "
+                    "GRID_DIMENSIONS and base if given, and exit")
+
+
+def draw_score(score, frame, end=False):
+    term = frame.term
     msg = "score: " + str(score)
-    with term.location(term.width // 2 - len(msg) // 2, 0):
-        print(term.bold_on_red(msg) if end else term.bold(msg))
+    frame.write(0, 0, term.clear_eol)  # an undo can shorten the score
+    frame.write(term.width // 2 - len(msg) // 2, 0,
+                term.bold_on_red(msg) if end else term.bold(msg))
 
 
-def term_resize(term, grids):
-    print(term.clear())
+def term_resize(frame, grids):
+    term = frame.term
+    frame.clear()
 
     max_width = (term.width - (len(grids) + 1) * 2) // len(grids)
 
@@ -62,9 +97,8 @@ def term_resize(term, grids):
             if grid.height + 1 < term.height and grid.width <= max_width:
                 break
         else:
-            with term.location(0, 0):
-                print(term.red("terminal size is too small;\n"
-                               "please resize the terminal"))
+            frame.write(0, 0, term.red("terminal size is too small;"))
+            frame.write(0, 1, term.red("please resize the terminal"))
             return False  # game can not continue until after another resize
 
     margin = (term.width - sum(g.width for g in grids) -
@@ -73,17 +107,48 @@ def term_resize(term, grids):
         grid.x = margin + sum(g.width for g in grids[:grid_idx]) + grid_idx * 2
 
         grid.draw()
-        grid.update_tiles()
         grid.draw_tiles()
 
     return True
 
 
+def show_archive(opts):
+    from ..archive import Archive, format_stats, format_top
+
+    dims = opts.grid_dims[0] if opts.grid_dims else {}
+    with Archive(opts.archive) as archive:
+        if opts.top is not None:
+            print(format_top(archive.top(opts.top, base=opts.base, **dims)))
+        if opts.stats:
+            print(format_stats(archive.stats(base=opts.base, **dims)))
+    return 0
+
+
+def record_game(opts, score, grids, moves, seconds, autoplay):
+    """Archive a finished game, return whether it was: the archive has
+    one size per game, so games of grids of different sizes are not.
+    """
+    from ..archive import Archive
+
+    if len(set((len(g), len(g[0])) for g in grids)) > 1:
+        return False
+
+    base, high = 2, 0
+    for max_tile in filter(None, (g.highest_tile for g in grids)):
+        base, high = max_tile.base, max(high, max_tile.value)
+    with Archive(opts.archive) as archive:
+        archive.record({'rows': len(grids[0]), 'cols': len(grids[0][0]),
+                        'base': base, 'grids': len(grids), 'score': score,
+                        'highest_tile': high, 'seed': opts.seed,
+                        'moves': moves, 'seconds': seconds,
+                        'source': 'autoplay' if autoplay else 'term'})
+    return True
+
+
 def main(args=None):
     global do_resize
     do_resize = True
 
-    term = blessed.Terminal()
     term_too_small = False
     game_over = False
 
@@ -93,9 +158,23 @@ def main(args=None):
     signal.signal(signal.SIGWINCH, on_resize)
 
     opts = parser.parse_args(args or sys.argv[1:])
+    if opts.top is not None or opts.stats:
+        return show_archive(opts)
+
+    import blessed  # the slowest import, not needed for e.g. --help
+    term = blessed.Terminal()
+    frame = Frame(term)
+
+    profiler = profile_output = None
+    if opts.profile or os.environ.get('MACHT_PROFILE'):
+        from .. import instrument
+        profiler, profile_output = instrument.from_environment(
+            output=opts.profile)
+
     grid_dims = opts.grid_dims or [{'rows': 4, 'cols': 4}]
     base_num = opts.base or 2
     resume = opts.resume if opts.resume is not False else False
+    animator = Animator(frame, duration=opts.animation_time)
 
     grids = []
     save_state = {}
@@ -103,12 +182,15 @@ def main(args=None):
         save_state = save.load_from_file(resume)
 
     score = save_state.get('score', 0)
-    for grid_state in save_state.get('grids', grid_dims):
+    for grid_idx, grid_state in enumerate(save_state.get('grids',
+                                                         grid_dims)):
         TermTile = partial(Tile, term=term,
                            base=grid_state.pop('base', base_num))
         tiles = grid_state.pop('tiles', ())
 
-        grid = Grid(x=0, y=1, term=term, Tile=TermTile, **grid_state)
+        seed = opts.seed + grid_idx if opts.seed is not None else None
+        grid = Grid(x=0, y=1, term=term, Tile=TermTile, frame=frame,
+                    rng=random.Random(seed), **grid_state)
         if tiles:
             for tile_state in tiles:
                 grid.spawn_tile(**tile_state)
@@ -116,45 +198,142 @@ def main(args=None):
             grid.spawn_tile()
             grid.spawn_tile()
 
-        game_over = game_over or len(grid.possible_moves) == 0
+        game_over = game_over or not grid.has_moves
 
         grids.append(grid)
 
-    with term.fullscreen(), term.cbreak(), term.hidden_cursor():
-        while True:
-            if do_resize:
-                term_too_small = not term_resize(term, grids)
-                do_resize = False
-
-            if not term_too_small:
-                draw_score(score, term, end=game_over)
-
-            key = term.inkey()
-            if key in ('q', 'KEY_ESCAPE') or game_over:
-                save.write_to_file(score, grids, filename=resume or None)
-                break
-
-            direction = grid_moves.get(key.name or key)
-            if not direction or term_too_small:
-                continue
-
-            for grid in grids:
-                actions = grid.move(direction)
+    player = None
+    if opts.autoplay is not None:
+        from ..ai import Player, PoolPlayer
+        player_options = {'time_budget': opts.autoplay}
+        if opts.weights:
+            from ..heuristics import load_from_file
+            player_options['heuristic'] = load_from_file(opts.weights)
+        if len(grids) > 1:  # search the moves of all grids at once
+            player = PoolPlayer(jobs=min(len(grids), os.cpu_count() or 1),
+                                **player_options)
+        else:
+            player = Player(**player_options)
 
-                for action in actions:
-                    grid.draw_empty_tile(*action.old)
+    history = History(opts.undo_depth, save_state.get('history', ()))
+    # moves of a resumed game older than its history are not counted
+    moves, session_moves, start = len(history), 0, time()
 
-                    if action.type == Actions.merge:
-                        row, column = action.new
-                        score += grid[row][column].value
+    move_log = None
+    if resume and save.is_binary(resume):
+        move_log = save.MoveLog(resume)
+        move_log.start(score, grids, history)
 
-                if actions:  # had any successfull move(s)?
-                    grid.spawn_tile(exponent=2 if random.random() > 0.9 else 1)
+    autosaver = None
+    if not move_log and opts.autosave > 0:
+        autosaver = save.AutoSaver(resume or None, interval=opts.autosave)
 
-                    grid.draw_tiles()
+    def on_hangup(signal, frame):
+        raise SystemExit(1)
+    signal.signal(signal.SIGHUP, on_hangup)
 
-                if all(chain(*grid)):
-                    game_over = game_over or len(grid.possible_moves) == 0
+    try:
+        with term.fullscreen(), term.cbreak(), term.hidden_cursor():
+            while True:
+                if do_resize:
+                    animator.cancel()
+                    term_too_small = not term_resize(frame, grids)
+                    do_resize = False
+
+                if not term_too_small:
+                    draw_score(score, frame, end=game_over)
+                frame.flush()
+
+                if animator.active:
+                    timeout = animator.timeout()
+                else:
+                    timeout = 0 if player and not game_over else None
+
+                key = term.inkey(timeout=timeout)
+                if not key and animator.active:
+                    animator.step()
+                    continue
+                animator.finish()  # keys are never kept waiting by animations
+
+                if key in ('q', 'KEY_ESCAPE'):
+                    break
+
+                if key in undo_keys + redo_keys and not term_too_small:
+                    if key in undo_keys:
+                        turn = history.undo(grids)
+                        score -= turn.score if turn else 0
+                    else:
+                        turn = history.redo(grids)
+                        score += turn.score if turn else 0
+                    if turn:
+                        moves += 1 if key in redo_keys else -1
+                        session_moves += 1
+                        for grid in grids:
+                            grid.draw_cells()
+                        game_over = not all(grid.has_moves for grid in grids)
+                        if move_log:
+                            move_log.start(score, grids, history)
+                    continue
+
+                if game_over:
+                    break
+
+                if player:
+                    directions = player.best_moves(grids)
+                else:
+                    directions = [grid_moves.get(key.name or key)] * len(grids)
+                if not any(directions) or term_too_small:
+                    continue
+
+                # first the game logic of every grid, then the drawing
+                steps = step_all(grids, directions)
+                animations, grid_moves_made, turn_score = [], [], 0
+                for grid_idx, grid_step in enumerate(steps):
+                    grid, direction = grids[grid_idx], directions[grid_idx]
+                    if direction:
+                        game_over = game_over or not grid.has_moves
+                    if not grid_step:
+                        continue
+
+                    turn_score += grid_step.score
+                    if move_log:
+                        move_log.append(grid_idx, direction,
+                                        grid_step.actions[-1],
+                                        grid_step.exponent,
+                                        not grid_moves_made)
+                    grid_moves_made.append(move_from_actions(
+                        grid_idx, grid, direction, grid_step.actions))
+
+                    if opts.animation_time > 0:
+                        animations.append(Animation(grid, grid_step.actions))
+                    else:
+                        grid.draw_actions(grid_step.actions)
+
+                if grid_moves_made:
+                    score += turn_score
+                    history.push(turn_score, grid_moves_made)
+                    moves, session_moves = moves + 1, session_moves + 1
+                if animations:
+                    animator.start(animations)
+
+                if autosaver:
+                    autosaver.maybe_save(score, grids, history)
+    finally:  # also save when the terminal hangs up or the game crashes
+        if player:
+            player.close()
+        if autosaver:
+            autosaver.close()
+        if move_log:
+            move_log.close()
+        save.write_to_file(score, grids, filename=resume or None,
+                           history=history)
+        if profiler:
+            profiler.finish(profile_output)
+
+    if game_over and session_moves:
+        if not record_game(opts, score, grids, moves, time() - start,
+                           opts.autoplay is not None):
+            print("not archived: the grids are of different sizes")
 
     high = 0
     for max_tile in filter(None, (g.highest_tile for g in grids)):
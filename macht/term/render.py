@@ -0,0 +1,90 @@
+import sys
+
+
+class Frame(object):
+    """Collects positioned writes to the terminal and writes them at once.
+
+    Nothing reaches the terminal until `flush`, which sends every write since
+    the previous flush as a single string.
+    """
+
+    def __init__(self, term, stream=None):
+        self.term = term
+        self.stream = stream or sys.stdout
+        self._chunks = []
+        self.frames = self.writes = 0
+
+    def write(self, x, y, text):
+        self._chunks.append(self.term.move(y, x) + text)
+        self.writes += 1
+
+    def clear(self):
+        self._chunks.append(self.term.clear)
+        self.writes += 1
+
+    def discard(self):
+        del self._chunks[:]
+
+    def flush(self):
+        if not self._chunks:
+            return False
+
+        self.stream.write(''.join(self._chunks))
+        self.stream.flush()
+        self.discard()
+        self.frames += 1
+        return True
+
+
+class Canvas(object):
+    """An off-screen rectangle of characters with their style names.
+
+    Drawing a canvas onto a Frame against the canvas previously drawn at the
+    same place only writes the runs of characters that differ.
+    """
+
+    blank = (' ', None)
+
+    def __init__(self, x, y, width, height):
+        self.x, self.y = x, y
+        self.width, self.height = width, height
+        self.rows = [[self.blank] * width for _ in range(height)]
+
+    def fill(self, x, y, width, height, style=None, char=' '):
+        start, end = max(x - self.x, 0), min(x - self.x + width, self.width)
+        if start >= end:
+            return
+
+        cells = [(char, style)] * (end - start)
+        for row in range(max(y - self.y, 0),
+                         min(y - self.y + height, self.height)):
+            self.rows[row][start:end] = cells
+
+    def text(self, x, y, text, style=None):
+        row = y - self.y
+        if not 0 <= row < self.height:
+            return
+
+        for col, char in enumerate(text, x - self.x):
+            if 0 <= col < self.width:
+                self.rows[row][col] = (char, style)
+
+    def draw(self, frame, previous=None):
+        term = frame.term
+        for row_idx, row in enumerate(self.rows):
+            old = previous.rows[row_idx] if previous else None
+
+            col = 0
+            while col < self.width:
+                if old and row[col] == old[col]:
+                    col += 1
+                    continue
+
+                start, style = col, row[col][1]
+                while (col < self.width and row[col][1] == style and
+                       not (old and row[col] == old[col])):
+                    col += 1
+
+                text = ''.join(char for char, _ in row[start:col])
+                frame.write(self.x + start, self.y + row_idx,
+                            getattr(term, style)(text) if style else text)
@@ -1,24 +1,29 @@
 from .. import tile
+from .render import Frame
 
 
 class Tile(tile.Tile):
-    def __init__(self, base=2, exponent=1, x=0, y=0, width=0, height=0,
-                 term=None):
-        super(Tile, self).__init__(base=base, exponent=exponent)
-        self.x, self.y = x, y
-        self.width, self.height = width, height
+    """A tile that can draw itself. Tiles are shared between the cells of a
+    grid, so where to draw is up to the grid.
+    """
+    __slots__ = ('term',)
 
+    def __init__(self, base=2, exponent=1, term=None):
+        super(Tile, self).__init__(base=base, exponent=exponent)
         self.term = term
 
-    def draw(self, text=None, fg='white', bg='black'):
+    def draw(self, x, y, width, height, text=None, fg='white', bg='black',
+             frame=None):
         text = text or str(self.value)
         style = getattr(self.term, fg + ("_on_" + bg if bg else ""))
+        out = frame or Frame(self.term)
+
+        for y_offset in range(height):
+            out.write(x, y + y_offset, style(' ' * width))
 
-        for y_offset in range(self.height):
-            with self.term.location(self.x, self.y + y_offset):
-                print(style(' ' * self.width))
+        hor_offset = (width + 1) // 2 - (len(text) + 1) // 2
+        vert_offset = (height + 1) // 2 - 1
+        out.write(x + hor_offset, y + vert_offset, style(text))
 
-        hor_offset = (self.width + 1) // 2 - (len(text) + 1) // 2
-        vert_offset = (self.height + 1) // 2 - 1
-        with self.term.location(self.x + hor_offset, self.y + vert_offset):
-            print(style(text))
+        if frame is None:
+            out.flush()
@@ -1,32 +1,36 @@
+from weakref import WeakKeyDictionary, ref
+
+_powers = {}  # base: [base ** 0, base ** 1, ...]
+
+
+def power(base, exponent):
+    powers = _powers.setdefault(base, [1])
+    while len(powers) <= exponent:
+        powers.append(powers[-1] * base)
+    return powers[exponent]
+
+
 class Tile(object):
-    _base = 0
-    _exponent = 1
+    """A tile of base ** exponent. Grids share their tiles (see TileCache),
+    so base and exponent can not be changed.
+    """
+    __slots__ = ('_base', '_exponent', 'value')
 
     def __init__(self, base=2, exponent=1):
-        self.base = base
-        self.exponent = exponent
+        self._base, self._exponent = base, exponent
+        self.value = power(base, exponent)
 
     @property
     def base(self):
         return self._base
 
-    @base.setter
-    def base(self, value):
-        self._base = value
-        self.value = self._base ** self.exponent
-
     @property
     def exponent(self):
         return self._exponent
 
-    @exponent.setter
-    def exponent(self, value):
-        self._exponent = value
-        self.value = self.base ** self._exponent
-
     def __eq__(self, other):
-        return (isinstance(other, Tile) and self.base == other.base and
-                self.exponent == other.exponent)
+        return (isinstance(other, Tile) and self._base == other._base and
+                self._exponent == other._exponent)
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -39,3 +43,34 @@ class Tile(object):
 
     def __repr__(self):
         return "Tile(base={}, exponent={})".format(self.base, self.exponent)
+
+
+_interned = WeakKeyDictionary()  # Tile class or factory: TileCache
+
+
+class TileCache(dict):
+    """The tiles made by one Tile class (or factory), one per base and
+    exponent, to be shared by every grid using that Tile.
+
+    The tiles are shared, so they must not be changed: a merge replaces a
+    tile with the tile of the next exponent instead.
+    """
+
+    def __init__(self, Tile):
+        super(TileCache, self).__init__()
+        self._Tile = ref(Tile)  # not to keep Tile alive in _interned
+
+    def __missing__(self, key):
+        base, exponent = key
+        tile = self[key] = self._Tile()(base=base, exponent=exponent)
+        return tile
+
+    def intern(self, tile):
+        """Return the shared tile equal to tile."""
+        return self.setdefault((tile.base, tile.exponent), tile)
+
+
+def tile_cache(Tile=Tile):
+    if Tile not in _interned:
+        _interned[Tile] = TileCache(Tile)
+    return _interned[Tile]
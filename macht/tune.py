@@ -0,0 +1,440 @@
+"""Tune the weights of the expectimax heuristic by playing games.
+
+Candidate weights come from a search: random samples, a grid, or CMA-ES
+(with NumPy). Every candidate plays the same seeded games, without a
+terminal but otherwise like ``macht --seed`` plays them: a Grid with a
+random.Random(seed), two spawned tiles and macht.game.step for every move.
+A candidate is worth the mean score of its games.
+
+Games are spread over a process pool. After its first `early_games` games
+a candidate scoring below `stop_fraction` of the best mean so far plays no
+more. The score of every game is cached by weights and seed, and the cache
+is written to a checkpoint after every generation. The candidates only
+depend on the seed and the scores, so running again with the same
+arguments replays the finished generations from the checkpoint and goes
+on from there::
+
+    python -m macht.tune 4x4 --method cmaes --generations 20 --games 16 \\
+        --checkpoint tune.json --output weights.json
+    macht --autoplay --weights weights.json
+"""
+import os
+import sys
+import json
+import math
+import random
+import argparse
+import itertools
+from functools import partial
+
+from .ai import Player
+from .ai.expectimax import HEURISTIC
+from .game import step
+from .grid import Grid
+from .heuristics import Heuristic, evaluators, write_to_file
+from .options import grid_dimension
+from .save import atomic_write
+from .tile import Tile
+
+# (lowest, highest) weight of every term searched by default
+default_space = {
+    'empty': (0.0, 1000.0),
+    'merges': (0.0, 2000.0),
+    'monotonicity': (-200.0, 0.0),
+    'smoothness': (-500.0, 0.0),
+    'corner': (0.0, 500.0),
+    'sum': (-50.0, 0.0),
+}
+
+
+def round_weight(weight):
+    """Weights are kept to 4 significant digits, to be stable cache keys."""
+    return float('{:.4g}'.format(weight))
+
+
+def weights_key(weights):
+    return ','.join('{}={!r}'.format(name, weights[name])
+                    for name in sorted(weights))
+
+
+def make_heuristic(weights):
+    """The heuristic of the expectimax player with other weights."""
+    return Heuristic(weights, HEURISTIC.constant, HEURISTIC.options)
+
+
+def play_game(seed, heuristic, rows=4, cols=4, base=2, depth=2,
+              max_moves=None):
+    """Play a game with a random.Random(seed) like macht does, an
+    expectimax search with heuristic making the moves. Returns the score.
+    """
+    grid = Grid(rows, cols, Tile=partial(Tile, base=base),
+                rng=random.Random(seed))
+    grid.spawn_tile()
+    grid.spawn_tile()
+    player = Player(max_depth=depth, heuristic=heuristic)
+
+    score = moves = 0
+    while max_moves is None or moves < max_moves:
+        direction = player.best_move(grid)
+        if direction is None:
+            break
+        score += step(grid, direction).score
+        moves += 1
+    return score
+
+
+_heuristics = {}  # weights key: Heuristic, its tables kept between games
+
+
+def _play(weights, seed, game_options):
+    key = weights_key(weights)
+    if key not in _heuristics:
+        if len(_heuristics) >= 16:
+            _heuristics.clear()
+        _heuristics[key] = make_heuristic(weights)
+    return play_game(seed, _heuristics[key], **game_options)
+
+
+class RandomSearch(object):
+    """`population` candidates per generation, drawn uniformly from space
+    (a dict of term names and (lowest, highest) weights).
+    """
+
+    def __init__(self, space, population=8, seed=0):
+        self.space, self.population = space, population
+        self.rng = random.Random(seed)
+
+    def ask(self):
+        return [dict((name, round_weight(self.rng.uniform(low, high)))
+                     for name, (low, high) in sorted(self.space.items()))
+                for _ in range(self.population)]
+
+    def tell(self, candidates, values):
+        pass
+
+
+class GridSearch(object):
+    """Every combination of `steps` evenly spaced weights of every term of
+    space, `population` of them per generation.
+    """
+
+    def __init__(self, space, population=8, steps=3):
+        names = sorted(space)
+        axes = [[round_weight(low + (high - low) * idx / max(steps - 1, 1))
+                 for idx in range(steps)]
+                for low, high in (space[name] for name in names)]
+        self.population = population
+        self._candidates = (dict(zip(names, weights))
+                            for weights in itertools.product(*axes))
+
+    def ask(self):
+        return list(itertools.islice(self._candidates, self.population))
+
+    def tell(self, candidates, values):
+        pass
+
+
+class CMAES(object):
+    """Covariance matrix adaptation evolution strategy, maximizing the
+    values of candidates in space scaled to the unit cube. It starts from
+    the weights of HEURISTIC (0 for other terms), clipped to space.
+    """
+
+    def __init__(self, space, population=None, seed=0, sigma=0.3):
+        import numpy as np  # only needed for CMA-ES
+
+        self.np, self.space = np, space
+        self.names = sorted(space)
+        self.low = np.array([space[name][0] for name in self.names])
+        self.high = np.array([space[name][1] for name in self.names])
+        start = np.array([HEURISTIC.weights.get(name, 0.0)
+                          for name in self.names])
+        self.mean = np.clip((start - self.low) / (self.high - self.low),
+                            0, 1)
+        self.sigma = sigma
+        self.rng = np.random.default_rng(seed)
+
+        n = len(self.names)
+        self.population = population or 4 + int(3 * math.log(n))
+        mu = self.population // 2
+        weights = math.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1 / (self.weights ** 2).sum()
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) /
+                       ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0, math.sqrt((self.mueff - 1) /
+                                              (n + 1)) - 1) + self.cs
+        self.chi_n = math.sqrt(n) * (1 - 1 / (4. * n) + 1 / (21. * n ** 2))
+        self.pc, self.ps = np.zeros(n), np.zeros(n)
+        self.B, self.D, self.C = np.eye(n), np.ones(n), np.eye(n)
+        self.generation = 0
+        self._steps = None
+
+    def ask(self):
+        np = self.np
+        self._steps = (self.rng.standard_normal(
+            (self.population, len(self.names))) * self.D).dot(self.B.T)
+        points = np.clip(self.mean + self.sigma * self._steps, 0, 1)
+        return [dict(zip(self.names, map(round_weight, weights)))
+                for weights in self.low + points * (self.high - self.low)]
+
+    def tell(self, candidates, values):
+        np, n = self.np, len(self.names)
+        order = np.argsort(-np.asarray(values, dtype=float), kind='stable')
+        best_steps = self._steps[order[:len(self.weights)]]
+        step_mean = self.weights.dot(best_steps)
+        self.mean = self.mean + self.sigma * step_mean
+        self.generation += 1
+
+        inv_sqrt_c = self.B.dot(np.diag(1 / self.D)).dot(self.B.T)
+        self.ps = (1 - self.cs) * self.ps + math.sqrt(
+            self.cs * (2 - self.cs) * self.mueff) * inv_sqrt_c.dot(step_mean)
+        ps_norm = np.linalg.norm(self.ps)
+        hsig = ps_norm / math.sqrt(
+            1 - (1 - self.cs) ** (2 * self.generation)) / self.chi_n < \
+            1.4 + 2. / (n + 1)
+        self.pc = (1 - self.cc) * self.pc + hsig * math.sqrt(
+            self.cc * (2 - self.cc) * self.mueff) * step_mean
+
+        rank_mu = (best_steps.T * self.weights).dot(best_steps)
+        self.C = ((1 - self.c1 - self.cmu) * self.C + self.c1 * (
+            np.outer(self.pc, self.pc) +
+            (1 - hsig) * self.cc * (2 - self.cc) * self.C) +
+            self.cmu * rank_mu)
+        self.sigma *= math.exp(self.cs / self.damps *
+                               (ps_norm / self.chi_n - 1))
+
+        self.C = (self.C + self.C.T) / 2
+        eigenvalues, self.B = np.linalg.eigh(self.C)
+        self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+
+
+class Tuner(object):
+    """Plays the candidates of a search (anything with ask and tell like
+    RandomSearch) on `games` seeded games each, see the module.
+    game_options are the rows, cols, base, depth and max_moves of the games.
+    """
+
+    def __init__(self, search, games=8, seed=0, jobs=None, early_games=2,
+                 stop_fraction=0.5, checkpoint=None, **game_options):
+        self.search = search
+        self.seeds = list(range(seed, seed + games))
+        self.jobs = jobs
+        self.early_games, self.stop_fraction = early_games, stop_fraction
+        self.checkpoint = checkpoint
+        self.game_options = game_options
+        self.scores = {}  # weights key: {seed: score}
+        self.best = None  # the result with the best mean of all games
+        self.played = 0  # games played, not found in the cache
+
+        if checkpoint and os.path.exists(checkpoint):
+            self.load()
+
+    def load(self):
+        with open(self.checkpoint) as checkpoint_file:
+            state = json.load(checkpoint_file)
+        if state['options'] != self.game_options:
+            raise ValueError("checkpoint {} holds games with other options: "
+                             "{}".format(self.checkpoint, state['options']))
+        for key, scores in state['scores'].items():
+            self.scores[key] = dict((int(seed), score)
+                                    for seed, score in scores.items())
+
+    def save(self):
+        if not self.checkpoint:
+            return
+        state = {'options': self.game_options, 'scores': self.scores}
+        atomic_write(self.checkpoint,
+                     json.dumps(state, sort_keys=True).encode('utf-8'))
+
+    def run(self, generations):
+        """Yield the results of every generation: dicts of its number, the
+        results of its candidates and the best result so far.
+        """
+        executor = None
+        if self.jobs != 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(self.jobs)
+
+        try:
+            for generation in range(generations):
+                candidates = self.search.ask()
+                if not candidates:
+                    break
+                results = self.evaluate(candidates, executor)
+                self.search.tell(candidates, [result['score_mean']
+                                              for result in results])
+                self.save()
+                yield {'generation': generation, 'results': results,
+                       'best': self.best}
+        finally:
+            if executor:
+                executor.shutdown()
+
+    def evaluate(self, candidates, executor=None):
+        """Play the games of candidates, stopping the bad ones early.
+        Returns a result (a dict of the weights, score_mean, games and
+        stopped) per candidate.
+        """
+        early = self.seeds
+        if 0 < self.early_games < len(self.seeds):
+            early = self.seeds[:self.early_games]
+        self._play_all(candidates, early, executor)
+
+        means = [self._mean(candidate, early) for candidate in candidates]
+        reference = max(means + ([self.best['score_mean']]
+                                 if self.best else []))
+        stopped = [mean < self.stop_fraction * reference for mean in means]
+        self._play_all([candidate for candidate, stop
+                        in zip(candidates, stopped) if not stop],
+                       self.seeds[len(early):], executor)
+
+        results = []
+        for candidate, stop in zip(candidates, stopped):
+            seeds = early if stop else self.seeds
+            result = {'weights': candidate, 'games': len(seeds),
+                      'score_mean': self._mean(candidate, seeds),
+                      'stopped': stop}
+            if not stop and (self.best is None or result['score_mean'] >
+                             self.best['score_mean']):
+                self.best = result
+            results.append(result)
+        return results
+
+    def _mean(self, candidate, seeds):
+        scores = self.scores[weights_key(candidate)]
+        return sum(scores[seed] for seed in seeds) / float(len(seeds))
+
+    def _play_all(self, candidates, seeds, executor):
+        games = {}  # (weights key, seed): weights, for games not cached
+        for candidate in candidates:
+            key = weights_key(candidate)
+            cached = self.scores.setdefault(key, {})
+            for seed in seeds:
+                if seed not in cached:
+                    games[key, seed] = candidate
+
+        if executor:
+            futures = dict((game, executor.submit(
+                _play, weights, game[1], self.game_options))
+                for game, weights in games.items())
+            scores = dict((game, future.result())
+                          for game, future in futures.items())
+        else:
+            scores = dict((game, _play(weights, game[1], self.game_options))
+                          for game, weights in games.items())
+
+        for (key, seed), score in scores.items():
+            self.scores[key][seed] = score
+        self.played += len(scores)
+
+
+def term_bounds(value):
+    """Parse NAME or NAME=LOW:HIGH into (name, (low, high))."""
+    name, _, bounds = value.partition('=')
+    if name not in evaluators:
+        raise argparse.ArgumentTypeError(
+            "unknown term {!r}, one of: {}".format(
+                name, ', '.join(sorted(evaluators))))
+    if not bounds:
+        return name, default_space.get(name, (-1000.0, 1000.0))
+    try:
+        low, high = (float(bound) for bound in bounds.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "bounds must be LOW:HIGH, got {!r}".format(bounds))
+    return name, (low, high)
+
+
+parser = argparse.ArgumentParser(
+    description="Tune the heuristic weights of the expectimax player by "
+    "playing seeded games with every candidate.")
+parser.add_argument('grid_dims', metavar='GRID_DIMENSIONS',
+                    type=grid_dimension, nargs='?',
+                    default={'rows': 4, 'cols': 4},
+                    help="dimensions of the grid, default: '4x4'")
+parser.add_argument('--method', choices=('random', 'grid', 'cmaes'),
+                    default='random', help="how candidates are picked, "
+                    "cmaes needs numpy (default: random)")
+parser.add_argument('-t', '--term', metavar='NAME[=LOW:HIGH]',
+                    type=term_bounds, action='append', default=[],
+                    help="search the weight of a term between LOW and HIGH, "
+                    "can be repeated (default: all terms, with default "
+                    "bounds)")
+parser.add_argument('-g', '--generations', metavar='N', type=int,
+                    default=10, help="number of generations (default: 10)")
+parser.add_argument('-p', '--population', metavar='N', type=int,
+                    default=8, help="candidates per generation (default: 8)")
+parser.add_argument('--steps', metavar='N', type=int, default=3,
+                    help="weights per term of the grid method (default: 3)")
+parser.add_argument('-n', '--games', metavar='N', type=int, default=8,
+                    help="games per candidate (default: 8)")
+parser.add_argument('-s', '--seed', metavar='SEED', type=int, default=0,
+                    help="seed of the search and of the first game, game i "
+                    "uses SEED + i (default: 0)")
+parser.add_argument('-j', '--jobs', metavar='N', type=int, default=None,
+                    help="number of worker processes (default: one per CPU)")
+parser.add_argument('-b', '--base', metavar='N', type=int, default=2,
+                    help="base value of all tiles")
+parser.add_argument('-d', '--depth', metavar='N', type=int, default=2,
+                    help="search depth of the expectimax player")
+parser.add_argument('-m', '--max-moves', metavar='N', type=int, default=None,
+                    help="stop games after N moves")
+parser.add_argument('--early-games', metavar='N', type=int, default=2,
+                    help="games after which bad candidates stop (default: 2)")
+parser.add_argument('--stop-fraction', metavar='F', type=float, default=0.5,
+                    help="stop candidates scoring below F times the best "
+                    "mean score (default: 0.5)")
+parser.add_argument('-c', '--checkpoint', metavar='FILE', default=None,
+                    help="JSON file caching the score of every game, to "
+                    "resume from")
+parser.add_argument('-o', '--output', metavar='FILE', default='-',
+                    help="file to write the best heuristic to, for "
+                    "macht --weights (default: stdout)")
+
+
+def make_search(method, space, population=8, seed=0, steps=3):
+    if method == 'grid':
+        return GridSearch(space, population, steps)
+    if method == 'cmaes':
+        return CMAES(space, population, seed)
+    return RandomSearch(space, population, seed)
+
+
+def main(args=None):
+    opts = parser.parse_args(args if args is not None else sys.argv[1:])
+    space = dict(opts.term) if opts.term else default_space
+    search = make_search(opts.method, space, opts.population, opts.seed,
+                         opts.steps)
+    tuner = Tuner(search, opts.games, opts.seed, opts.jobs, opts.early_games,
+                  opts.stop_fraction, opts.checkpoint, base=opts.base,
+                  depth=opts.depth, max_moves=opts.max_moves,
+                  **opts.grid_dims)
+
+    for generation in tuner.run(opts.generations):
+        results = generation['results']
+        sys.stderr.write(
+            "generation {}: best {:.1f} of {} candidates ({} stopped early), "
+            "best so far {:.1f}, {} games played\n".format(
+                generation['generation'] + 1,
+                max(result['score_mean'] for result in results),
+                len(results), sum(result['stopped'] for result in results),
+                generation['best']['score_mean'], tuner.played))
+
+    if tuner.best is None:
+        sys.stderr.write("no candidates\n")
+        return 1
+
+    heuristic = make_heuristic(tuner.best['weights'])
+    if opts.output == '-':
+        print(json.dumps(heuristic.to_dict(), indent=2, sort_keys=True))
+    else:
+        write_to_file(heuristic, opts.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
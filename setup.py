@@ -1,10 +1,15 @@
 #!/usr/bin/env python
 
 import os
+import re
 import sys
 from setuptools import setup, find_packages
 
-import macht
+# read the version without importing macht and everything it imports
+with open(os.path.join(os.path.dirname(__file__), 'macht', '__init__.py')) \
+        as init_file:
+    version = '.'.join(re.search(r'values = \((\d+), (\d+), (\d+),',
+                                 init_file.read()).groups())
 
 dependencies = ['blessed']
 if sys.version_info < (3, 4):  # python 3.4 include the enum package
@@ -12,16 +17,18 @@ if sys.version_info < (3, 4):  # python 3.4 include the enum package
 
 setup(
     name='macht',
-    version=macht.__version__,
+    version=version,
     description="A 2048 clone in python with Terminal UI",
     long_description=open(os.path.join(os.path.dirname(__file__),
                           'README.rst')).read(),
     author="Rolf Morel",
     author_email="rolfmorel@gmail.com",
     url="https://github.com/polyphemus/macht",
-    packages=find_packages(exclude=["tests"]),
+    packages=find_packages(exclude=["tests", "benchmarks"]),
     license='LGPLv3',
     install_requires=dependencies,
+    extras_require={'batch': ['numpy'], 'dataset': ['numpy'],
+                    'tune': ['numpy']},
     entry_points={'console_scripts': ('macht = macht.term:main')},
     classifiers=[
         'Environment :: Console',
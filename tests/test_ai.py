@@ -0,0 +1,124 @@
+import random
+
+from macht import ai, bitboard, grid, symmetry
+
+
+def test_transposition_table():
+    table = ai.TranspositionTable(size=2)
+    table.put(1, 2, 10.0)
+    assert table.get(1, 2) == 10.0 and table.get(1, 1) == 10.0
+    assert table.get(1, 3) is None
+
+    table.put(1, 1, 5.0)  # shallower results do not replace deeper ones
+    assert table.get(1, 2) == 10.0
+
+    table.put(2, 1, 20.0)
+    table.put(3, 1, 30.0)
+    assert len(table) == 2 and table.get(1, 0) is None
+    assert table.get(3, 1) == 30.0
+
+    table.clear()
+    assert len(table) == 0 and table.hits == table.misses == 0
+
+
+def test_line_heuristic():
+    assert ai.line_heuristic([0, 0, 0, 0]) > ai.line_heuristic([1, 0, 0, 0])
+    assert ai.line_heuristic([3, 2, 1, 0]) > ai.line_heuristic([2, 3, 1, 0])
+    assert ai.line_heuristic([1, 1, 0, 0]) > ai.line_heuristic([1, 2, 0, 0])
+
+
+def test_best_move():
+    layout = bitboard.layout(4, 4)
+    search = ai.Expectimax(layout, max_depth=2)
+
+    assert search.best_move(0) is None
+
+    # only the bottom right tile can move
+    board = layout.from_exponents([[1, 2, 1, 2], [2, 1, 2, 1],
+                                   [1, 2, 1, 2], [2, 1, 2, 0]])
+    direction = search.best_move(board)
+    assert direction in (grid.Direction.down, grid.Direction.right)
+    assert search.nodes > 0 and len(search.table) > 0
+
+    board = layout.from_exponents([[1, 2, 1, 2], [2, 1, 2, 1],
+                                   [1, 2, 1, 2], [2, 1, 2, 1]])
+    assert search.best_move(board) is None
+
+
+def test_time_budget():
+    layout = bitboard.layout(4, 4)
+    search = ai.Expectimax(layout, max_depth=20, time_budget=0.01)
+    board = layout.from_exponents([[1, 0, 0, 0], [0, 0, 0, 0],
+                                   [0, 0, 2, 0], [0, 0, 0, 0]])
+    assert search.best_move(board) in grid.Direction
+
+
+def test_tiny_time_budget():
+    random.seed(1)
+    g = grid.Grid(12, 12)
+    for _ in range(60):
+        g.spawn_tile()
+
+    player = ai.Player(time_budget=1e-6)
+    for _ in range(3):
+        direction = player.best_move(g)
+        assert direction in g.possible_moves
+        g.move(direction)
+
+
+def test_player():
+    random.seed(0)
+    g = grid.Grid()
+    g.spawn_tile()
+    g.spawn_tile()
+
+    player = ai.Player(max_depth=1)
+    for _ in range(20):
+        direction = player.best_move(g)
+        assert direction in g.possible_moves
+        g.move(direction)
+        g.spawn_tile(exponent=grid.spawn_exponent())
+
+
+def test_largest_tiles():
+    g = grid.Grid()
+    for column, exponent in enumerate([16, 15, 15, 14]):
+        g.spawn_tile(0, column, exponent=exponent)
+    g.spawn_tile(1, 0, exponent=16)
+
+    assert ai.Player(max_depth=2).best_move(g) in g.possible_moves
+
+
+def test_pool_player():
+    grids = [grid.Grid(rows, cols, rng=random.Random(rows))
+             for rows, cols in ((4, 4), (3, 5), (2, 2))]
+    for g in grids:
+        g.spawn_tile()
+        g.spawn_tile()
+
+    player = ai.PoolPlayer(jobs=2, max_depth=2)
+    try:
+        assert (player.best_moves(grids) ==
+                ai.Player(max_depth=2).best_moves(grids))
+    finally:
+        player.close()
+
+
+def test_symmetric_table():
+    layout = bitboard.layout(4, 4)
+    board = layout.from_exponents([[3, 1, 0, 0], [2, 0, 0, 0],
+                                   [1, 0, 0, 1], [0, 0, 0, 0]])
+    rotation = symmetry.Symmetry(transpose=True, flip_rows=False,
+                                 flip_cols=True)
+    rotated = symmetry.board_symmetry(layout).transform(board, rotation)
+
+    search = ai.Expectimax(layout)
+    direction, value = search.search(board, 2)
+    entries = len(search.table)
+    rotated_direction, rotated_value = search.search(rotated, 2)
+    assert len(search.table) == entries  # all found in the table
+    assert rotated_direction is rotation.direction(direction)
+    assert abs(rotated_value - value) < 1e-6 * value
+
+    plain = ai.Expectimax(layout, symmetric=False)
+    assert abs(plain.search(board, 2)[1] - value) < 1e-6 * value
@@ -0,0 +1,67 @@
+from macht import archive, selfplay
+from macht.term import main
+
+
+def test_archive(tmpdir):
+    filename = str(tmpdir.join('archive.sqlite'))
+    with archive.Archive(filename) as games:
+        assert len(games) == 0 and games.stats() == []
+        games.record({'rows': 4, 'cols': 4, 'base': 2, 'score': 100,
+                      'highest_tile': 16, 'moves': 30})
+        games.record_many([
+            {'rows': 4, 'cols': 4, 'base': 2, 'score': 300,
+             'highest_tile': 32, 'moves': 50, 'seed': 1},
+            {'rows': 3, 'cols': 3, 'base': 2, 'score': 200,
+             'highest_tile': 16, 'moves': 40},
+            {'rows': 4, 'cols': 4, 'base': 3, 'score': 50,
+             'highest_tile': 27, 'moves': 10}])
+
+    with archive.Archive(filename) as games:
+        assert len(games) == 4
+        assert [game['score'] for game in games.top()] == [300, 200, 100, 50]
+        assert [game['score'] for game in games.top(2, rows=4, cols=4)] == \
+            [300, 100]
+        best = games.top(1, base=2)[0]
+        assert best['seed'] == 1 and best['grids'] == 1
+
+        stats = games.stats(rows=4, cols=4)
+        assert [(entry['base'], entry['games']) for entry in stats] == \
+            [(2, 2), (3, 1)]
+        assert stats[0]['score_mean'] == 200.0
+        assert stats[0]['best_score'] == 300 and stats[0]['moves'] == 80
+        assert stats[0]['highest_tiles'] == {16: 1, 32: 1}
+
+        assert '300' in archive.format_top(games.top())
+        assert '3x3 base 2: 1 games' in archive.format_stats(games.stats())
+
+
+def test_main(tmpdir, capsys):
+    filename = str(tmpdir.join('archive.sqlite'))
+    selfplay.main(['3x3', '--games', '3', '--jobs', '1', '--seed', '0',
+                   '--player', 'random', '--output', str(tmpdir.join('out')),
+                   '--archive', filename])
+    capsys.readouterr()
+
+    assert main(['--archive', filename, '--top', '2']) == 0
+    top = capsys.readouterr().out.splitlines()
+    assert len(top) == 3 and 'selfplay' in top[1]
+
+    assert main(['3x3', '--archive', filename, '--stats']) == 0
+    assert '3x3 base 2: 3 games' in capsys.readouterr().out
+
+    # a value for --top, not GRID_DIMENSIONS
+    assert main(['--archive', filename, '--top', '1', '3x3']) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 2
+
+
+def test_record_game(tmpdir):
+    from argparse import Namespace
+    from macht.grid import Grid
+    from macht.term.main import record_game
+
+    opts = Namespace(archive=str(tmpdir.join('archive.sqlite')), seed=None)
+    assert record_game(opts, 8, [Grid(3, 3), Grid(3, 3)], 5, 1.0, True)
+    assert not record_game(opts, 8, [Grid(3, 3), Grid(4, 4)], 5, 1.0, True)
+    with archive.Archive(opts.archive) as games:
+        assert [(game['rows'], game['grids']) for game in games.top()] == \
+            [(3, 2)]
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+from macht import grid
+
+np = pytest.importorskip('numpy')
+from macht import batch  # noqa: E402 (needs numpy)
+
+
+def random_grids(rows, cols, count, seed=0):
+    rng = random.Random(seed)
+    grids = []
+    for _ in range(count):
+        g = grid.Grid(rows, cols)
+        for row_idx in range(rows):
+            for col_idx in range(cols):
+                if rng.random() < 0.6:
+                    g.spawn_tile(row_idx, col_idx, exponent=rng.randint(1, 4))
+        grids.append(g)
+    return grids
+
+
+@pytest.mark.parametrize('rows, cols', [(4, 4), (3, 5)])
+def test_matches_grid(rows, cols):
+    grids = random_grids(rows, cols, 100)
+    rng = random.Random(1)
+    directions = [rng.choice(list(grid.Direction)) for _ in grids]
+
+    b = batch.BatchGrid.from_grids(grids)
+    result = b.move(directions)
+
+    for idx, (g, direction) in enumerate(zip(grids, directions)):
+        actions = g.move(direction)
+        merged = [a.new for a in actions if a.type is grid.Actions.merge]
+
+        assert bool(result.moved[idx]) == bool(actions)
+        assert result.score[idx] == sum(g[row][col].value
+                                        for row, col in merged)
+        assert (sorted(tuple(cell) for cell in np.argwhere(result.merged[idx]))
+                == sorted(merged))
+        assert (b.exponents[idx].tolist() ==
+                [[t.exponent if t else 0 for t in row] for row in g])
+
+
+def test_same_direction():
+    b = batch.BatchGrid(exponents=[[[1, 1, 0, 1]], [[0, 0, 0, 2]]])
+    result = b.move(grid.Direction.left)
+    assert b.exponents.tolist() == [[[2, 1, 0, 0]], [[2, 0, 0, 0]]]
+    assert result.moved.tolist() == [True, True]
+    assert result.score.tolist() == [4, 0]
+
+    result = b.move(grid.Direction.left)
+    assert result.moved.tolist() == [False, False]
+
+    pytest.raises(ValueError, b.move, [grid.Direction.up])
+
+
+def test_possible_moves_spawn_tile():
+    b = batch.BatchGrid(3, 2, 2, rng=np.random.default_rng(0))
+    assert not b.possible_moves.any()
+
+    b.spawn_tile()
+    assert (b.exponents > 0).sum(axis=(1, 2)).tolist() == [1, 1, 1]
+    assert b.possible_moves.sum(axis=1).tolist() == [2, 2, 2]
+
+    b.spawn_tile(mask=[True, False, False], exponent=3)
+    assert (b.exponents > 0).sum(axis=(1, 2)).tolist() == [2, 1, 1]
+    assert b.highest_tile.tolist()[0] == 3
+
+    b.spawn_tile(mask=[True, False, False])
+    b.spawn_tile(mask=[True, False, False])
+    pytest.raises(grid.SpawnTileError, b.spawn_tile)
+
+
+def test_to_grid():
+    grids = random_grids(4, 4, 3)
+    b = batch.BatchGrid.from_grids(grids)
+    for idx, g in enumerate(grids):
+        assert ([[t and t.exponent for t in row] for row in b.to_grid(idx)] ==
+                [[t and t.exponent for t in row] for row in g])
@@ -0,0 +1,142 @@
+import random
+from itertools import chain
+
+import pytest
+from macht import bitboard, grid
+
+
+def play_both(rows, cols, seed):
+    rng = random.Random(seed)
+    g = grid.Grid(rows, cols)
+    g.spawn_tile(0, 0)
+    g.spawn_tile(rows - 1, cols - 1)
+    b = bitboard.BitGrid.from_grid(g)
+
+    while g.possible_moves:
+        assert b.possible_moves == g.possible_moves
+
+        direction = rng.choice(g.possible_moves)
+        expected, score = b.shifted(direction)
+        grid_actions, bit_actions = g.move(direction), b.move(direction)
+
+        assert ([(a.type, a.old, a.new) for a in grid_actions] ==
+                [(a.type, a.old, a.new) for a in bit_actions])
+        assert score == sum(g[a.new.row][a.new.column].value
+                            for a in grid_actions
+                            if a.type is grid.Actions.merge)
+        assert b.board == expected
+        assert b.board == bitboard.BitGrid.from_grid(g).board
+
+        row, column = rng.choice([(r, c) for r in range(rows)
+                                  for c in range(cols) if not g[r][c]])
+        exponent = 2 if rng.random() > 0.9 else 1
+        g.spawn_tile(row, column, exponent=exponent)
+        b.spawn_tile(row, column, exponent=exponent)
+
+    assert b.possible_moves == []
+
+
+@pytest.mark.parametrize('rows, cols', [(4, 4), (2, 2), (3, 5), (5, 5)])
+def test_matches_grid(rows, cols):
+    for seed in range(3):
+        play_both(rows, cols, seed)
+
+
+def test_slide_line():
+    assert bitboard.slide_line([1, 1, 1, 1])[0] == [2, 2, 0, 0]
+    assert bitboard.slide_line([0, 2, 1, 1])[0] == [2, 2, 0, 0]
+    assert bitboard.slide_line([1, 2, 1, 0])[0] == [1, 2, 1, 0]
+
+    line, actions = bitboard.slide_line([0, 1, 0, 1])
+    assert line == [2, 0, 0, 0]
+    assert actions == [(grid.Actions.move, 1, 0), (grid.Actions.merge, 3, 0)]
+
+
+def test_line_table():
+    table = bitboard.line_table(4, 4)
+    line = table.pack([1, 1, 2, 0])
+    assert table.unpack(table.left[line]) == [2, 2, 0, 0]
+    assert table.unpack(table.right[line]) == [0, 0, 2, 2]
+    assert table.score[line] == 4
+
+    assert table.left[table.pack([15, 15, 0, 0])] is None
+
+    lazy = bitboard.line_table(5, 5)
+    line = lazy.pack([3, 0, 3, 1, 1])
+    assert lazy.unpack(lazy.right[line]) == [0, 0, 0, 4, 2]
+    assert lazy.score[line] == 2 ** 4 + 2 ** 2
+
+
+def test_transpose():
+    layout = bitboard.layout(4, 4, bits=4)
+    for _ in range(100):
+        board = random.getrandbits(64)
+        assert (layout.transpose(board) ==
+                bitboard.Layout.transpose(layout, board))
+        assert layout.transpose(layout.transpose(board)) == board
+
+    layout = bitboard.layout(3, 5)
+    rows = [[random.randrange(16) for _ in range(5)] for _ in range(3)]
+    board = layout.from_exponents(rows)
+    transposed = bitboard.layout(5, 3).from_exponents(zip(*rows))
+    assert layout.transpose(board) == transposed
+    assert layout._transpose_back(transposed) == board
+
+
+def test_lane_bits():
+    assert bitboard.lane_bits(3, 3) == 4
+    assert bitboard.lane_bits(4, 4) == 5
+    assert bitboard.lane_bits(5, 5) == 5
+    assert bitboard.lane_bits(32, 32) == 11
+
+
+def test_spawn_tile():
+    b = bitboard.BitGrid()
+    assert b.highest_tile is None and len(b.possible_moves) == 0
+
+    action = b.spawn_tile(1, 2, exponent=3)
+    assert action.type is grid.Actions.spawn and action.new == (1, 2)
+    assert b[1][2].exponent == 3 and b.highest_tile.value == 8
+
+    pytest.raises(grid.SpawnTileError, b.spawn_tile, 1, 2)
+    pytest.raises(OverflowError, b.spawn_tile, exponent=32)
+
+    for _ in range(15):
+        b.spawn_tile()
+    assert all(chain(*b))
+    pytest.raises(grid.SpawnTileError, b.spawn_tile)
+
+
+def test_move():
+    b = bitboard.BitGrid(base=3)
+    b.spawn_tile(0, 0)
+    b.spawn_tile(0, 3)
+
+    pytest.raises(TypeError, b.move, "right")
+
+    actions = b.move(grid.Direction.right, apply=False)
+    assert actions[0].type is grid.Actions.merge and b[0][0]
+
+    board = b.board
+    assert b.shifted(grid.Direction.right) == (b.layout.set(0, 0, 3, 2), 9)
+    assert b.board == board
+
+    b.move(grid.Direction.right)
+    assert b[0][3] == b.Tile(base=3, exponent=2) and not b[0][0]
+
+
+def test_largest_tiles():
+    b = bitboard.BitGrid()
+    b.spawn_tile(0, 0, exponent=15)
+    b.spawn_tile(0, 1, exponent=15)
+    b.spawn_tile(1, 0, exponent=16)
+
+    b.move(grid.Direction.left)
+    assert b[0][0].value == 65536
+    b.move(grid.Direction.up)
+    assert b[0][0].value == 131072
+    assert b.shifted(grid.Direction.down)[1] == 0
+
+
+def test_repr():
+    assert repr(bitboard.BitGrid(3, 5)) == 'BitGrid(rows=3, cols=5)'
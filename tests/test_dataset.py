@@ -0,0 +1,93 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+from macht import dataset, save, selfplay, symmetry  # noqa: E402 (numpy)
+from macht.grid import Direction, Grid  # noqa: E402
+
+
+def test_game_transitions():
+    transitions = list(dataset.game_transitions(5, rows=3, cols=3))
+    result = selfplay.play_game(5, rows=3, cols=3)
+    assert len(transitions) == result['moves']
+    assert sum(t.reward for t in transitions) == result['score']
+
+    for previous, transition in zip(transitions, transitions[1:]):
+        assert transition.board == previous.next_board
+    # a move keeps the tile sum, the spawn adds 2 or 4
+    for transition in transitions:
+        added = sum(2 ** e for e in transition.next_board if e) - \
+            sum(2 ** e for e in transition.board if e)
+        assert added in (2, 4)
+
+
+def test_log_transitions(tmpdir):
+    filename = str(tmpdir.join('game.macht'))
+    grid = Grid(3, 3)
+    grid.spawn_tile(0, 0, exponent=1)
+    grid.spawn_tile(0, 1, exponent=1)
+    log = save.MoveLog(filename)
+    log.start(0, [grid])
+    board = [1, 1, 0, 0, 0, 0, 0, 0, 0]
+    for direction, cell in ((Direction.left, 8), (Direction.down, 0)):
+        actions = grid.move(direction)
+        actions.append(grid.spawn_tile(cell // 3, cell % 3, exponent=1))
+        log.append(0, direction, actions[-1], 1, True)
+    log.close()
+
+    transitions = list(dataset.log_transitions(filename))
+    assert [t.direction for t in transitions] == [Direction.left,
+                                                  Direction.down]
+    assert [t.reward for t in transitions] == [4, 0]
+    assert transitions[0].board == board
+    assert transitions[0].next_board == [2, 0, 0, 0, 0, 0, 0, 0, 1]
+    assert transitions[1].next_board == [1, 0, 0, 0, 0, 0, 2, 0, 1]
+
+    # the saved grids are 3x3, whatever GRID_DIMENSIONS says
+    directory = str(tmpdir.join('data'))
+    assert dataset.main([directory, '--log', filename, '--augment']) == 0
+    boards = next(dataset.read_shards(directory))[0]
+    assert boards.shape == (16, 9)
+    assert list(boards[0]) == board
+
+    mixed = str(tmpdir.join('mixed.macht'))
+    save.write_to_file(0, [Grid(3, 3), Grid(4, 4)], mixed)
+    with pytest.raises(SystemExit):
+        dataset.main([directory, '--log', filename, '--log', mixed])
+
+
+def test_augment():
+    transition = dataset.Transition([1, 2, 0, 0, 0, 3], Direction.left, 4,
+                                    [2, 0, 0, 0, 1, 3])
+    augmented = list(dataset.augment([transition], 2, 3))
+    assert len(augmented) == 4 and augmented[0] == transition
+
+    flipped = symmetry.Symmetry(False, False, True)
+    assert dataset.Transition([0, 2, 1, 3, 0, 0], Direction.right, 4,
+                              [0, 0, 2, 3, 1, 0]) in augmented
+    assert flipped.direction(Direction.left) is Direction.right
+    square = dataset.Transition([0] * 8 + [1], Direction.up, 0, [1] * 9)
+    assert len(list(dataset.augment([square] * 2, 3, 3))) == 16
+
+
+def test_shards(tmpdir):
+    directory = str(tmpdir.join('data'))
+    dataset.main([directory, '3x3', '--games', '3', '--chunk-size', '50',
+                  '--augment'])
+
+    transitions = [t for seed in range(3)
+                   for t in dataset.game_transitions(seed, 3, 3)]
+    shards = list(dataset.read_shards(directory))
+    assert [len(shard[0]) for shard in shards[:-1]] == \
+        [50] * (len(shards) - 1)
+
+    boards, directions, rewards, next_boards = (
+        np.concatenate(column) for column in zip(*shards))
+    assert len(boards) == 8 * len(transitions)
+    assert boards.dtype == np.uint8 and boards.shape[1] == 9
+    assert list(boards[::8][0]) == transitions[0].board
+    assert list(directions[::8]) == [t.direction.value for t in transitions]
+    assert rewards.sum() == 8 * sum(t.reward for t in transitions)
+    assert list(next_boards[-8]) == transitions[-1].next_board
+
+    with pytest.raises(ValueError):
+        dataset.ShardWriter(directory, 16).write(transitions[0])
@@ -0,0 +1,86 @@
+import pytest
+from macht import bitboard, endgame, grid, symmetry
+from macht.selfplay import play_game
+
+
+@pytest.fixture(scope='module')
+def table_file(tmpdir_factory):
+    filename = str(tmpdir_factory.mktemp('endgame').join('2x2.db'))
+    layout = bitboard.layout(2, 2)
+    endgame.write_table(filename, layout, endgame.solve(layout))
+    return filename
+
+
+def test_values(table_file):
+    with endgame.EndgameTable(table_file) as table:
+        layout = table.layout
+        assert len(table) > 0 and table.target is None
+
+        for idx in range(len(table)):
+            offset = endgame.header_struct.size + \
+                idx * endgame.record_struct.size
+            board, value, direction = endgame.record_struct.unpack_from(
+                table._map, offset)
+            assert table.lookup(board)[0] == value
+
+            # the value is the best expected score of the moves
+            moves = []
+            for move in grid.Direction:
+                moved, score = layout.shift(board, move)
+                if moved != board:
+                    moves.append(score + sum(
+                        probability * table.lookup(spawned)[0]
+                        for spawned, probability
+                        in endgame.spawns(layout, moved)))
+            assert value == pytest.approx(max(moves) if moves else 0.0)
+            assert bool(direction) == bool(moves)
+
+
+def test_lookup(table_file):
+    with endgame.EndgameTable(table_file) as table:
+        layout = table.layout
+        board = layout.from_exponents([[0, 1], [2, 2]])
+        value, direction = table.lookup(board)
+        assert direction in (grid.Direction.left, grid.Direction.right)
+
+        board_symmetry = symmetry.board_symmetry(layout)
+        for sym in board_symmetry.symmetries:
+            transformed = board_symmetry.transform(board, sym)
+            assert table.lookup(transformed) == (value, sym.direction(
+                direction))
+
+        assert table.lookup(layout.from_exponents([[9, 9], [9, 9]])) is None
+
+        g = grid.Grid(2, 2)
+        g.spawn_tile(1, 0, exponent=2)
+        g.spawn_tile(1, 1, exponent=2)
+        g.spawn_tile(0, 1, exponent=1)
+        assert table.value(g) == value and table.best_move(g) is direction
+
+        result = play_game(0, 2, 2, player=table)
+        assert result['moves'] > 0
+
+
+def test_target(tmpdir):
+    filename = str(tmpdir.join('2x2.db'))
+    layout = bitboard.layout(2, 2)
+    endgame.main(['2x2', '--target', '4', '--output', filename])
+    with endgame.EndgameTable(filename) as table:
+        assert table.target == 4
+        _, value, _ = endgame.record_struct.unpack_from(
+            table._map, endgame.header_struct.size)
+        assert 0.0 <= value <= 1.0
+        # one merge from a 16
+        board = layout.from_exponents([[3, 3], [0, 1]])
+        assert table.lookup(board)[0] == 1.0
+
+    with pytest.raises(ValueError):
+        endgame.EndgameTable(__file__)
+
+
+def test_too_large(capsys):
+    # 15 and 16 cell boards have 5 bit lanes, more than a record holds
+    for dims in ('3x5', '4x4'):
+        with pytest.raises(SystemExit):
+            endgame.main([dims])
+    assert '4x4 boards take 80' in capsys.readouterr().err
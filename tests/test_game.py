@@ -0,0 +1,21 @@
+import random
+
+from macht import game, grid
+
+
+def test_step():
+    g = grid.Grid(rows=1, cols=3, rng=random.Random(0))
+    g.spawn_tile(0, 0)
+    g.spawn_tile(0, 1)
+
+    assert game.step(g, grid.Direction.up) is None
+    grid_step = game.step(g, grid.Direction.right)
+    assert grid_step.score == 4 and g[0][2].exponent == 2
+    assert grid_step.actions[-1].type is grid.Actions.spawn
+    spawned = grid_step.actions[-1].new
+    assert g[spawned.row][spawned.column].exponent == grid_step.exponent
+
+    other = grid.Grid(rows=1, cols=3)
+    other.spawn_tile(0, 2)
+    steps = game.step_all([g, other], [grid.Direction.down, None])
+    assert steps == [None, None]
@@ -1,3 +1,4 @@
+import random
 from itertools import product, chain
 
 import pytest
@@ -260,3 +261,127 @@ def test_repr():
     assert (repr(action) ==
             'GridAction(Actions.spawn, new=Position(row=3, column=3))')
     eval(repr(grid.GridAction(grid.Actions.spawn, grid.Position(3, 3))))
+
+
+def test_move_records():
+    from array import array
+
+    g = grid.Grid()
+    g.spawn_tile(0, 0)
+    g.spawn_tile(0, 2)
+    g.spawn_tile(1, 3, exponent=2)
+
+    records = g.move_records(grid.Direction.right, apply=False)
+    assert list(records) == [grid.Actions.move.value, 2, 3,
+                             grid.Actions.merge.value, 0, 3]
+    assert g[0][0] and g[0][2] and g[0][2].exponent == 1  # not applied
+
+    reused = array('i', [9, 9, 9])
+    assert g.move_records(grid.Direction.up, records=reused) is reused
+    assert list(reused) == [grid.Actions.move.value, 7, 3]
+    assert g[0][3].exponent == 2 and not g[1][3]
+
+    actions = g.move(grid.Direction.left, apply=False)
+    assert [(a.type, a.old, a.new) for a in actions] == [
+        (grid.Actions.merge, (0, 2), (0, 0)),
+        (grid.Actions.move, (0, 3), (0, 1))]
+
+    pytest.raises(TypeError, g.move_records, "left")
+
+
+def test_can_move():
+    g = grid.Grid(rows=2, cols=2)
+    assert not any(g.can_move(direction) for direction in grid.Direction)
+
+    g.spawn_tile(0, 0)
+    assert [g.can_move(d) for d in grid.Direction] == [False, False,
+                                                       True, True]
+    g.spawn_tile(0, 1, exponent=2)
+    assert not g.can_move(grid.Direction.right)
+    g.spawn_tile(1, 1, exponent=2)
+    assert g.can_move(grid.Direction.up) and g.can_move(grid.Direction.left)
+
+    pytest.raises(TypeError, g.can_move, "up")
+
+
+def assert_counts(g):
+    cols = len(g[0])
+    empty = set(row * cols + col for row, col
+                in product(range(len(g)), range(cols)) if not g[row][col])
+    assert set(g._empty) == empty and g.empty_count == len(empty)
+    pairs = sum(1 for row, col in product(range(len(g)), range(cols))
+                for other in ((row + 1, col), (row, col + 1))
+                if other[0] < len(g) and other[1] < cols and g[row][col] and
+                g[row][col] == g[other[0]][other[1]])
+    assert g._equal_pairs == pairs
+    assert g.has_moves == bool(g.possible_moves)
+
+
+def test_has_moves():
+    g = grid.Grid(rows=3, cols=4)
+    assert_counts(g)
+    assert not g.has_moves
+
+    rng = grid.random.Random(7)
+    g.spawn_tile()
+    while g.has_moves:
+        g.move(rng.choice(g.possible_moves))
+        g.spawn_tile()
+        assert_counts(g)
+    assert all(chain(*g))
+
+    g[0][0] = None
+    assert_counts(g)
+    g[0][-1] = None
+    assert not g[0][3]
+    assert_counts(g)
+    pytest.raises(IndexError, g[0].__setitem__, 4, g.Tile())
+    pytest.raises(IndexError, g[0].__setitem__, -5, None)
+    assert_counts(g)
+    g[1] = [g.Tile(exponent=5) for _ in range(4)]
+    assert_counts(g)
+    g.merge_tiles((1, 0), (1, 1))
+    assert_counts(g)
+    g.resize(rows=5, cols=2)
+    assert_counts(g)
+
+    g = grid.Grid(rows=1, cols=1)
+    g.spawn_tile()
+    pytest.raises(grid.SpawnTileError, g.spawn_tile)
+
+
+def test_cell_set():
+    cells, rng = grid.CellSet(37), random.Random(2)
+    expected = set()
+    for _ in range(200):
+        cell = rng.randrange(37)
+        if cell in expected:
+            cells.remove(cell)
+            expected.remove(cell)
+        else:
+            cells.add(cell)
+            expected.add(cell)
+        assert len(cells) == len(expected) and list(cells) == sorted(expected)
+        assert [cells.nth(idx) for idx in range(len(cells))] == \
+            sorted(expected)
+    pytest.raises(IndexError, cells.nth, len(cells))
+
+
+def test_shared_tiles():
+    g = grid.Grid(rows=1, cols=4)
+    for column in range(4):
+        g.spawn_tile(0, column, exponent=1)
+    assert g[0][0] is g[0][3]  # spawned tiles are interned
+
+    g.move(grid.Direction.left)
+    assert [t and t.exponent for t in g[0]] == [2, 2, None, None]
+    assert g[0][0] is g[0][1] and g[0][0] is not g[0][2]
+
+    g.spawn_tile(0, 2, exponent=2)
+    g.merge_tiles((0, 1), (0, 0))
+    assert g[0][0].exponent == 3 and g[0][2].exponent == 2
+
+    # tiles placed from outside, e.g. by an undo, come from the same cache
+    assert g.make_tile(exponent=2) is g[0][2]
+    g[0][3] = g.make_tile(exponent=3)
+    assert g[0][3] is g[0][0]
@@ -0,0 +1,109 @@
+import pickle
+import random
+
+import pytest
+from macht import bitboard, grid, heuristics
+from macht.ai import expectimax
+
+
+def random_rows(rows, cols, rng, high=12):
+    return [[rng.choice([0, 0] + list(range(1, high + 1)))
+             for _ in range(cols)] for _ in range(rows)]
+
+
+def grid_from_rows(rows):
+    g = grid.Grid(len(rows), len(rows[0]))
+    for row_idx, row in enumerate(rows):
+        for col_idx, exponent in enumerate(row):
+            if exponent:
+                g[row_idx][col_idx] = g.Tile(exponent=exponent)
+    return g
+
+
+def all_terms():
+    return heuristics.Heuristic(dict(
+        (name, idx + 1.0) for idx, name
+        in enumerate(sorted(heuristics.evaluators))), constant=5.0)
+
+
+def test_terms():
+    evaluators = heuristics.evaluators
+    assert evaluators['empty']().line([0, 1, 0, 2]) == 2
+    assert evaluators['merges']().line([1, 0, 1, 1]) == 3
+    assert evaluators['merges']().line([1, 1, 2, 2]) == 4
+    assert evaluators['monotonicity'](power=1).line([3, 2, 1, 0]) == 0
+    assert evaluators['monotonicity'](power=1).line([1, 3, 2, 0]) == 2
+    assert evaluators['smoothness']().line([1, 0, 4, 2]) == 5
+    assert evaluators['corner']().line([3, 0, 0, 1]) == 4
+    assert evaluators['sum'](power=2).line([3, 0, 0, 1]) == 10
+
+
+def test_register():
+    @heuristics.register
+    class Highest(heuristics.Evaluator):
+        name = 'highest'
+
+        def line(self, line):
+            return max(line)
+
+    try:
+        heuristic = heuristics.Heuristic({'highest': 2.0})
+        assert heuristic.line([1, 5, 2, 0]) == 10
+    finally:
+        del heuristics.evaluators['highest']
+
+    with pytest.raises(ValueError):
+        heuristics.Heuristic({'highest': 2.0})
+
+
+def test_default_heuristic():
+    assert expectimax.HEURISTIC.line([3, 2, 1, 0]) == pytest.approx(
+        expectimax.LOST_PENALTY + expectimax.EMPTY_WEIGHT -
+        expectimax.SUM_WEIGHT * (3 ** 3.5 + 2 ** 3.5 + 1))
+
+
+@pytest.mark.parametrize('rows, cols', [(4, 4), (3, 5)])
+def test_grids(rows, cols):
+    heuristic, rng = all_terms(), random.Random(0)
+    for _ in range(20):
+        exponent_rows = random_rows(rows, cols, rng)
+        lines = exponent_rows + [list(col) for col in zip(*exponent_rows)]
+        expected = sum(heuristic.line(line) for line in lines)
+
+        g = grid_from_rows(exponent_rows)
+        assert heuristic.evaluate(g) == pytest.approx(expected)
+        bit_grid = bitboard.BitGrid.from_grid(g)
+        assert heuristic.evaluate(bit_grid) == pytest.approx(expected)
+
+
+def test_times():
+    heuristic = all_terms()
+    heuristic.line([1, 2, 0, 0])
+    assert set(heuristic.times) == set(heuristics.evaluators)
+    assert heuristic.report().count('\n') == len(heuristics.evaluators) - 1
+
+
+def test_pickle():
+    heuristic = all_terms()
+    heuristic.evaluate(grid_from_rows([[1, 2], [0, 3]]))
+    copy = pickle.loads(pickle.dumps(heuristic))
+    assert copy.weights == heuristic.weights
+    assert copy.line([1, 2, 0, 3]) == heuristic.line([1, 2, 0, 3])
+
+
+@pytest.mark.parametrize('rows, cols, high', [(4, 4, 12), (3, 5, 12),
+                                              (4, 4, 17), (6, 6, 8)])
+def test_batch(rows, cols, high):
+    np = pytest.importorskip('numpy')
+    heuristic, rng = all_terms(), random.Random(1)
+    boards = [random_rows(rows, cols, rng, high) for _ in range(50)]
+
+    expected = [heuristic.evaluate(grid_from_rows(board))
+                for board in boards]
+    values = heuristic.evaluate_batch(np.array(boards, dtype=np.int8))
+    assert values.shape == (50,)
+    assert values == pytest.approx(expected)
+
+    terms = heuristic.evaluate_terms(np.array(boards))
+    assert set(terms) == set(heuristics.evaluators)
+    assert terms['empty'][0] == 2 * sum(row.count(0) for row in boards[0])
@@ -0,0 +1,71 @@
+import random
+
+from macht import grid, history
+
+
+def exponents(grids):
+    return [history.grid_exponents(g) for g in grids]
+
+
+def play(grids, hist, turns, seed=0):
+    """Play random turns on grids, return the exponents before every turn."""
+    rng, states = random.Random(seed), []
+    for _ in range(turns):
+        direction = rng.choice(list(grid.Direction))
+        states.append(exponents(grids))
+        moves, score = [], 0
+        for grid_idx, g in enumerate(grids):
+            actions = g.move(direction)
+            score += sum(g[a.new.row][a.new.column].value for a in actions
+                         if a.type is grid.Actions.merge)
+            if actions:
+                actions.append(g.spawn_tile(exponent=1))
+                moves.append(history.move_from_actions(grid_idx, g,
+                                                       direction, actions))
+        if moves:
+            hist.push(score, moves)
+        else:
+            states.pop()
+    return states
+
+
+def new_grids():
+    grids = [grid.Grid(rng=random.Random(1)), grid.Grid(3, 5)]
+    for g in grids:
+        g.spawn_tile()
+        g.spawn_tile()
+    return grids
+
+
+def test_undo_redo():
+    grids, hist = new_grids(), history.History()
+    states = play(grids, hist, 50)
+    end = exponents(grids)
+    assert len(hist) == len(states)
+
+    for state in reversed(states):
+        turn = hist.undo(grids)
+        assert turn and exponents(grids) == state
+    assert hist.undo(grids) is None and hist.redo_count == len(states)
+
+    for state in states[1:] + [end]:
+        hist.redo(grids)
+        assert exponents(grids) == state
+    assert hist.redo(grids) is None
+
+    hist.undo(grids)
+    play(grids, hist, 1, seed=2)  # a new turn drops what could be redone
+    assert hist.redo_count == 0
+
+
+def test_depth():
+    grids, hist = new_grids(), history.History(depth=5)
+    states = play(grids, hist, 30)
+    assert len(hist) == 5
+
+    while hist.undo(grids):
+        pass
+    assert exponents(grids) == states[-5]
+
+    restored = history.History(5, hist.turns())
+    assert restored.turns() == hist.turns()
@@ -0,0 +1,63 @@
+from macht import grid, instrument
+
+
+def test_profiler():
+    move, possible_moves = grid.Grid.move, grid.Grid.__dict__['possible_moves']
+    profiler = instrument.enable()
+    try:
+        assert grid.Grid.move is not move
+
+        g = grid.Grid()
+        g.spawn_tile(0, 0)
+        g.move(grid.Direction.down)
+        g.possible_moves
+    finally:
+        profiler.restore()
+    assert grid.Grid.move is move
+    assert grid.Grid.__dict__['possible_moves'] is possible_moves
+
+    summary = profiler.summary()
+    assert summary['calls']['Grid.move']['calls'] == 1
+    assert summary['calls']['Grid.move_records']['calls'] == 1
+    assert summary['calls']['Grid.spawn_tile']['calls'] == 1
+    assert 'Grid.draw' not in summary['calls']  # not called
+    # move_records ran inside move, so it only counts once for the category
+    calls = summary['calls']
+    assert abs(summary['categories']['game'] - (
+        calls['Grid.move']['total'] + calls['Grid.spawn_tile']['total'] +
+        calls['Grid.possible_moves']['total'])) < 1e-9
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert instrument.percentile(values, 0.5) == 51
+    assert instrument.percentile(values, 0.99) == 100
+    assert instrument.percentile([3], 0.99) == 3
+
+
+def test_from_environment():
+    assert instrument.from_environment({}) == (None, None)
+    assert instrument.from_environment({'MACHT_PROFILE': '0'}) == (None, None)
+    profiler, output = instrument.from_environment({'MACHT_PROFILE': '1'})
+    profiler.restore()
+    assert output == '1'
+
+    # --profile FILE takes precedence over the environment
+    profiler, output = instrument.from_environment(
+        {'MACHT_PROFILE': 'env.json'}, output='flag.json')
+    profiler.restore()
+    assert output == 'flag.json'
+
+
+def test_players():
+    from macht.ai import expectimax, pool
+    from macht.endgame import EndgameTable
+
+    players = (expectimax.Player, pool.PoolPlayer, EndgameTable)
+    originals = [player.__dict__['best_moves'] for player in players]
+    profiler = instrument.enable()
+    try:
+        for player, original in zip(players, originals):
+            assert player.__dict__['best_moves'] is not original
+    finally:
+        profiler.restore()
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+from macht import grid, replay
+
+
+def play_grid(seed, directions):
+    """Play a seeded game on a Grid the way the terminal game does."""
+    g = grid.Grid(rng=random.Random(seed))
+    g.spawn_tile()
+    g.spawn_tile()
+    score = 0
+    for direction in directions:
+        actions = g.move(direction)
+        for action in actions:
+            if action.type is grid.Actions.merge:
+                score += g[action.new.row][action.new.column].value
+        if actions:
+            g.spawn_tile(exponent=grid.spawn_exponent(g.rng))
+    return g, score
+
+
+def exponents(g):
+    return [[t.exponent if t else 0 for t in row] for row in g]
+
+
+def test_replay():
+    rng = random.Random(3)
+    directions = [rng.choice(list(grid.Direction)) for _ in range(60)]
+    game = replay.Replay(42, directions, interval=16)
+    assert len(game) == 60
+
+    for move in (60, 0, 17, 33, 59):
+        expected, expected_score = play_grid(42, directions[:move])
+        g, score = game.grid(move)
+        assert exponents(g) == exponents(expected) and score == expected_score
+        bit_grid, score = game.state(move)
+        assert exponents(bit_grid) == exponents(expected)
+    assert len(game._checkpoints) == 4  # at moves 0, 16, 32 and 48
+
+    # the replayed grid continues the same spawn stream
+    expected, _ = play_grid(42, directions + directions[:5])
+    g, _ = game.grid()
+    for direction in directions[:5]:
+        if g.move(direction):
+            g.spawn_tile(exponent=grid.spawn_exponent(g.rng))
+    assert exponents(g) == exponents(expected)
+
+    pytest.raises(IndexError, game.state, 61)
+
+
+def test_play_move():
+    g = replay.new_game(seed=1, rows=1, cols=2)
+    assert exponents(g) == [[1, 1]]
+    assert replay.play_move(g, grid.Direction.up) is None
+    assert replay.play_move(g, grid.Direction.left) == 4
+    assert exponents(g)[0][0] == 2 and exponents(g)[0][1] in (1, 2)
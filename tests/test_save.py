@@ -0,0 +1,175 @@
+import random
+
+import pytest
+
+from macht import grid, history, save
+
+
+def random_grids(seed=0):
+    rng = random.Random(seed)
+    grids = []
+    for rows, cols in ((4, 4), (3, 5)):
+        g = grid.Grid(rows, cols)
+        for _ in range(rows * cols // 2):
+            g.spawn_tile(exponent=rng.randint(1, 11))
+        grids.append(g)
+    return grids
+
+
+def test_json(tmpdir):
+    filename = str(tmpdir.join('save.json'))
+    grids = random_grids()
+    save.write_to_file(42, grids, filename)
+
+    state = save.load_from_file(filename)
+    assert state['score'] == 42
+    assert state['grids'] == [save.grid_to_dict(g) for g in grids]
+
+    assert save.load_from_file(str(tmpdir.join('missing.json'))) == {}
+
+
+def test_binary(tmpdir):
+    filename = str(tmpdir.join('nested', 'save.macht'))
+    grids = random_grids()
+    save.write_to_file(1234, grids, filename)
+
+    state = save.load_from_file(filename)
+    assert state['score'] == 1234
+    assert state['grids'] == [save.grid_to_dict(g) for g in grids]
+
+    json_filename = str(tmpdir.join('save.json'))
+    save.write_to_file(1234, grids, json_filename)
+    assert tmpdir.join('nested', 'save.macht').size() * 10 < \
+        tmpdir.join('save.json').size()
+
+
+def test_move_log(tmpdir):
+    filename = str(tmpdir.join('log.macht'))
+    grids, score = random_grids(1), 7
+
+    log = save.MoveLog(filename)
+    log.start(score, grids)
+
+    rng = random.Random(2)
+    for _ in range(20):
+        new_turn = True
+        for grid_idx, g in enumerate(grids):
+            if not g.possible_moves:
+                continue
+            direction = rng.choice(g.possible_moves)
+            for action in g.move(direction):
+                if action.type is grid.Actions.merge:
+                    score += g[action.new.row][action.new.column].value
+            exponent = grid.spawn_exponent(rng)
+            log.append(grid_idx, direction, g.spawn_tile(exponent=exponent),
+                       exponent, new_turn)
+            new_turn = False
+
+        state = save.load_from_file(filename)  # readable while appending
+        assert state['score'] == score
+        assert state['grids'] == [save.grid_to_dict(g) for g in grids]
+    log.close()
+
+    size = tmpdir.join('log.macht').size()
+    save.write_to_file(score, grids, filename)  # compacts the log away
+    assert tmpdir.join('log.macht').size() < size
+    assert save.load_from_file(filename)['score'] == score
+
+
+def test_history(tmpdir):
+    grids, score = random_grids(3), 5
+    start = [save.grid_to_dict(g) for g in grids]
+    hist = history.History()
+
+    rng = random.Random(4)
+    for _ in range(10):
+        direction, moves, turn_score = rng.choice(list(grid.Direction)), [], 0
+        for grid_idx, g in enumerate(grids):
+            actions = g.move(direction)
+            if not actions:
+                continue
+            turn_score += sum(g[a.new.row][a.new.column].value
+                              for a in actions
+                              if a.type is grid.Actions.merge)
+            actions.append(g.spawn_tile(exponent=grid.spawn_exponent(rng)))
+            moves.append(history.move_from_actions(grid_idx, g, direction,
+                                                   actions))
+        if moves:
+            hist.push(turn_score, moves)
+            score += turn_score
+
+    for name in ('save.json', 'save.macht'):
+        filename = str(tmpdir.join(name))
+        save.write_to_file(score, grids, filename, history=hist)
+        state = save.load_from_file(filename)
+        assert state['score'] == score
+        assert state['grids'] == [save.grid_to_dict(g) for g in grids]
+
+        loaded_grids = [grid.Grid(g['rows'], g['cols']) for g in start]
+        for g, grid_state in zip(loaded_grids, state['grids']):
+            for tile in grid_state['tiles']:
+                g.spawn_tile(tile['row'], tile['column'],
+                             exponent=tile['exponent'])
+        loaded = history.History(turns=state['history'])
+        assert len(loaded) == len(hist)
+        while loaded.undo(loaded_grids):
+            pass
+        assert [save.grid_to_dict(g) for g in loaded_grids] == start
+
+
+def test_turns(tmpdir):
+    filename = str(tmpdir.join('turns.macht'))
+    grids = [grid.Grid(2, 2), grid.Grid(2, 2)]
+    for g in grids:
+        g.spawn_tile(0, 0, exponent=1)
+    log = save.MoveLog(filename)
+    log.start(0, grids)
+
+    # a turn moving only the first grid, then one moving only the second
+    for grid_idx in (0, 1):
+        g = grids[grid_idx]
+        g.move(grid.Direction.right)
+        log.append(grid_idx, grid.Direction.right, g.spawn_tile(1, 0),
+                   1, True)
+    log.close()
+
+    turns = save.load_from_file(filename)['history']
+    assert [[move.grid for move in turn.moves] for turn in turns] == [[0],
+                                                                     [1]]
+    with open(filename, 'rb') as save_file:  # and kept when written again
+        state = save.bytes_to_grids(save.state_to_bytes(
+            save.bytes_to_grids(save_file.read())))
+    assert [len(turn.moves) for turn in state['history']] == [1, 1]
+
+
+def test_atomic_write(tmpdir, monkeypatch):
+    filename = str(tmpdir.join('save.json'))
+    save.write_to_file(1, random_grids(), filename)
+
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(save.os, 'fsync', fail)
+
+    with pytest.raises(OSError):
+        save.write_to_file(2, random_grids(), filename)
+    assert save.load_from_file(filename)['score'] == 1
+    assert tmpdir.listdir() == [tmpdir.join('save.json')]
+
+
+def test_autosaver(tmpdir):
+    filename = str(tmpdir.join('auto.json'))
+    grids = random_grids()
+
+    saver = save.AutoSaver(filename, interval=3600)
+    assert not saver.maybe_save(10, grids)
+    saver.save(20, grids)
+    saver.save(30, grids)
+    saver.close()
+
+    assert 1 <= saver.saves <= 2 and saver.errors == 0
+    assert save.load_from_file(filename)['score'] == 30
+
+    saver = save.AutoSaver(filename, interval=0)
+    assert saver.maybe_save(40, grids)
+    saver.close()
+    assert save.load_from_file(filename)['score'] == 40
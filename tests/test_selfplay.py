@@ -0,0 +1,42 @@
+import json
+
+from macht import selfplay
+
+
+def test_play_game():
+    result = selfplay.play_game(3, rows=3, cols=3)
+    assert result['moves'] > 0 and result['score'] > 0
+    assert result['highest_tile'] >= 4 and result['seed'] == 3
+
+    again = selfplay.play_game(3, rows=3, cols=3)
+    del result['seconds'], again['seconds']
+    assert result == again
+
+    assert selfplay.play_game(3, max_moves=5)['moves'] == 5
+
+
+def test_run_summarize():
+    results = list(selfplay.run(3, seed=10, jobs=1, rows=2, cols=2,
+                                player_options={'depth': 1}))
+    assert sorted(result['seed'] for result in results) == [10, 11, 12]
+
+    summary = selfplay.summarize(results, seconds=2.0)
+    assert summary['games'] == 3
+    assert summary['score_min'] <= summary['score_median'] <= \
+        summary['score_max']
+    assert summary['moves_per_second'] == summary['moves'] / 2.0
+    assert sum(summary['highest_tiles'].values()) == 3
+
+    assert selfplay.summarize([]) == {'games': 0}
+
+
+def test_main(tmpdir, capsys):
+    output = str(tmpdir.join('games.jsonl'))
+    assert selfplay.main(['2x3', '-n', '2', '-j', '1', '-s', '5',
+                          '-p', 'random', '-o', output]) == 0
+
+    with open(output) as results:
+        lines = [json.loads(line) for line in results]
+    assert [line['seed'] for line in lines] == [5, 6]
+    assert all(line['rows'] == 2 and line['cols'] == 3 for line in lines)
+    assert json.loads(capsys.readouterr().err)['games'] == 2
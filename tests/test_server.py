@@ -0,0 +1,154 @@
+import io
+import json
+import asyncio
+
+import pytest
+from macht import server
+from macht.grid import Direction
+from macht.history import grid_exponents
+
+
+async def request(reader, writer, message):
+    writer.write(server.encode(message))
+    return json.loads((await reader.readline()).decode('utf-8'))
+
+
+async def play_and_watch(path):
+    host = server.Server()
+    listening = await host.start(path=path)
+
+    reader, writer = await asyncio.open_unix_connection(path)
+    state = await request(reader, writer, {'op': 'new', 'rows': 3,
+                                           'cols': 3, 'seed': 1})
+    game = host.games[state['game']]
+    assert state['cells'] == grid_exponents(game.grid)
+
+    watch_reader, watch_writer = await asyncio.open_unix_connection(path)
+    watched = await request(watch_reader, watch_writer,
+                            {'op': 'watch', 'game': game.id})
+    assert watched == state
+
+    error = await request(watch_reader, watch_writer,
+                          {'op': 'move', 'game': game.id,
+                           'direction': 'left'})
+    assert error['op'] == 'error'
+
+    for direction in ('left', 'up', 'right', 'down'):
+        writer.write(server.encode({'op': 'move', 'game': game.id,
+                                    'direction': direction}))
+    listed = await request(reader, writer, {'op': 'list'})
+    while listed['op'] == 'diff':  # the player gets the diffs too
+        listed = json.loads((await reader.readline()).decode('utf-8'))
+
+    diffs = []
+    while game.turn > len(diffs):
+        diffs.append(json.loads(
+            (await watch_reader.readline()).decode('utf-8')))
+    for stream in (writer, watch_writer):
+        stream.close()
+    listening.close()
+    await listening.wait_closed()
+    return game, state, diffs, listed
+
+
+def test_play_and_watch(tmpdir):
+    game, state, diffs, listed = asyncio.run(
+        play_and_watch(str(tmpdir.join('socket'))))
+
+    assert len(diffs) == game.turn > 0
+    assert [diff['turn'] for diff in diffs] == list(range(1, game.turn + 1))
+    assert diffs[-1]['score'] == game.score
+    assert listed['games'][0]['watchers'] == 1
+
+    # replay the diffs on the first state
+    replayed = server.Game(0, rows=3, cols=3)
+    for row in replayed.grid:
+        row[:] = [None] * 3
+    for cell, exponent in enumerate(state['cells']):
+        if exponent:
+            replayed.grid[cell // 3][cell % 3] = replayed.grid.Tile(
+                exponent=exponent)
+    for diff in diffs:
+        replayed.grid.move(Direction(diff['direction']))
+        replayed.grid[diff['spawn'] // 3][diff['spawn'] % 3] = \
+            replayed.grid.Tile(exponent=diff['exponent'])
+    assert grid_exponents(replayed.grid) == grid_exponents(game.grid)
+
+
+def test_bad_new(tmpdir):
+    host = server.Server()
+    connection = server.Connection(Writer())
+    for message in ({'rows': 0}, {'cols': -1}, {'rows': 1, 'cols': 1},
+                    {'rows': server.MAX_SIZE + 1}, {'cols': '4'},
+                    {'rows': True}, {'base': 1}, {'base': 2.5}):
+        with pytest.raises(ValueError):
+            host.dispatch(connection, dict(message, op='new'))
+    assert not host.games
+
+    async def send_bad_new(path):  # answered with an error, not dropped
+        listening = await host.start(path=path)
+        reader, writer = await asyncio.open_unix_connection(path)
+        error = await request(reader, writer, {'op': 'new', 'rows': 0})
+        state = await request(reader, writer, {'op': 'new', 'rows': 2})
+        writer.close()
+        listening.close()
+        await listening.wait_closed()
+        return error, state
+
+    error, state = asyncio.run(send_bad_new(str(tmpdir.join('socket'))))
+    assert error['op'] == 'error' and 'rows' in error['message']
+    assert state['op'] == 'state' and state['rows'] == 2
+
+
+class Writer(object):
+    def __init__(self):
+        self.data = b''
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+
+async def slow_reader():
+    host = server.Server(queue_size=2)
+    connection = server.Connection(Writer(), host.queue_size)
+    host.dispatch(connection, {'op': 'new', 'seed': 0})
+    game = list(connection.games.values())[0]
+
+    # nothing is written while moves are made
+    for direction in list(Direction) * 5:
+        host.dispatch(connection, {'op': 'move', 'game': game.id,
+                                   'direction': direction.value})
+    assert connection.stale and connection.queue.qsize() == 1
+
+    connection.queue.put_nowait(None)
+    await host._write(connection)
+    return game, connection.writer.data
+
+
+def test_slow_reader():
+    game, data = asyncio.run(slow_reader())
+    messages = [json.loads(line) for line in data.decode().splitlines()]
+    assert messages == [game.state()]
+
+
+def test_remote_game():
+    blessed = pytest.importorskip('blessed')
+    from macht.term.client import RemoteGame
+    from macht.term.render import Frame
+
+    stream = io.StringIO()
+    term = blessed.Terminal(kind='xterm-256color', stream=stream,
+                            force_styling=True)
+    remote = RemoteGame(term, Frame(term, stream=stream))
+
+    game = server.Game(1, seed=3)
+    remote.handle(game.state())
+    for direction in list(Direction) * 3:
+        diff = game.move(direction)
+        if diff:
+            remote.handle(diff)
+    assert grid_exponents(remote.grid) == grid_exponents(game.grid)
+    assert remote.score == game.score
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+from macht import grid, sparse
+
+
+def exponents(g):
+    return [[t.exponent if t else 0 for t in row] for row in g]
+
+
+def test_same_as_grid():
+    g = grid.Grid(5, 3, rng=random.Random(1))
+    s = sparse.SparseGrid(5, 3, rng=random.Random(1))
+    for board in (g, s):
+        board.spawn_tile()
+        board.spawn_tile()
+
+    rng = random.Random(2)
+    while g.possible_moves:
+        assert s.possible_moves == g.possible_moves and s.has_moves
+        direction = rng.choice(g.possible_moves)
+        actions, sparse_actions = g.move(direction), s.move(direction)
+        assert ([(a.type, a.old, a.new) for a in sparse_actions] ==
+                [(a.type, a.old, a.new) for a in actions])
+
+        exponent = grid.spawn_exponent(rng)
+        assert (s.spawn_tile(exponent=exponent).new ==
+                g.spawn_tile(exponent=exponent).new)
+        assert exponents(s) == exponents(g)
+        assert s.empty_count == g.empty_count
+    assert not s.has_moves and s.highest_tile == g.highest_tile
+    pytest.raises(grid.SpawnTileError, s.spawn_tile)
+
+
+def test_huge():
+    s = sparse.SparseGrid(1000, 1000, rng=random.Random(3))
+    for _ in range(300):
+        s.spawn_tile()
+    assert len(s._tiles) == 300 and s.empty_count == 10 ** 6 - 300
+
+    s.move(grid.Direction.left)
+    assert all(column < 5 for (_, column), _ in s.tiles())
+    s.move(grid.Direction.down, apply=False)
+    assert all(column < 5 for (_, column), _ in s.tiles())
+
+    s.resize(rows=10)
+    assert all(row < 10 for (row, _), _ in s.tiles())
+    s.spawn_tile(9, 999, exponent=3)
+    assert s[9][999].exponent == 3 and s[-1][-1] == s[9][999]
+    s[9][999] = None
+    assert not s[9][999]
+    pytest.raises(IndexError, lambda: s[10])
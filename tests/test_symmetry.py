@@ -0,0 +1,99 @@
+import random
+
+import pytest
+from macht import bitboard, grid, symmetry
+from macht.grid import Direction
+
+
+def exponent_rows(g):
+    return [[tile.exponent if tile else 0 for tile in row] for row in g]
+
+
+def grid_from_rows(rows):
+    g = grid.Grid(len(rows), len(rows[0]))
+    for row_idx, row in enumerate(rows):
+        for col_idx, exponent in enumerate(row):
+            if exponent:
+                g[row_idx][col_idx] = g.Tile(exponent=exponent)
+    return g
+
+
+def random_board(layout, rng):
+    return layout.from_exponents([[rng.choice([0, 0, 1, 2, 3, 4])
+                                   for _ in range(layout.cols)]
+                                  for _ in range(layout.rows)])
+
+
+def test_symmetries():
+    assert len(symmetry.symmetries(4, 4)) == 8
+    assert len(symmetry.symmetries(3, 5)) == 4
+
+    # a rotation by a quarter turn clockwise
+    rotation = symmetry.Symmetry(transpose=True, flip_rows=False,
+                                 flip_cols=True)
+    assert symmetry.transform_exponents([[1, 2], [3, 4]], rotation) == \
+        [[3, 1], [4, 2]]
+    assert rotation.direction(Direction.up) is Direction.right
+    assert rotation.inverse_direction(Direction.right) is Direction.up
+
+
+@pytest.mark.parametrize('rows, cols', [(4, 4), (3, 3), (3, 5), (5, 5)])
+def test_directions(rows, cols):
+    rng = random.Random(rows * cols)
+    for _ in range(20):
+        g = grid_from_rows([[rng.choice([0, 0, 1, 2, 3]) for _ in range(cols)]
+                            for _ in range(rows)])
+        for sym in symmetry.symmetries(rows, cols):
+            transformed = grid_from_rows(
+                symmetry.transform_exponents(exponent_rows(g), sym))
+            for direction in Direction:
+                moved = grid_from_rows(exponent_rows(g))
+                moved.move(direction)
+                transformed_moved = grid_from_rows(exponent_rows(transformed))
+                transformed_moved.move(sym.direction(direction))
+                assert exponent_rows(transformed_moved) == \
+                    symmetry.transform_exponents(exponent_rows(moved), sym)
+                assert sym.inverse_direction(sym.direction(direction)) is \
+                    direction
+
+
+@pytest.mark.parametrize('rows, cols', [(4, 4), (3, 3), (3, 5), (5, 5)])
+def test_canonical(rows, cols):
+    rng = random.Random(0)
+    layout = bitboard.layout(rows, cols)
+    board_symmetry = symmetry.board_symmetry(layout)
+    for _ in range(50):
+        board = random_board(layout, rng)
+        bit_grid = bitboard.BitGrid(rows, cols, board=board)
+        g = grid_from_rows(layout.exponents(board))
+
+        canonical, sym = bit_grid.canonical()
+        key, grid_sym = g.canonical()
+        assert sym == grid_sym and canonical == board_symmetry.transform(
+            board, sym)
+        assert board_symmetry.inverse(canonical, sym) == board
+        assert key == tuple(e for row in layout.exponents(canonical)
+                            for e in row)
+        assert board_symmetry.canonical_board(board) == canonical
+
+        for other in board_symmetry.symmetries:
+            transformed = board_symmetry.transform(board, other)
+            assert transformed >= canonical
+            assert board_symmetry.canonical(transformed)[0] == canonical
+            assert symmetry.canonical_hash(grid_from_rows(
+                layout.exponents(transformed))) == symmetry.canonical_hash(g)
+
+
+@pytest.mark.parametrize('bits', [4, 5])
+def test_flips_4x4(bits):
+    rng = random.Random(1)
+    layout = bitboard.layout(4, 4, bits=bits)
+    board_symmetry = symmetry.BoardSymmetry(layout)
+    assert 'flip_rows' in board_symmetry.__dict__  # the masks and shifts
+    for _ in range(50):
+        board = layout.from_exponents([[rng.randrange(2 ** bits)
+                                         for _ in range(4)]
+                                        for _ in range(4)])
+        for flip in ('flip_rows', 'flip_cols'):
+            assert getattr(board_symmetry, flip)(board) == getattr(
+                symmetry.BoardSymmetry, flip)(board_symmetry, board)
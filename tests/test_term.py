@@ -0,0 +1,121 @@
+import io
+from functools import partial
+
+import pytest
+
+blessed = pytest.importorskip('blessed')
+from macht.grid import Direction  # noqa: E402
+from macht.term.grid import Grid  # noqa: E402
+from macht.term.animation import Animation, Animator  # noqa: E402
+from macht.term.render import Canvas, Frame  # noqa: E402
+from macht.term.tile import Tile  # noqa: E402
+
+
+def new_grid(rows=4, cols=4):
+    stream = io.StringIO()
+    term = blessed.Terminal(kind='xterm-256color', stream=stream,
+                            force_styling=True)
+    frame = Frame(term, stream=stream)
+    g = Grid(x=0, y=1, rows=rows, cols=cols, tile_width=6, tile_height=3,
+             term=term, Tile=partial(Tile, term=term), frame=frame)
+    return g, stream
+
+
+def test_frame():
+    g, stream = new_grid()
+    g.frame.write(1, 2, 'text')
+    g.frame.write(3, 4, 'more')
+    assert stream.getvalue() == ''
+
+    assert g.frame.flush()
+    assert stream.getvalue().count('text') == 1
+    assert g.frame.frames == 1 and g.frame.writes == 2
+
+    assert not g.frame.flush()  # nothing written since the last flush
+    assert g.frame.frames == 1
+
+
+def test_draw_actions():
+    g, stream = new_grid()
+    g.spawn_tile(0, 0)
+    g.spawn_tile(3, 3, exponent=2)
+    g.draw()
+    g.draw_tiles()
+    g.frame.flush()
+
+    writes = g.frame.writes
+    actions = g.move(Direction.right)
+    g.draw_actions(actions)
+    # the tile at (3, 3) did not move, only (0, 0) and (0, 3) are redrawn
+    assert g.frame.writes - writes == 2 * (g.tile_height + 1) - 1
+
+    writes = g.frame.writes
+    g.draw_actions(actions)  # nothing changed since the last redraw
+    assert g.frame.writes == writes
+
+
+def canvas_text(canvas):
+    return [''.join(char for char, _ in row) for row in canvas.rows]
+
+
+def test_canvas():
+    g, stream = new_grid()
+    canvas = Canvas(2, 3, 5, 2)
+    canvas.fill(0, 0, 4, 4, 'red')
+    canvas.text(5, 4, 'abcdef', 'blue')
+    assert canvas_text(canvas) == ['     ', '   ab']
+
+    writes = g.frame.writes
+    canvas.draw(g.frame)
+    assert g.frame.writes - writes == 4  # one run per style per row
+
+    other = Canvas(2, 3, 5, 2)
+    other.fill(0, 0, 4, 4, 'red')
+    other.text(5, 4, 'aXcdef', 'blue')
+    writes = g.frame.writes
+    other.draw(g.frame, canvas)
+    assert g.frame.writes - writes == 1  # only the changed 'X'
+
+
+def test_animation():
+    g, stream = new_grid()
+    g.spawn_tile(0, 0)
+    g.spawn_tile(0, 2)
+    g.spawn_tile(3, 3, exponent=3)
+
+    actions = g.move(Direction.right)
+    actions.append(g.spawn_tile(1, 1))
+    animation = Animation(g, actions)
+
+    def exponent_at(canvas, row, column):
+        x, y = g.tile_coord(row, column)
+        line = canvas_text(canvas)[y - canvas.y + 1]
+        text = line[x - canvas.x:x - canvas.x + g.tile_width].strip()
+        return text and int(text).bit_length() - 1
+
+    start, end = animation.canvas(0), animation.final_canvas()
+    assert [exponent_at(start, 0, col) for col in range(4)] == [1, '', 1, '']
+    assert [exponent_at(end, 0, col) for col in range(4)] == ['', '', '', 2]
+    assert exponent_at(start, 1, 1) == '' and exponent_at(end, 1, 1) == 1
+    assert exponent_at(start, 3, 3) == exponent_at(end, 3, 3) == 3
+
+    animator = Animator(g.frame, duration=10)
+    animator.start([animation])
+    animator.step()
+    assert animator.active and animator.frames == 1
+
+    animator.finish()
+    assert not animator.active
+    assert g._drawn == {(0, 3): 2, (1, 1): 1, (3, 3): 3}
+
+
+def test_core_without_terminal():
+    import subprocess
+    import sys
+
+    code = ("import sys, macht.grid, macht.save, macht.replay, "
+            "macht.selfplay, macht.term.main; "
+            "print(sorted({'blessed', 'json', 'tempfile', "
+            "'concurrent.futures'} & set(sys.modules)))")
+    output = subprocess.check_output([sys.executable, '-c', code])
+    assert output.decode().strip() == "['json']"  # selfplay prints json
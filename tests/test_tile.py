@@ -11,17 +11,16 @@ def test_properties():
     assert t.base == 3 and t.exponent == 2
     assert t.value == 3 ** 2
 
-    t.base = 5
-    assert t.base == 5
-    t.exponent = 3
-    assert t.exponent == 3
-
-    assert t.value == 5 ** 3
+    # tiles are shared between grids
+    with pytest.raises(AttributeError):
+        t.base = 5
+    with pytest.raises(AttributeError):
+        t.exponent = 3
+    assert t.value == 3 ** 2
 
 
 def test_cmp():
-    t = tile.Tile()
-    t.base, t.exponent = 3, 3
+    t = tile.Tile(3, 3)
     assert t == tile.Tile(3, 3)
     assert t != tile.Tile(2, 1)
     assert t != 3 ** 3  # a tile is not just it's value
@@ -43,3 +42,21 @@ def test_repr():
 
     assert repr(tile.Tile()) == 'Tile(base=2, exponent=1)'
     eval(repr(tile.Tile()))
+
+
+def test_slots():
+    t = tile.Tile()
+    with pytest.raises(AttributeError):
+        t.x = 1
+
+
+def test_tile_cache():
+    cache = tile.tile_cache()
+    assert cache is tile.tile_cache(tile.Tile)
+    assert cache[3, 2] == tile.Tile(3, 2) and cache[3, 2] is cache[3, 2]
+    assert cache[2, 70].value == 2 ** 70
+
+    cache = tile.TileCache(tile.Tile)
+    t = tile.Tile(3, 4)
+    assert cache.intern(t) is t and cache[3, 4] is t
+    assert cache.intern(tile.Tile(3, 4)) is t
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+from macht import heuristics, tune
+from macht.ai.expectimax import HEURISTIC
+
+game_options = {'rows': 2, 'cols': 3, 'base': 2, 'depth': 1,
+                'max_moves': 30}
+space = {'empty': (0.0, 1000.0), 'merges': (0.0, 1000.0)}
+
+
+def test_play_game():
+    heuristic = tune.make_heuristic({'empty': 270.0})
+    score = tune.play_game(3, heuristic, **game_options)
+    assert score > 0
+    assert tune.play_game(3, heuristic, **game_options) == score
+
+
+def test_searches():
+    candidates = tune.RandomSearch(space, population=5, seed=1).ask()
+    assert len(candidates) == 5
+    for candidate in candidates:
+        assert set(candidate) == set(space)
+        assert all(0 <= weight <= 1000 for weight in candidate.values())
+    assert candidates == tune.RandomSearch(space, 5, seed=1).ask()
+
+    search = tune.GridSearch(space, population=3, steps=2)
+    generations = [search.ask(), search.ask()]
+    assert [len(candidates) for candidates in generations] == [3, 1]
+    assert {'empty': 1000.0, 'merges': 0.0} in generations[0]
+    assert search.ask() == []
+
+
+def test_cmaes():
+    pytest.importorskip('numpy')
+    search = tune.CMAES(space, population=6, seed=0, sigma=0.2)
+    for _ in range(15):  # climb towards the most empty, fewest merges
+        candidates = search.ask()
+        search.tell(candidates, [c['empty'] - c['merges']
+                                 for c in candidates])
+    best = search.low + search.mean.clip(0, 1) * (search.high - search.low)
+    assert best[0] > 900 and best[1] < 100
+
+
+def test_tuner(tmpdir):
+    checkpoint = str(tmpdir.join('tune.json'))
+    tuner = tune.Tuner(tune.RandomSearch(space, 3, seed=0), games=3,
+                       jobs=1, early_games=1, checkpoint=checkpoint,
+                       **game_options)
+    generations = list(tuner.run(2))
+    assert [g['generation'] for g in generations] == [0, 1]
+    results = generations[-1]['results']
+    assert all(r['games'] == (1 if r['stopped'] else 3) for r in results)
+    assert tuner.best['games'] == 3 and not tuner.best['stopped']
+
+    # a second run with the checkpoint replays the games from the cache
+    again = tune.Tuner(tune.RandomSearch(space, 3, seed=0), games=3,
+                       jobs=1, early_games=1, checkpoint=checkpoint,
+                       **game_options)
+    assert list(again.run(2))[-1]['results'] == results
+    assert again.played == 0
+
+    with pytest.raises(ValueError):
+        tune.Tuner(tune.RandomSearch(space), checkpoint=checkpoint,
+                   **dict(game_options, depth=2))
+
+
+def test_early_stopping():
+    good = dict(HEURISTIC.weights)
+    bad = {'empty': -1000.0}  # fills the board as fast as it can
+    tuner = tune.Tuner(None, games=4, jobs=1, early_games=2,
+                       **dict(game_options, rows=3, cols=3, max_moves=None))
+    good_result, bad_result = tuner.evaluate([good, bad])
+    assert not good_result['stopped'] and good_result['games'] == 4
+    assert bad_result['stopped'] and bad_result['games'] == 2
+    assert tuner.played == 6
+
+
+def test_main(tmpdir, capsys):
+    output = str(tmpdir.join('weights.json'))
+    assert tune.main(['2x2', '-n', '2', '-g', '2', '-p', '2', '-j', '1',
+                      '-d', '1', '-t', 'empty', '-o', output]) == 0
+    assert 'generation 2' in capsys.readouterr().err
+
+    heuristic = heuristics.load_from_file(output)
+    assert set(heuristic.weights) == {'empty'}
+    assert heuristic.constant == HEURISTIC.constant
+
+    assert tune.main(['2x2', '-n', '1', '-g', '1', '-j', '1', '-d', '1',
+                      '-t', 'sum=-1:0']) == 0
+    assert json.loads(capsys.readouterr().out)['weights']['sum'] <= 0